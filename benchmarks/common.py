@@ -0,0 +1,42 @@
+"""Shared helpers for the standalone benchmark scripts.
+
+Run a benchmark from the repository root, e.g. ``python -m benchmarks.food_indexes``.
+Each script works against a throwaway test database, never ``db.sqlite3``.
+"""
+import os
+import statistics
+import time
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodstorage.settings")
+    django.setup()
+
+
+def create_benchmark_db():
+    """Create and migrate a throwaway test database, returning the old name to restore"""
+    from django.db import connection
+    return connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def destroy_benchmark_db(old_name):
+    from django.db import connection
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed(rows, categories=50, batch_size=10000, seed_value=0):
+    """Bulk insert ``categories`` categories and ``rows`` foods with realistic shelf lives"""
+    from inventory.seeding import seed_inventory
+    seed_inventory(rows, categories, batch_size=batch_size, seed_value=seed_value)
+
+
+def timed(fn, repeat=5):
+    """Run ``fn`` ``repeat`` times and return the median wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
@@ -0,0 +1,116 @@
+"""Mixed read/write throughput on SQLite with Django's stock options versus the tuned WAL configuration.
+
+    python -m benchmarks.db_concurrency --threads 16 --duration 10
+
+Each thread loops over dashboard reads and food inserts on a file-backed copy
+of the schema. "stock" is a plain rollback-journal connection with deferred
+transactions; "tuned" uses the options from foodstorage/database.py.
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.common import create_benchmark_db, destroy_benchmark_db, seed, setup_django
+
+
+def worker(deadline, write_ratio, seed_value, results):
+    from django.db import OperationalError, connection, transaction
+    from inventory.models import Category, Food
+    from inventory.stock import stock_summary
+
+    rng = random.Random(seed_value)
+    category_ids = list(Category.objects.values_list("pk", flat=True))
+    reads, writes, errors, write_latencies = 0, 0, 0, []
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    with transaction.atomic():
+                        Food.objects.create(
+                            name=f"benchmark {rng.random()}", category_id=rng.choice(category_ids),
+                            quantity=1, best_before=date.today() + timedelta(days=rng.randint(0, 30)),
+                        )
+                    writes += 1
+                    write_latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    stock_summary()
+                    reads += 1
+            except OperationalError:
+                # "database is locked"
+                errors += 1
+    finally:
+        connection.close()
+    results.append((reads, writes, errors, write_latencies))
+
+
+def measure(label, options, args, workdir):
+    from django.db import connections
+
+    settings_dict = connections["default"].settings_dict
+    settings_dict["OPTIONS"] = options
+    settings_dict["CONN_MAX_AGE"] = 0
+    settings_dict.setdefault("TEST", {})["NAME"] = str(workdir / f"{label}.sqlite3")
+    old_name = create_benchmark_db()
+    try:
+        seed(args.rows, args.categories)
+        results = []
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(deadline, args.write_ratio, i, results)) for i in range(args.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        connections.close_all()
+        destroy_benchmark_db(old_name)
+
+    reads = sum(r[0] for r in results)
+    writes = sum(r[1] for r in results)
+    errors = sum(r[2] for r in results)
+    latencies = sorted(latency for r in results for latency in r[3])
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    median = statistics.median(latencies) if latencies else 0.0
+    print(f"{label:<8} {(reads + writes) / args.duration:>10.1f} {reads:>8} {writes:>8} {errors:>8} "
+          f"{median:>13.2f} {p99:>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+
+    if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+        parser.error("this benchmark compares SQLite configurations; unset DJANGO_DB_ENGINE")
+    tuned = dict(settings.DATABASES["default"]["OPTIONS"])
+    cache.clear()
+
+    workdir = Path(tempfile.mkdtemp(prefix="foodstorage-bench-"))
+    try:
+        print(f"{args.threads} threads, {args.write_ratio:.0%} writes, {args.duration:.0f}s each")
+        print(f"\n{'config':<8} {'ops/s':>10} {'reads':>8} {'writes':>8} {'locked':>8} "
+              f"{'write p50 ms':>13} {'write p99 ms':>13}")
+        measure("stock", {}, args, workdir)
+        measure("tuned", tuned, args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
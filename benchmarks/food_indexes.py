@@ -0,0 +1,99 @@
+"""Query plans and latency of the expiry access paths with and without the Food indexes.
+
+    python -m benchmarks.food_indexes --rows 1000000
+
+The database is seeded once at the latest migration. The indexes that
+``0004_food_indexes`` adds are then dropped with the schema editor to measure
+the unindexed plans, and created again for the indexed ones. Every other table
+(the expiry rollup read by the dashboard among them) stays in place, which a
+migration rollback would not allow.
+"""
+import argparse
+from datetime import date, timedelta
+from importlib import import_module
+
+from benchmarks.common import create_benchmark_db, destroy_benchmark_db, seed, setup_django, timed
+
+INDEX_MIGRATION = "inventory.migrations.0004_food_indexes"
+
+
+def food_indexes():
+    """The indexes under test, as the migration that added them defines them"""
+    return [operation.index for operation in import_module(INDEX_MIGRATION).Migration.operations]
+
+
+def set_food_indexes(present):
+    from django.db import connection
+    from inventory.models import Food
+
+    with connection.schema_editor() as editor:
+        for index in food_indexes():
+            if present:
+                editor.add_index(Food, index)
+            else:
+                editor.remove_index(Food, index)
+
+
+def queries():
+    from django.db.models import Count, Sum
+    from inventory.models import Category, Food
+    from inventory.stock import stock_summary
+
+    today = date.today()
+    category_id = Category.objects.order_by("pk").values_list("pk", flat=True).first()
+    return {
+        "search best_before__lte": lambda: Food.objects.filter(best_before__lte=today + timedelta(days=3)),
+        "admin order by best_before": lambda: Food.objects.order_by("best_before")[:100],
+        "category expiry range": lambda: Food.objects.filter(
+            category_id=category_id, best_before__gt=today, best_before__lte=today + timedelta(days=7)
+        ),
+        "expiring soon per category": lambda: Food.objects.filter(
+            best_before__gt=today, best_before__lte=today + timedelta(days=7)
+        ).order_by().values("category_id").annotate(count=Count("id")),
+        "stock totals per category": lambda: Food.objects.order_by().values("category_id").annotate(
+            total=Sum("quantity")
+        ),
+        "dashboard summary": stock_summary,
+    }
+
+
+def measure(label, repeat):
+    print(f"\n=== {label} ===")
+    results = {}
+    for name, build in queries().items():
+        if name == "dashboard summary":
+            results[name] = timed(build, repeat)
+        else:
+            print(f"\n-- {name}\n{build().explain()}")
+            results[name] = timed(lambda: list(build()), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    old_name = create_benchmark_db()
+    try:
+        print(f"Seeding {args.rows} foods across {args.categories} categories...")
+        seed(args.rows, args.categories)
+
+        set_food_indexes(False)
+        before = measure("without indexes", args.repeat)
+        set_food_indexes(True)
+        after = measure("with indexes", args.repeat)
+
+        print(f"\n{'query':<30} {'before ms':>12} {'after ms':>12} {'speedup':>9}")
+        for name in before:
+            print(f"{name:<30} {before[name]:>12.2f} {after[name]:>12.2f} {before[name] / after[name]:>8.1f}x")
+    finally:
+        destroy_benchmark_db(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Requests per second and latency percentiles of running servers under concurrent clients.
+
+Start the same code under WSGI and ASGI against a seeded database, then point
+the harness at both (ASGI serves the async views from inventory/async_views.py):
+
+    gunicorn foodstorage.wsgi --workers 4 --threads 8 --bind 127.0.0.1:8000
+    uvicorn foodstorage.asgi:application --workers 4 --port 8001
+    python -m benchmarks.load --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+
+Use a shared cache (DJANGO_CACHE_BACKEND=file or redis) so every worker sees
+the same inventory version. The clients are plain asyncio keep-alive
+connections, so the harness itself needs no extra packages.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ["/", "/search/?search=tomato", "/shopping/"]
+
+
+async def fetch(reader, writer, host, path):
+    """Send one keep-alive GET and read the full response, returning the status code"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+    headers = {name.lower(): value for name, value in headers.items()}
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status
+
+
+async def client(url, paths, deadline, latencies, errors):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        i = 0
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status = await fetch(reader, writer, parts.netloc, path)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                errors.append(path)
+                writer.close()
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(path)
+    finally:
+        writer.close()
+
+
+async def run(url, paths, concurrency, duration):
+    """Drive ``concurrency`` clients for ``duration`` seconds; returns (rps, p50 ms, p99 ms, errors)"""
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client(url, paths, deadline, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return 0.0, 0.0, 0.0, len(errors)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", action="append", required=True, help="label=url, e.g. asgi=http://127.0.0.1:8001")
+    parser.add_argument("--path", action="append", help=f"paths to cycle through (default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated numbers of concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per measurement")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of single-client traffic before measuring")
+    args = parser.parse_args()
+
+    targets = [target.split("=", 1) for target in args.target]
+    paths = args.path or DEFAULT_PATHS
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{'target':<10} {'clients':>8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, url in targets:
+        if args.warmup:
+            asyncio.run(run(url, paths, 1, args.warmup))
+        for level in levels:
+            rps, p50, p99, errors = asyncio.run(run(url, paths, level, args.duration))
+            print(f"{label:<10} {level:>8} {rps:>10.1f} {p50:>9.2f} {p99:>9.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
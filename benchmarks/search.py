@@ -0,0 +1,46 @@
+"""Latency of the full-text search backend against the original icontains scans.
+
+    python -m benchmarks.search --rows 1000000
+"""
+import argparse
+
+from benchmarks.common import create_benchmark_db, destroy_benchmark_db, seed, setup_django, timed
+
+QUERIES = ["tomato", "smo", "organic beans", "chese", "dairy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from inventory.models import Food
+    from inventory.search import IContainsSearchBackend, get_search_backend
+
+    old_name = create_benchmark_db()
+    try:
+        print(f"Seeding {args.rows} foods across {args.categories} categories...")
+        seed(args.rows, args.categories)
+        backends = {"icontains": IContainsSearchBackend(), "indexed": get_search_backend()}
+
+        print(f"\n{'query':<16} {'icontains ms':>13} {'hits':>5} {'indexed ms':>11} {'hits':>5} {'speedup':>8}")
+        for text in QUERIES:
+            results, hits = {}, {}
+            for label, backend in backends.items():
+                def first_page():
+                    queryset, ordering = backend.search(Food.objects.for_listing(), text)
+                    return list(queryset.order_by(*ordering)[:args.page_size])
+                results[label] = timed(first_page, args.repeat)
+                hits[label] = len(first_page())
+            print(f"{text:<16} {results['icontains']:>13.2f} {hits['icontains']:>5} "
+                  f"{results['indexed']:>11.2f} {hits['indexed']:>5} {results['icontains'] / results['indexed']:>7.1f}x")
+    finally:
+        destroy_benchmark_db(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodstorage.settings")
+# Serve the async dashboard, search and shopping views unless told otherwise
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
@@ -0,0 +1,98 @@
+"""Environment-driven DATABASES entries.
+
+``DJANGO_DB_ENGINE`` picks sqlite (the default), postgresql or mysql; the other
+``DJANGO_DB_*`` variables fill in the connection details. SQLite connections
+run in WAL mode with the pragmas below so readers never block the writer and a
+writer waits for the lock instead of failing with "database is locked". Server
+databases keep connections open between requests (``CONN_MAX_AGE`` with health
+checks) or, with ``DJANGO_DB_POOL=1`` on PostgreSQL, use a psycopg connection pool.
+
+``DJANGO_DB_REPLICAS`` lists read replicas (SQLite files, or hosts for a server
+database) that ``foodstorage.replicas.ReplicaRouter`` sends reads to.
+"""
+import copy
+import os
+from pathlib import Path
+
+ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+    "mysql": "django.db.backends.mysql",
+}
+
+# Applied on every new SQLite connection through OPTIONS["init_command"]
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative means KiB, so 64 MiB
+    "temp_store": "MEMORY",
+}
+
+DEFAULT_CONN_MAX_AGE = 60
+
+
+def database_config(default_name, environ=None, prefix="DJANGO_DB"):
+    """Build one DATABASES entry from ``{prefix}_*`` environment variables"""
+    environ = os.environ if environ is None else environ
+
+    def env(name, default=None):
+        return environ.get(f"{prefix}_{name}", default)
+
+    engine = env("ENGINE", "sqlite")
+    config = {
+        "ENGINE": ENGINES.get(engine, engine),
+        "NAME": env("NAME", default_name),
+        "CONN_MAX_AGE": int(env("CONN_MAX_AGE", DEFAULT_CONN_MAX_AGE)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+
+    if config["ENGINE"] == ENGINES["sqlite"]:
+        # A file rather than the in-memory default, whose shared cache fails concurrent writers
+        # with "table is locked" instead of waiting, so threaded tests can run
+        name = Path(config["NAME"])
+        config["TEST"] = {"NAME": env("TEST_NAME", str(name.with_name(f"test_{name.name}")))}
+        pragmas = {**SQLITE_PRAGMAS, "busy_timeout": int(env("BUSY_TIMEOUT", SQLITE_PRAGMAS["busy_timeout"]))}
+        config["OPTIONS"] = {
+            "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items()),
+            # Take the write lock when the transaction starts, so a reader never has to upgrade mid-way
+            "transaction_mode": "IMMEDIATE",
+            "timeout": pragmas["busy_timeout"] / 1000,
+        }
+        return config
+
+    config.update({
+        "USER": env("USER", ""),
+        "PASSWORD": env("PASSWORD", ""),
+        "HOST": env("HOST", "localhost"),
+        "PORT": env("PORT", ""),
+    })
+    if config["ENGINE"] == ENGINES["postgresql"] and env("POOL") == "1":
+        # The pool owns connection reuse, which Django forbids combining with CONN_MAX_AGE
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(env("POOL_MIN_SIZE", 2)),
+            "max_size": int(env("POOL_MAX_SIZE", 10)),
+        }
+    return config
+
+
+def replica_configs(primary, environ=None, prefix="DJANGO_DB"):
+    """Return ``{"replica1": ..., ...}`` for the comma-separated ``{prefix}_REPLICAS`` list"""
+    environ = os.environ if environ is None else environ
+    locations = [value.strip() for value in environ.get(f"{prefix}_REPLICAS", "").split(",") if value.strip()]
+    replicas = {}
+    for number, location in enumerate(locations, 1):
+        config = copy.deepcopy(primary)
+        # Tests run against the primary's test database instead of creating one per replica
+        config["TEST"] = {"MIRROR": "default"}
+        if config["ENGINE"] == ENGINES["sqlite"]:
+            config["NAME"] = location
+            config["OPTIONS"].pop("transaction_mode", None)
+            config["OPTIONS"]["init_command"] += ";PRAGMA query_only=ON"
+        else:
+            config["HOST"] = location
+        replicas[f"replica{number}"] = config
+    return replicas
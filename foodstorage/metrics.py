@@ -0,0 +1,251 @@
+"""Per-request latency and query metrics with a Prometheus text endpoint.
+
+With ``METRICS_ENABLED`` (``DJANGO_METRICS=1``) every request records its view
+name, wall time, SQL query count, SQL time and template render time into
+in-process histograms, which ``/metrics`` serves in the Prometheus text format.
+Requests over ``METRICS_MAX_QUERIES`` queries or ``METRICS_SLOW_REQUEST_MS``
+milliseconds are logged as warnings on the ``foodstorage.metrics`` logger.
+
+Queries are timed by a database execute wrapper and templates by the
+``TimedDjangoTemplates`` backend; both only look at the request being recorded,
+through a context variable, so they cost nothing outside of one. Each process
+keeps its own store, so scrape every worker (or run one) when serving with
+several.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.decorators import sync_and_async_middleware
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_MAX_QUERIES = 20
+METRICS_VIEW = "metrics"
+UNRESOLVED_VIEW = "<unresolved>"
+PREFIX = "foodstorage_"
+
+logger = logging.getLogger("foodstorage.metrics")
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "sql_seconds", "template_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Bucket i holds values <= buckets[i]; the extra last slot is +Inf
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsStore:
+    HISTOGRAMS = {
+        "request_duration_seconds": ("Wall time of the request.", LATENCY_BUCKETS),
+        "request_queries": ("SQL queries run by the request.", QUERY_BUCKETS),
+        "request_sql_seconds": ("Time the request spent in SQL.", LATENCY_BUCKETS),
+        "request_template_seconds": ("Time the request spent rendering templates.", LATENCY_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.HISTOGRAMS}
+            self._requests = {}
+            self._slow = {}
+
+    def record(self, view, status, values, slow=False):
+        """Add one request; ``values`` maps each histogram name to its observation"""
+        with self._lock:
+            for name, value in values.items():
+                histograms = self._histograms[name]
+                if view not in histograms:
+                    histograms[view] = Histogram(self.HISTOGRAMS[name][1])
+                histograms[view].observe(value)
+            key = (view, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if slow:
+                self._slow[view] = self._slow.get(view, 0) + 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                metric = PREFIX + name
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for view, histogram in sorted(self._histograms[name].items()):
+                    label = f'view="{_escape(view)}"'
+                    cumulative = 0
+                    for bound, count in zip((*buckets, "+Inf"), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{label}}} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+
+            lines += [f"# HELP {PREFIX}requests_total Requests by view and status.", f"# TYPE {PREFIX}requests_total counter"]
+            for (view, status), count in sorted(self._requests.items()):
+                lines.append(f'{PREFIX}requests_total{{view="{_escape(view)}",status="{status}"}} {count}')
+            lines += [
+                f"# HELP {PREFIX}slow_requests_total Requests over the query or latency threshold.",
+                f"# TYPE {PREFIX}slow_requests_total counter",
+            ]
+            for view, count in sorted(self._slow.items()):
+                lines.append(f'{PREFIX}slow_requests_total{{view="{_escape(view)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+store = MetricsStore()
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_seconds += time.perf_counter() - start
+
+
+def _instrument(connection, **kwargs):
+    # First in line, so popping a later execute_wrapper() context never removes it
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+def install():
+    """Time the queries of this thread's open connections and of every connection opened later"""
+    connection_created.connect(_instrument, dispatch_uid="foodstorage.metrics")
+    for connection in connections.all(initialized_only=True):
+        _instrument(connection)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render for the request metrics"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED_VIEW
+
+
+def _finish(request, response, metrics, start):
+    view = _view_name(request)
+    if view == METRICS_VIEW:
+        return
+    duration = time.perf_counter() - start
+    max_queries = getattr(settings, "METRICS_MAX_QUERIES", DEFAULT_MAX_QUERIES)
+    slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS)
+    exceeded = [
+        name for name, over in (("queries", metrics.queries > max_queries), ("duration", duration * 1000 > slow_ms))
+        if over
+    ]
+    store.record(view, response.status_code, {
+        "request_duration_seconds": duration,
+        "request_queries": metrics.queries,
+        "request_sql_seconds": metrics.sql_seconds,
+        "request_template_seconds": metrics.template_seconds,
+    }, slow=bool(exceeded))
+    if exceeded:
+        fields = {
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "queries": metrics.queries,
+            "sql_ms": round(metrics.sql_seconds * 1000, 1),
+            "template_ms": round(metrics.template_seconds * 1000, 1),
+            "exceeded": ",".join(exceeded),
+        }
+        logger.warning(
+            "slow request %s", " ".join(f"{name}={value}" for name, value in fields.items()),
+            extra={"metrics": fields},
+        )
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    install()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, metrics, start)
+            return response
+    else:
+        def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, metrics, start)
+            return response
+    return middleware
+
+
+def metrics_view(request):
+    if not getattr(settings, "METRICS_ENABLED", False):
+        raise Http404("Metrics are disabled.")
+    return HttpResponse(store.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,96 @@
+"""Read replica routing with read-your-writes stickiness.
+
+Inside a request, reads go to one of ``settings.DATABASE_REPLICAS`` (picked once
+per request) and writes always go to ``default``. A request is pinned to the
+primary for all of its reads when it uses an unsafe method, once it has written
+anything, and for ``REPLICA_PIN_SECONDS`` after a write through a short-lived
+cookie, so the redirect or reload that follows a change never sees stale data.
+Code running outside a request (management commands, shells, tests) reads from
+the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+
+PIN_COOKIE = "db_primary"
+DEFAULT_PIN_SECONDS = 5
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+_state = ContextVar("database_routing", default=None)
+
+
+def _replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextmanager
+def routing(pinned=False):
+    """Route reads to a replica (or the primary when ``pinned``) until the block exits"""
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = _replicas()
+        if state is None or state.pinned or not replicas:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance that was read from a replica still writes to the primary
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary
+        return False if db in _replicas() else None
+
+
+@sync_and_async_middleware
+def replica_pinning_middleware(get_response):
+    def begin(request):
+        return routing(pinned=request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES)
+
+    def finish(state, response):
+        if state.wrote and _replicas():
+            max_age = getattr(settings, "REPLICA_PIN_SECONDS", DEFAULT_PIN_SECONDS)
+            response.set_cookie(PIN_COOKIE, "1", max_age=max_age, httponly=True, samesite="Lax")
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with begin(request) as state:
+                response = await get_response(request)
+            return finish(state, response)
+    else:
+        def middleware(request):
+            with begin(request) as state:
+                response = get_response(request)
+            return finish(state, response)
+    return middleware
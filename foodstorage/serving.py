@@ -0,0 +1,55 @@
+"""Command lines for the production app servers behind ``manage.py serve``.
+
+WSGI runs under gunicorn with threaded workers: ``2 * CPUs + 1`` processes (the
+count gunicorn recommends), each with a few threads so a request blocked on
+SQLite does not idle a whole process. Live dashboard streams may take only
+``INVENTORY_LIVE_SYNC_STREAMS`` of those threads per process. ASGI runs under
+uvicorn with one process per CPU, since each event loop already overlaps its
+requests, and it holds any number of live streams without tying up a thread.
+``WEB_CONCURRENCY`` overrides either count.
+"""
+import os
+import sys
+
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+DEFAULT_THREADS = 4
+
+
+def cpu_count():
+    # Respects CPU affinity and container limits where the platform reports them
+    if hasattr(os, "process_cpu_count"):
+        return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def default_workers(asgi=False, cpus=None, environ=os.environ):
+    configured = environ.get("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    cpus = cpus or cpu_count()
+    return cpus if asgi else 2 * cpus + 1
+
+
+def server_argv(bind, workers, threads=DEFAULT_THREADS, asgi=False):
+    """The gunicorn (WSGI) or uvicorn (ASGI) command line serving the project on ``bind`` (host:port)"""
+    if asgi:
+        host, _, port = bind.rpartition(":")
+        return [
+            sys.executable, "-m", "uvicorn", "foodstorage.asgi:application",
+            "--host", host or "0.0.0.0", "--port", port, "--workers", str(workers), "--no-access-log",
+        ]
+    return [
+        sys.executable, "-m", "gunicorn", "foodstorage.wsgi",
+        "--bind", bind, "--workers", str(workers), "--threads", str(threads), "--worker-class", "gthread",
+    ]
+
+
+def pending_migrations(using="default"):
+    """Migrations not applied to ``using`` yet, in the order they would run"""
+    connection = connections[using]
+    executor = MigrationExecutor(connection)
+    return [migration for migration, _ in executor.migration_plan(executor.loader.graph.leaf_nodes())]
@@ -12,6 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from foodstorage.database import database_config, replica_configs
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,13 +23,22 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# DJANGO_PRODUCTION=1 is the serving mode of `manage.py serve` and the Docker image: DEBUG off, a cache shared
+# between worker processes and fingerprinted, precompressed static files (see foodstorage/staticfiles.py)
+PRODUCTION = os.environ.get("DJANGO_PRODUCTION") == "1"
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-jaabn#f73-ub1j7cfa6f^*9tsj_)%9#xzvdicldq6&38v_!=(!"
+# The fallback is committed to the repository, so production refuses to start on it
+if PRODUCTION and not os.environ.get("DJANGO_SECRET_KEY"):
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY when DJANGO_PRODUCTION=1.")
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY", "django-insecure-jaabn#f73-ub1j7cfa6f^*9tsj_)%9#xzvdicldq6&38v_!=(!"
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
 
 
 # Application definition
@@ -37,11 +50,16 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "rest_framework",
+    "django_filters",
     "inventory"
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Compresses what every middleware below produces; see foodstorage/compression.py
+    "foodstorage.compression.CompressionMiddleware",
+    "foodstorage.replicas.replica_pinning_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -72,14 +90,60 @@ WSGI_APPLICATION = "foodstorage.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite (db.sqlite3, WAL mode) by default; set DJANGO_DB_ENGINE and friends for a server database (see foodstorage/database.py)
 
 DATABASES = {
+    "default": database_config(BASE_DIR / "db.sqlite3"),
+}
+
+# Read replicas from DJANGO_DB_REPLICAS; reads inside a request go to them unless the request wrote (see foodstorage/replicas.py)
+
+DATABASES.update(replica_configs(DATABASES["default"]))
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+DATABASE_ROUTERS = ["foodstorage.replicas.ReplicaRouter"]
+
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# locmem by default (file in production); set DJANGO_CACHE_BACKEND=file or redis (with DJANGO_CACHE_LOCATION)
+# to share it between processes
+
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "inventory"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / ".cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+
+_cache_backend, _cache_location = CACHE_BACKENDS[
+    os.environ.get("DJANGO_CACHE_BACKEND", "file" if PRODUCTION else "locmem")
+]
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": _cache_backend,
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", _cache_location),
     }
 }
 
+# The inventory version must be seen by every process that writes, management commands included,
+# so it never lives in a per-process locmem cache
+CACHES["inventory_version"] = CACHES["default"] if _cache_backend != CACHE_BACKENDS["locmem"][0] else {
+    "BACKEND": CACHE_BACKENDS["file"][0],
+    "LOCATION": str(BASE_DIR / ".cache" / "version"),
+}
+
+# Dashboard and shopping-list results are cached per inventory version and day (see inventory/cache.py)
+
+INVENTORY_CACHE_ALIAS = "default"
+
+INVENTORY_VERSION_CACHE_ALIAS = "inventory_version"
+
+INVENTORY_CACHE_TIMEOUT = 3600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,6 +185,74 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'inventory', 'static'),
 ]
 
+# Where `collectstatic` gathers the assets that static_files_middleware serves in production
+
+STATIC_ROOT = os.environ.get("DJANGO_STATIC_ROOT", BASE_DIR / "staticfiles")
+
+if PRODUCTION:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "foodstorage.staticfiles.CompressedManifestStaticFilesStorage"},
+    }
+    # Ahead of the compression middleware, which must not re-compress the precompressed files
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("foodstorage.compression.CompressionMiddleware"),
+        "foodstorage.staticfiles.static_files_middleware",
+    )
+
+# Inventory listings
+# Keyset-paginated search results; clients may ask for up to the maximum via ?page_size=
+
+INVENTORY_PAGE_SIZE = 50
+
+INVENTORY_MAX_PAGE_SIZE = 500
+
+# Rows on one bulk edit page. Each row posts up to three fields, so a full page saves well within
+# Django's DATA_UPLOAD_MAX_NUMBER_FIELDS (1000)
+
+INVENTORY_BULK_PAGE_SIZE = 100
+
+# Full-text search backend; None picks one for the database vendor (see inventory/search.py)
+
+INVENTORY_SEARCH_BACKEND = None
+
+# Route the dashboard, search and shopping pages to inventory/async_views.py (asgi.py turns this on)
+
+INVENTORY_ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS") == "1"
+
+# Live dashboard streams one WSGI process keeps open; each holds a thread (gunicorn gets 4 from `serve`).
+# Further dashboards fall back to a snapshot refreshed every 30 seconds (see inventory/live.py)
+
+INVENTORY_LIVE_SYNC_STREAMS = 2
+
+# REST API
+# https://www.django-rest-framework.org/api-guide/settings/
+
+# JSON request bodies only: an HTML form on another site cannot send one without a CORS preflight,
+# so the unauthenticated API (exempt from CsrfViewMiddleware) cannot be driven cross-site
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "inventory.api.pagination.InventoryCursorPagination",
+    "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+}
+
+# Largest number of creates, updates and deletes accepted by one batch/ request
+
+INVENTORY_API_MAX_BATCH = 1000
+
+# Request metrics
+# Per-view latency, query and template histograms at /metrics, plus warnings for slow requests (see foodstorage/metrics.py)
+
+METRICS_ENABLED = os.environ.get("DJANGO_METRICS") == "1"
+
+METRICS_MAX_QUERIES = int(os.environ.get("DJANGO_METRICS_MAX_QUERIES", 20))
+
+METRICS_SLOW_REQUEST_MS = int(os.environ.get("DJANGO_METRICS_SLOW_REQUEST_MS", 500))
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, "foodstorage.metrics.metrics_middleware")
+    TEMPLATES[0]["BACKEND"] = "foodstorage.metrics.TimedDjangoTemplates"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
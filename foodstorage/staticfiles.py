@@ -0,0 +1,148 @@
+"""Fingerprinted, precompressed static files served straight from the app server.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` copies every
+asset to ``STATIC_ROOT`` under a content-hashed name (``styles.3f9a1c.css``)
+and writes ``.gz`` and ``.br`` variants of the text assets next to it. These
+are compressed once, at maximum level, at build time.
+
+``static_files_middleware`` serves that directory in production. It answers
+each request from an index built at startup, picks the Brotli or gzip variant
+the client accepts, and marks hashed names as cacheable for a year, since a
+changed file gets a new name. Names without a hash are revalidated. No
+reverse proxy is needed in front of the workers, and browsers fetch each
+asset version only once.
+"""
+import gzip
+import mimetypes
+import os
+from pathlib import Path
+
+import brotli
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.http import http_date
+from foodstorage.compression import re_accepts_brotli
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+# Encodings in order of preference, with the suffix of their precompressed variant
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+ACCEPTS = {"br": re_accepts_brotli, "gzip": re_accepts_gzip}
+
+
+def _compressible(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes .gz and .br copies of each text asset"""
+
+    # Below this many bytes the headers outweigh the saving
+    min_size = 200
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if _compressible(name) and self.exists(name):
+                self._write_variants(name)
+
+    def _write_variants(self, name):
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < self.min_size:
+            return
+        # mtime=0 keeps the build reproducible
+        for suffix, compressed in ((".gz", gzip.compress(data, 9, mtime=0)), (".br", brotli.compress(data))):
+            variant = path.with_name(path.name + suffix)
+            if len(compressed) < len(data):
+                variant.write_bytes(compressed)
+            elif variant.exists():
+                variant.unlink()
+
+
+class StaticFile:
+    __slots__ = ("path", "content_type", "last_modified", "variants", "immutable")
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.last_modified = int(os.stat(path).st_mtime)
+        self.variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)]
+        self.immutable = immutable
+
+
+def index_static_root(root, hashed_names=()):
+    """``{url path below STATIC_URL: StaticFile}`` for every file under ``root`` but the variants and manifest"""
+    hashed_names = set(hashed_names)
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith((".gz", ".br")) or filename == ManifestStaticFilesStorage.manifest_name:
+                continue
+            path = os.path.join(directory, filename)
+            name = Path(os.path.relpath(path, root)).as_posix()
+            files[name] = StaticFile(path, name in hashed_names)
+    return files
+
+
+def serve_static_file(request, static_file):
+    response = get_conditional_response(request, last_modified=static_file.last_modified)
+    if response is None:
+        path, encoding = static_file.path, None
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        for candidate, variant in static_file.variants:
+            if ACCEPTS[candidate].search(accept_encoding):
+                path, encoding = variant, candidate
+                break
+        # Named after the asset, not the variant, should the browser save it
+        response = FileResponse(
+            open(path, "rb"), content_type=static_file.content_type, filename=os.path.basename(static_file.path),
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if static_file.variants:
+            patch_vary_headers(response, ("Accept-Encoding",))
+    response.headers["Last-Modified"] = http_date(static_file.last_modified)
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if static_file.immutable else REVALIDATE_CACHE_CONTROL
+    )
+    return response
+
+
+def _hashed_names():
+    storage = CompressedManifestStaticFilesStorage()
+    return storage.hashed_files.values()
+
+
+@sync_and_async_middleware
+def static_files_middleware(get_response):
+    prefix = "/" + settings.STATIC_URL.strip("/") + "/"
+    files = index_static_root(settings.STATIC_ROOT, _hashed_names()) if os.path.isdir(settings.STATIC_ROOT) else {}
+
+    def lookup(request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(prefix):
+            return files.get(request.path[len(prefix):])
+        return None
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            static_file = lookup(request)
+            if static_file is not None:
+                return serve_static_file(request, static_file)
+            return await get_response(request)
+    else:
+        def middleware(request):
+            static_file = lookup(request)
+            if static_file is not None:
+                return serve_static_file(request, static_file)
+            return get_response(request)
+    return middleware
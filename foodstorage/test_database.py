@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from foodstorage.database import database_config
+
+
+class DatabaseConfigTest(SimpleTestCase):
+    def test_sqlite_defaults(self):
+        config = database_config('db.sqlite3', environ={})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], 'db.sqlite3')
+        self.assertEqual(config['TEST'], {'NAME': 'test_db.sqlite3'})
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL', config['OPTIONS']['init_command'])
+
+    def test_busy_timeout_from_environment(self):
+        config = database_config('db.sqlite3', environ={'DJANGO_DB_BUSY_TIMEOUT': '20000'})
+        self.assertIn('PRAGMA busy_timeout=20000', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['timeout'], 20)
+
+    def test_postgres_persistent_connections_and_pool(self):
+        environ = {'DJANGO_DB_ENGINE': 'postgresql', 'DJANGO_DB_NAME': 'food', 'DJANGO_DB_HOST': 'db', 'DJANGO_DB_CONN_MAX_AGE': '300'}
+        config = database_config('unused', environ=environ)
+        self.assertEqual(
+            (config['ENGINE'], config['NAME'], config['HOST'], config['CONN_MAX_AGE'], config['OPTIONS']),
+            ('django.db.backends.postgresql', 'food', 'db', 300, {}),
+        )
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+        pooled = database_config('unused', environ={**environ, 'DJANGO_DB_POOL': '1', 'DJANGO_DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20})
+
+
+class SQLitePragmaTest(TestCase):
+    def test_pragmas_are_applied_on_connect(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
@@ -0,0 +1,69 @@
+import copy
+from datetime import date
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from foodstorage.metrics import Histogram, MetricsStore, store
+from inventory.models import Category, Food
+
+TIMED_TEMPLATES = copy.deepcopy(settings.TEMPLATES)
+TIMED_TEMPLATES[0]["BACKEND"] = "foodstorage.metrics.TimedDjangoTemplates"
+
+
+class MetricsStoreTest(SimpleTestCase):
+    def test_histogram_buckets_are_inclusive_upper_bounds(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 2, 5, 6):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual((histogram.sum, histogram.count), (14, 5))
+
+    def test_render_prometheus_text(self):
+        metrics = MetricsStore()
+        metrics.record("dashboard", 200, {"request_queries": 3, "request_duration_seconds": 0.02}, slow=True)
+        text = metrics.render()
+        self.assertIn('foodstorage_request_queries_bucket{view="dashboard",le="2"} 0', text)
+        self.assertIn('foodstorage_request_queries_bucket{view="dashboard",le="5"} 1', text)
+        self.assertIn('foodstorage_request_queries_bucket{view="dashboard",le="+Inf"} 1', text)
+        self.assertIn('foodstorage_request_duration_seconds_count{view="dashboard"} 1', text)
+        self.assertIn('foodstorage_requests_total{view="dashboard",status="200"} 1', text)
+        self.assertIn('foodstorage_slow_requests_total{view="dashboard"} 1', text)
+        self.assertIn("# TYPE foodstorage_request_sql_seconds histogram", text)
+
+
+@override_settings(
+    METRICS_ENABLED=True,
+    METRICS_MAX_QUERIES=1,
+    MIDDLEWARE=["foodstorage.metrics.metrics_middleware", *settings.MIDDLEWARE],
+    TEMPLATES=TIMED_TEMPLATES,
+)
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        store.reset()
+        dairy = Category.objects.create(name="Dairy", unit="liters", ideal_quantity=10)
+        Food.objects.create(name="Milk", category=dairy, quantity=2, best_before=date(2030, 1, 1))
+
+    def test_records_queries_and_templates_per_view(self):
+        with self.assertLogs("foodstorage.metrics", "WARNING") as logs:
+            self.client.get("/search/", {"search": "milk"})
+        self.assertIn("slow request view=search method=GET path=/search/ status=200", logs.output[0])
+        self.assertTrue(logs.output[0].endswith("exceeded=queries"))
+        record = logs.records[0].metrics
+        self.assertGreater(record["queries"], 1)
+        self.assertGreater(record["template_ms"], 0)
+
+        text = self.client.get("/metrics").content.decode()
+        self.assertIn('foodstorage_requests_total{view="search",status="200"} 1', text)
+        self.assertIn('foodstorage_slow_requests_total{view="search"} 1', text)
+        self.assertIn('foodstorage_request_template_seconds_count{view="search"} 1', text)
+        # The endpoint does not record itself
+        self.assertNotIn('view="metrics"', text)
+
+    @override_settings(METRICS_MAX_QUERIES=100)
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs("foodstorage.metrics", "WARNING"):
+            self.client.get("/api/v1/shopping-list/")
+        self.assertIn('foodstorage_requests_total{view="api-shopping-list",status="200"} 1', store.render())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_endpoint_is_hidden_when_disabled(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
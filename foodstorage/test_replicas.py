@@ -0,0 +1,73 @@
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from foodstorage.database import database_config, replica_configs
+from foodstorage.replicas import PIN_COOKIE, replica_pinning_middleware
+from inventory.models import Food
+
+
+class ReplicaConfigTest(SimpleTestCase):
+    def test_sqlite_replicas_are_read_only_mirrors(self):
+        primary = database_config('primary.sqlite3', environ={})
+        replicas = replica_configs(primary, environ={'DJANGO_DB_REPLICAS': 'replica1.sqlite3, replica2.sqlite3'})
+        self.assertEqual(list(replicas), ['replica1', 'replica2'])
+        replica = replicas['replica2']
+        self.assertEqual(replica['NAME'], 'replica2.sqlite3')
+        self.assertEqual(replica['TEST'], {'MIRROR': 'default'})
+        self.assertTrue(replica['OPTIONS']['init_command'].endswith('PRAGMA query_only=ON'))
+        self.assertNotIn('transaction_mode', replica['OPTIONS'])
+        self.assertIn('transaction_mode', primary['OPTIONS'])
+
+    def test_server_replicas_change_host(self):
+        primary = database_config('unused', environ={'DJANGO_DB_ENGINE': 'postgresql', 'DJANGO_DB_NAME': 'food'})
+        replicas = replica_configs(primary, environ={'DJANGO_DB_REPLICAS': 'replica.internal'})
+        self.assertEqual((replicas['replica1']['HOST'], replicas['replica1']['NAME']), ('replica.internal', 'food'))
+
+    def test_no_replicas_by_default(self):
+        self.assertEqual(replica_configs(database_config('db.sqlite3', environ={}), environ={}), {})
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Routing decisions only; no query is sent to the (unconfigured) replica alias"""
+
+    def request(self, method='get', write=False, cookies=None):
+        seen = {}
+
+        def view(request):
+            seen['before'] = router.db_for_read(Food)
+            if write:
+                router.db_for_write(Food)
+            seen['after'] = router.db_for_read(Food)
+            return HttpResponse()
+
+        factory = RequestFactory()
+        for name, value in (cookies or {}).items():
+            factory.cookies[name] = value
+        response = replica_pinning_middleware(view)(getattr(factory, method)('/'))
+        return seen, response
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(router.db_for_read(Food), 'default')
+
+    def test_safe_requests_read_from_a_replica(self):
+        seen, response = self.request()
+        self.assertEqual(seen, {'before': 'replica1', 'after': 'replica1'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        seen, response = self.request(write=True)
+        self.assertEqual(seen, {'before': 'replica1', 'after': 'default'})
+        self.assertEqual(router.db_for_write(Food), 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        seen, _ = self.request(cookies={PIN_COOKIE: '1'})
+        self.assertEqual(seen['before'], 'default')
+
+    def test_unsafe_methods_read_from_the_primary(self):
+        seen, _ = self.request(method='post')
+        self.assertEqual(seen['before'], 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica1', 'inventory'))
+        self.assertTrue(router.allow_migrate('default', 'inventory'))
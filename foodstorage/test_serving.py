@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from foodstorage.serving import default_workers, pending_migrations, server_argv
+from foodstorage.staticfiles import CompressedManifestStaticFilesStorage, static_files_middleware
+
+MANIFEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "foodstorage.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+
+
+class ServerCommandTest(SimpleTestCase):
+    def test_worker_counts_follow_the_cpus(self):
+        self.assertEqual(default_workers(cpus=4, environ={}), 9)
+        self.assertEqual(default_workers(asgi=True, cpus=4, environ={}), 4)
+        self.assertEqual(default_workers(cpus=4, environ={"WEB_CONCURRENCY": "2"}), 2)
+
+    def test_argv(self):
+        self.assertEqual(
+            server_argv("0.0.0.0:8000", 9)[2:],
+            ["gunicorn", "foodstorage.wsgi", "--bind", "0.0.0.0:8000", "--workers", "9", "--threads", "4",
+             "--worker-class", "gthread"],
+        )
+        argv = server_argv("127.0.0.1:8001", 4, asgi=True)
+        self.assertEqual(argv[2:4], ["uvicorn", "foodstorage.asgi:application"])
+        self.assertIn("--workers", argv)
+        self.assertEqual(argv[argv.index("--host") + 1], "127.0.0.1")
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    def load_settings(self, **environ):
+        env = {key: value for key, value in os.environ.items() if not key.startswith("DJANGO_")}
+        return subprocess.run(
+            [sys.executable, "-c", "import foodstorage.settings"],
+            env={**env, **environ}, capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent,
+        )
+
+    def test_production_needs_a_secret_key(self):
+        result = self.load_settings(DJANGO_PRODUCTION="1")
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Set DJANGO_SECRET_KEY", result.stderr)
+        self.assertEqual(self.load_settings(DJANGO_PRODUCTION="1", DJANGO_SECRET_KEY="x").returncode, 0)
+        self.assertEqual(self.load_settings().returncode, 0)
+
+
+class MigrationCheckTest(TestCase):
+    def test_migrated_test_database_has_nothing_pending(self):
+        self.assertEqual(pending_migrations(), [])
+
+
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Collected once: compressing every admin asset at the highest levels takes a while
+        cls.root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.root.cleanup)
+        settings = override_settings(STATIC_ROOT=cls.root.name, STORAGES=MANIFEST_STORAGES)
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        cls.css = CompressedManifestStaticFilesStorage().stored_name("inventory/css/styles.css")
+        cls.middleware = staticmethod(static_files_middleware(lambda request: HttpResponse("not static")))
+
+    def get(self, path, **headers):
+        return self.middleware(RequestFactory().get(path, **headers))
+
+    def test_collectstatic_writes_compressed_variants(self):
+        css = Path(self.root.name, self.css)
+        self.assertRegex(css.name, r"^styles\.[0-9a-f]{12}\.css$")
+        self.assertLess(css.with_name(css.name + ".br").stat().st_size, css.stat().st_size)
+        self.assertTrue(css.with_name(css.name + ".gz").exists())
+        # Images are not worth compressing
+        self.assertFalse(any(name.endswith(".png.gz") for _, _, names in os.walk(self.root.name) for name in names))
+
+    def test_serves_variants_with_far_future_caching(self):
+        response = self.get(f"/static/{self.css}", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.get(f"/static/{self.css}", HTTP_ACCEPT_ENCODING="gzip")["Content-Encoding"], "gzip")
+        self.assertFalse(self.get(f"/static/{self.css}").has_header("Content-Encoding"))
+        response.close()
+
+        # Unhashed names may change in place, so they are revalidated
+        response = self.get("/static/inventory/css/styles.css")
+        self.assertIn("must-revalidate", response["Cache-Control"])
+        self.assertEqual(
+            self.get("/static/inventory/css/styles.css", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code,
+            304,
+        )
+        self.assertEqual(self.get("/static/missing.css").content, b"not static")
+        self.assertEqual(self.get("/static/staticfiles.json").content, b"not static")
@@ -17,8 +17,11 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from foodstorage.metrics import METRICS_VIEW, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name=METRICS_VIEW),
+    path("api/v1/", include("inventory.api.urls")),
     path('', include('inventory.urls')),
 ]
@@ -1,40 +1,108 @@
 from django.contrib import admin
-from inventory.models import Food, Category
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from datetime import date
+from inventory.models import ExpiryBucket, Food, Category, expiry_bucket_filter
+from inventory.pagination import EstimatedCountPaginator
+from inventory.search import search_foods
 # Register your models here.
 
+
+class ExpiryBucketFilter(admin.SimpleListFilter):
+    title = 'expiry status'
+    parameter_name = 'expiry'
+
+    def lookups(self, request, model_admin):
+        return [(str(value), label) for value, label in ExpiryBucket.choices]
+
+    def queryset(self, request, queryset):
+        if self.value() in {str(value) for value in ExpiryBucket.values}:
+            # A best before range rather than the annotated bucket, so the index is used
+            return queryset.filter(**expiry_bucket_filter('best_before', int(self.value()), date.today()))
+        return queryset
+
+
+class CategoryFilter(admin.SimpleListFilter):
+    """The categories holding the most foods, plus the selected one; the rest are reached through search"""
+    title = 'category'
+    parameter_name = 'category'
+    limit = 20
+
+    def lookups(self, request, model_admin):
+        categories = list(Category.objects.order_by('-food_count', 'name').values_list('pk', 'name')[:self.limit])
+        if self.value() and self.value().isdigit() and int(self.value()) not in {pk for pk, _ in categories}:
+            categories += Category.objects.filter(pk=self.value()).values_list('pk', 'name')
+        return [(str(pk), name) for pk, name in categories]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(category_id=self.value())
+        return queryset
+
+
+EXPIRY_LABELS = {
+    ExpiryBucket.EXPIRED: "🚨 Expired",
+    ExpiryBucket.TODAY: "⚠️ Expires Today",
+    ExpiryBucket.FRESH: "✅ Fresh",
+}
+
+
 @admin.register(Food)
 class FoodItemAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'quantity', 'best_before', 'expiry_status']
-    list_filter = ['category', 'best_before']
-    search_fields = ['name', 'brand', 'notes']
+    list_filter = [ExpiryBucketFilter, CategoryFilter, 'best_before']
+    list_select_related = ['category']
+    search_fields = ['name']
+    autocomplete_fields = ['category']
     readonly_fields = ['days_until_expiry', 'is_expired', 'expiry_status']
-    date_hierarchy = 'best_before'
-    
+    # The changelist must not count millions of rows on every page view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     def expiry_status(self, obj):
-        status = obj.expiry_status
-        if "Expired" in status:
-            return f"🚨 {status}"
-        elif "Today" in status or "day" in status:
-            return f"⚠️ {status}"
-        else:
-            return f"✅ {status}"
+        bucket = getattr(obj, 'expiry_bucket', None)
+        if bucket is None:
+            # The change form's object is not annotated
+            return obj.expiry_status
+        # Only expiring-soon rows need their day count
+        return EXPIRY_LABELS.get(bucket) or f"⚠️ {obj.expiry_status}"
     expiry_status.short_description = 'Expiry Status'
-    
+    # Buckets follow best before order, which the index serves
+    expiry_status.admin_order_field = 'best_before'
+
     def get_queryset(self, request):
-        """Order by expiry date by default"""
+        """Order by expiry date by default, with the SQL expiry bucket to filter and sort on"""
         qs = super().get_queryset(request)
-        return qs.order_by('best_before')
+        return qs.with_expiry(date.today()).order_by('best_before')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text backend instead of LIKE scans over every row"""
+        if not search_term.strip():
+            return queryset, False
+        queryset, _ = search_foods(queryset, search_term)
+        return queryset, False
+
 
 @admin.register(Category)
 class FoodCategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'ideal_quantity', 'current_quantity', 'quantity_difference', 'is_low_stock']
-    # list_filter = ['created_at', 'updated_at']
-    search_fields = ['name', 'description']
-    readonly_fields = ['current_quantity', 'quantity_difference', 'is_low_stock']
+    list_display = [
+        'name', 'ideal_quantity', 'current_quantity', 'food_count', 'quantity_difference', 'is_low_stock',
+    ]
+    list_filter = ['unit']
+    search_fields = ['name']
+    readonly_fields = ['current_quantity', 'food_count', 'quantity_difference', 'is_low_stock']
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Annotate the stock difference and low-stock flag so they can be sorted in SQL"""
+        qs = super().get_queryset(request)
+        return qs.with_stock().annotate(
+            low_stock=ExpressionWrapper(Q(current_quantity__lt=F('ideal_quantity')), output_field=BooleanField()),
+        )
     
     def current_quantity(self, obj):
         return obj.current_quantity
     current_quantity.short_description = 'Current Stock'
+    current_quantity.admin_order_field = 'current_quantity'
     
     def quantity_difference(self, obj):
         diff = obj.quantity_difference
@@ -45,3 +113,8 @@ class FoodCategoryAdmin(admin.ModelAdmin):
         else:
             return f"+{diff} (Overstocked)"
     quantity_difference.short_description = 'Stock Status'
+    quantity_difference.admin_order_field = 'stock_difference'
+
+    @admin.display(boolean=True, description='Low Stock', ordering='low_stock')
+    def is_low_stock(self, obj):
+        return obj.is_low_stock
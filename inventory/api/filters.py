@@ -0,0 +1,29 @@
+import django_filters
+from django.db.models import F
+from inventory.models import Category, Food
+
+
+class CategoryFilter(django_filters.FilterSet):
+    name = django_filters.CharFilter(lookup_expr='icontains')
+    low_stock = django_filters.BooleanFilter(method='filter_low_stock')
+
+    class Meta:
+        model = Category
+        fields = ['name', 'unit', 'low_stock']
+
+    def filter_low_stock(self, queryset, name, value):
+        below = {'current_quantity__lt': F('ideal_quantity')}
+        return queryset.filter(**below) if value else queryset.exclude(**below)
+
+
+class FoodFilter(django_filters.FilterSet):
+    name = django_filters.CharFilter(lookup_expr='icontains')
+    category_name = django_filters.CharFilter(field_name='category__name', lookup_expr='iexact')
+
+    class Meta:
+        model = Food
+        fields = {
+            'category': ['exact'],
+            'best_before': ['exact', 'lte', 'gte'],
+            'quantity': ['lte', 'gte'],
+        }
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from inventory.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class InventoryCursorPagination(CursorPagination):
+    """Opaque ``?cursor=`` seek pagination on the primary key, sized like the search page"""
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'INVENTORY_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+        self.max_page_size = getattr(settings, 'INVENTORY_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
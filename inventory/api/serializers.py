@@ -0,0 +1,96 @@
+from datetime import date
+from rest_framework import serializers
+from inventory.consumption import EXHAUSTED_ACTIONS
+from inventory.models import Category, Food
+
+
+class FieldSelectionMixin:
+    """Drop every field not named in the ``fields`` context entry (from ``?fields=a,b``)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+# Marks names claimed by earlier creates in the same batch
+_PENDING = object()
+
+
+class CategorySerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    quantity_difference = serializers.FloatField(read_only=True)
+    is_low_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'unit', 'ideal_quantity', 'current_quantity', 'food_count', 'quantity_difference', 'is_low_stock']
+        read_only_fields = ['current_quantity', 'food_count']
+
+    def validate_ideal_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Ideal quantity must be greater than zero.')
+        return value
+
+    def validate_name(self, value):
+        names = self.context.get('category_names')
+        if names is not None:
+            owner = names.get(value.lower())
+            taken = owner is not None and owner != getattr(self.instance, 'pk', None)
+            if not taken:
+                names[value.lower()] = getattr(self.instance, 'pk', _PENDING)
+        else:
+            others = Category.objects.filter(name__iexact=value)
+            if self.instance is not None:
+                others = others.exclude(pk=self.instance.pk)
+            taken = others.exists()
+        if taken:
+            raise serializers.ValidationError('Category name must be unique (case-insensitive).')
+        return value
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """Resolves categories from the ``categories`` context map when a batch preloaded them"""
+
+    def to_internal_value(self, data):
+        categories = self.context.get('categories')
+        if categories is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return categories[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail('does_not_exist', pk_value=data)
+
+
+class FoodSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    category = CategoryField(queryset=Category.objects.all())
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    unit = serializers.CharField(source='category.unit', read_only=True)
+    expiry_status = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Food
+        fields = ['id', 'name', 'category', 'category_name', 'unit', 'quantity', 'best_before', 'expiry_status']
+
+    def validate_quantity(self, value):
+        if value < 0:
+            raise serializers.ValidationError('Quantity must be non-negative.')
+        return value
+
+    def validate_best_before(self, value):
+        if value < date.today():
+            raise serializers.ValidationError('Best before date cannot be in the past.')
+        return value
+
+
+class ConsumeSerializer(serializers.Serializer):
+    quantity = serializers.FloatField()
+    exhausted = serializers.ChoiceField(choices=EXHAUSTED_ACTIONS, default='delete')
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Quantity must be a positive number.')
+        return value
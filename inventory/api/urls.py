@@ -0,0 +1,14 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from inventory.api import views
+
+router = DefaultRouter()
+router.register('categories', views.CategoryViewSet)
+router.register('foods', views.FoodViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('stock-summary/', views.stock_summary_view, name='api-stock-summary'),
+    path('shopping-list/', views.shopping_list_view, name='api-shopping-list'),
+    path('stock-trend/', views.stock_trend_view, name='api-stock-trend'),
+]
@@ -0,0 +1,245 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from inventory.api.filters import CategoryFilter, FoodFilter
+from inventory.api.serializers import CategorySerializer, ConsumeSerializer, FoodSerializer
+from inventory.cache import cached
+from inventory.consumption import InsufficientStock, consume_category, consume_food
+from inventory.history import PERIODS, stock_trend
+from inventory.models import Category, Food
+from inventory.stock import forecast_shopping_list, shopping_list, stock_summary
+
+DEFAULT_MAX_BATCH = 1000
+INVALID_ID = 'A valid integer is required.'
+
+
+def _is_id(value):
+    """True for a JSON integer that fits a primary key column (booleans are ints in Python, but not ids)"""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= BigIntegerField.MAX_BIGINT
+
+
+def _parse_id(value):
+    """``value`` as a primary key if it is an id or a string of ASCII digits holding one, else None"""
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    return value if _is_id(value) else None
+
+
+class FieldSelectionViewSetMixin:
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.request.query_params.get('fields') if self.request else None
+        if fields:
+            context['fields'] = [name.strip() for name in fields.split(',') if name.strip()]
+        return context
+
+
+class BatchMixin:
+    """POST ``{"create": [...], "update": [{"id": ..}, ...], "delete": [ids]}`` to ``batch/``
+
+    Everything is validated first and then applied in one transaction with
+    bulk_create, bulk_update and a single DELETE, or nothing is applied at all.
+    """
+
+    def get_batch_context(self, creates, updates):
+        return {}
+
+    def get_batch_delete_errors(self, pks):
+        return None
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'Expected an object of create, update and delete lists.'}, status=status.HTTP_400_BAD_REQUEST)
+        creates = request.data.get('create', [])
+        updates = request.data.get('update', [])
+        deletes = request.data.get('delete', [])
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            return Response({'detail': 'create, update and delete must be lists.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_batch = getattr(settings, 'INVENTORY_API_MAX_BATCH', DEFAULT_MAX_BATCH)
+        if len(creates) + len(updates) + len(deletes) > max_batch:
+            return Response({'detail': f'A batch may hold at most {max_batch} changes.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        serializer_class = self.get_serializer_class()
+        context = {**self.get_serializer_context(), **self.get_batch_context(creates, updates)}
+        # Ids are checked before any query sees them, so a malformed one is a 400 for its item rather than a 500
+        update_ids = [item.get('id') if isinstance(item, dict) else None for item in updates]
+        instances = model.objects.in_bulk([pk for pk in update_ids if _is_id(pk)])
+
+        errors = {}
+        create_serializers = [serializer_class(data=item, context=context) for item in creates]
+        update_serializers = []
+        for item, pk in zip(updates, update_ids):
+            instance = instances.get(pk) if _is_id(pk) else None
+            update_serializers.append(serializer_class(instance, data=item, partial=True, context=context))
+        for key, serializers in (('create', create_serializers), ('update', update_serializers)):
+            item_errors = []
+            for pk, serializer in zip(update_ids if key == 'update' else creates, serializers):
+                if key == 'update' and not _is_id(pk):
+                    item_errors.append({'id': [INVALID_ID]})
+                elif key == 'update' and serializer.instance is None:
+                    item_errors.append({'id': ['No such object.']})
+                else:
+                    item_errors.append({} if serializer.is_valid() else serializer.errors)
+            if any(item_errors):
+                errors[key] = item_errors
+        if not all(_is_id(pk) for pk in deletes):
+            errors['delete'] = [{} if _is_id(pk) else {'id': [INVALID_ID]} for pk in deletes]
+        else:
+            delete_errors = self.get_batch_delete_errors(deletes)
+            if delete_errors:
+                errors['delete'] = delete_errors
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            created = model.objects.bulk_create([model(**s.validated_data) for s in create_serializers])
+            changed_fields = set()
+            for serializer in update_serializers:
+                for field, value in serializer.validated_data.items():
+                    setattr(serializer.instance, field, value)
+                    changed_fields.add(field)
+            updated = [serializer.instance for serializer in update_serializers]
+            if changed_fields:
+                model.objects.bulk_update(updated, sorted(changed_fields))
+            deleted = model.objects.filter(pk__in=deletes).delete()[0] if deletes else 0
+
+        return Response({
+            'created': serializer_class(created, many=True, context=context).data,
+            'updated': serializer_class(updated, many=True, context=context).data,
+            'deleted': deleted,
+        })
+
+
+class CategoryViewSet(FieldSelectionViewSetMixin, BatchMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    filterset_class = CategoryFilter
+
+    def get_batch_context(self, creates, updates):
+        # Check name uniqueness for the whole batch against one preloaded map
+        names = {name.lower(): pk for pk, name in Category.objects.values_list('pk', 'name')}
+        return {'category_names': names}
+
+    def get_batch_delete_errors(self, pks):
+        if Category.objects.filter(pk__in=pks, food_count__gt=0).exists():
+            return ['Cannot delete category with associated food items.']
+        return None
+
+    @action(detail=True, methods=['post'])
+    def consume(self, request, pk=None):
+        """POST ``{"quantity": x, "exhausted": "delete"|"zero"}``: take x from the lots, soonest best before first"""
+        category = self.get_object()
+        serializer = ConsumeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            taken = consume_category(category.pk, serializer.validated_data['quantity'], serializer.validated_data['exhausted'])
+        except InsufficientStock as exc:
+            return Response({'detail': str(exc), 'available': exc.available}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'consumed': serializer.validated_data['quantity'],
+            'lots': [{'id': pk, 'taken': take, 'remaining': left} for pk, take, left in taken],
+        })
+
+    def perform_destroy(self, instance):
+        # Same rule as the category page: never cascade into food items
+        if instance.foods.exists():
+            raise ValidationError({'detail': 'Cannot delete category with associated food items.'})
+        instance.delete()
+
+
+class FoodViewSet(FieldSelectionViewSetMixin, BatchMixin, viewsets.ModelViewSet):
+    queryset = Food.objects.select_related('category')
+    serializer_class = FoodSerializer
+    filterset_class = FoodFilter
+
+    def get_batch_context(self, creates, updates):
+        # Malformed or out of range ids stay out of the query; CategoryField reports them per item
+        category_ids = [_parse_id(item.get('category')) for item in creates + updates if isinstance(item, dict)]
+        return {'categories': Category.objects.in_bulk([pk for pk in category_ids if pk is not None])}
+
+    @action(detail=True, methods=['post'])
+    def consume(self, request, pk=None):
+        """POST ``{"quantity": x}``: one guarded UPDATE, never below zero"""
+        pk = _parse_id(pk)
+        if pk is None:
+            raise NotFound()
+        serializer = ConsumeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            consume_food(pk, serializer.validated_data['quantity'])
+        except Food.DoesNotExist:
+            raise NotFound()
+        except InsufficientStock as exc:
+            return Response({'detail': str(exc), 'available': exc.available}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+@api_view(['GET'])
+def stock_summary_view(request):
+    summary = cached('stock_summary', stock_summary)
+    return Response({
+        'total_categories': summary['total_categories'],
+        'total_food_items': summary['total_food_items'],
+        'num_categories_below_ideal': summary['num_categories_below_ideal'],
+        'expiring_soon': [
+            {'category': item['category__name'], 'count': item['count']} for item in summary['expiring_soon_summary']
+        ],
+        'low_stock': [
+            {
+                'category': item['category'].pk,
+                'category_name': item['category'].name,
+                'unit': item['unit'],
+                'current_quantity': item['current_quantity'],
+                'ideal_quantity': item['ideal_quantity'],
+                'quantity_needed': item['quantity_needed'],
+            }
+            for item in summary['low_stock_categories']
+        ],
+        'chart': {
+            'labels': summary['chart_labels'],
+            'current': summary['chart_current'],
+            'ideal': summary['chart_ideal'],
+        },
+    })
+
+
+@api_view(['GET'])
+def shopping_list_view(request):
+    """``?order=stockout`` ranks by projected days until stockout using the consumption forecast"""
+    if request.query_params.get('order') == 'stockout':
+        return Response(cached('shopping_forecast', forecast_shopping_list))
+    return Response(cached('shopping_list', shopping_list))
+
+
+DEFAULT_TREND_DAYS = 90
+# Ten years: snapshots are never pruned, but a longer window would only be empty (and timedelta overflows)
+MAX_TREND_DAYS = 3660
+
+
+@api_view(['GET'])
+def stock_trend_view(request):
+    """Closing stock and consumption per category from the rolled-up snapshots
+
+    ``?period=day|week`` (default day), ``?days=`` of history (default 90, at most
+    3660) and an optional comma-separated ``?category=`` id list.
+    """
+    period = request.query_params.get('period', 'day')
+    if period not in PERIODS:
+        raise ValidationError({'period': f'Must be one of {", ".join(PERIODS)}.'})
+    days = request.query_params.get('days', str(DEFAULT_TREND_DAYS))
+    if not (days.isascii() and days.isdigit()) or not 1 <= int(days) <= MAX_TREND_DAYS:
+        raise ValidationError({'days': f'Must be a whole number from 1 to {MAX_TREND_DAYS}.'})
+    categories = [_parse_id(value.strip()) for value in request.query_params.get('category', '').split(',') if value.strip()]
+    if None in categories:
+        raise ValidationError({'category': 'Must be a comma-separated list of category ids.'})
+
+    since = timezone.localdate() - timedelta(days=int(days))
+    return Response(stock_trend(period, since, categories))
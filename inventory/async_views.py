@@ -0,0 +1,70 @@
+"""Async versions of the read-heavy pages, served when ``INVENTORY_ASYNC_VIEWS`` is on.
+
+They render the same templates as ``inventory.views`` but await the async ORM,
+so under ASGI a request waiting on the database does not tie up a worker thread.
+Django still runs each request's queries on that request's database thread, so
+``asyncio.gather`` overlaps the awaiting rather than the SQL itself.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from inventory.cache import acached
+from inventory.conditional import condition_on_inventory
+from inventory.models import Food
+from inventory.pagination import apaginate_keyset
+from inventory.search import filter_foods
+from inventory.stock import ashopping_list, astock_summary, forecast_shopping_list
+from inventory.views import _page_url, _shopping_order
+
+
+@condition_on_inventory
+async def dashboard(request):
+    context = await acached('stock_summary', astock_summary)
+    return render(request, 'inventory/dashboard.html', context)
+
+
+@condition_on_inventory
+async def search_view(request, slug=None):
+    search = request.GET.get('search', '').strip()
+    message = "items fetched successfully"
+    # The SQLite backend probes the FTS vocabulary with a raw cursor while building the query
+    food_items, ordering, error_message = await sync_to_async(filter_foods)(Food.objects.for_listing(), slug, search)
+    if error_message:
+        message = error_message
+        empty_message = None
+    elif slug == "category":
+        empty_message = "No food items found for this category."
+    elif slug == "best_before_date":
+        empty_message = None
+    else:
+        empty_message = "No food items found matching your search criteria."
+
+    if request.GET.get('count') == '1':
+        page, item_count = await asyncio.gather(
+            apaginate_keyset(food_items, ordering, request.GET), food_items.acount(),
+        )
+    else:
+        page = await apaginate_keyset(food_items, ordering, request.GET)
+        item_count = len(page.items) if page.is_complete else None
+    if not page.items and empty_message:
+        message = empty_message
+
+    return render(request, 'inventory/search.html', {
+        'items': page.items,
+        'item_count': item_count,
+        'message': message,
+        'next_url': _page_url(request, 'after', page.next_cursor),
+        'previous_url': _page_url(request, 'before', page.previous_cursor),
+    })
+
+
+@condition_on_inventory
+async def shopping_view(request):
+    order = _shopping_order(request)
+    if order == 'stockout':
+        shopping_items = await acached('shopping_forecast', sync_to_async(forecast_shopping_list))
+    else:
+        shopping_items = await acached('shopping_list', ashopping_list)
+    return render(request, 'inventory/shopping.html', {
+        'shopping_items': shopping_items, 'item_count': len(shopping_items), 'order': order,
+    })
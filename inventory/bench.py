@@ -0,0 +1,112 @@
+"""Timings and query counts for every page, API endpoint and model property.
+
+Each case is run ``repeat`` times against whatever the default database
+holds; the result records the median wall time and the number of SQL queries
+of one run. The cache is cleared before every run so cached pages are measured
+cold. ``compare`` lines two result sets up case by case, so a change can be
+checked against the numbers of the commit before it.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from inventory.forecast import forecast
+from inventory.models import Category, Food
+from inventory.stock import shopping_list, stock_summary
+
+# Property cases read this many rows, so their cost stays comparable across scales
+PROPERTY_ROWS = 1000
+
+PAGES = {
+    'dashboard': ('/', {}),
+    'search': ('/search/', {'search': 'milk'}),
+    'search_by_category': ('/search/category', {'search': 'dairy'}),
+    'search_by_best_before': ('/search/best_before_date', {'search': str(date.today() + timedelta(days=7))}),
+    'shopping': ('/shopping/', {}),
+    'shopping_by_stockout': ('/shopping/', {'order': 'stockout'}),
+    'category_page': ('/category/', {'action': 'modify'}),
+    'food_bulk_edit': ('/food/', {'action': 'bulk'}),
+    'api_foods': ('/api/v1/foods/', {}),
+    'api_categories': ('/api/v1/categories/', {}),
+    'api_stock_summary': ('/api/v1/stock-summary/', {}),
+    'api_shopping_list': ('/api/v1/shopping-list/', {}),
+    'api_stock_trend': ('/api/v1/stock-trend/', {}),
+}
+
+
+def _page(path, params):
+    def run(client):
+        response = client.get(path, params)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} answered {response.status_code}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return run
+
+
+def _food_properties(client):
+    for food in Food.objects.order_by('pk')[:PROPERTY_ROWS]:
+        food.days_until_expiry, food.is_expired, food.is_expiring_soon, food.expiry_status
+
+
+def _category_properties(client):
+    for category in Category.objects.order_by('pk')[:PROPERTY_ROWS]:
+        category.quantity_difference, category.is_low_stock
+
+
+CASES = {
+    **{name: _page(path, params) for name, (path, params) in PAGES.items()},
+    'food_properties': _food_properties,
+    'category_properties': _category_properties,
+    'stock_summary': lambda client: stock_summary(),
+    'shopping_list': lambda client: shopping_list(),
+    'forecast': lambda client: forecast(),
+}
+
+
+class _QueryCounter:
+    # An execute wrapper rather than connection.queries, which every request resets
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_case(case, client, repeat):
+    """``{'median_ms', 'queries'}`` of ``repeat`` cold runs of one case"""
+    samples = []
+    for _ in range(repeat):
+        cache.clear()
+        queries = _QueryCounter()
+        with connection.execute_wrapper(queries):
+            start = time.perf_counter()
+            case(client)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(samples), 3), 'queries': queries.count}
+
+
+def run_cases(repeat=5, names=None):
+    """``{case name: {'median_ms', 'queries'}}`` for ``names`` (default every case)"""
+    client = Client()
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        return {name: run_case(CASES[name], client, repeat) for name in names or CASES}
+
+
+def compare(before, after):
+    """Rows of ``(scale, case, ms before, ms after, ratio, queries before, queries after)``"""
+    rows = []
+    for scale, result in after.items():
+        old_cases = before.get(scale, {}).get('cases', {})
+        for name, new in result['cases'].items():
+            old = old_cases.get(name)
+            if old is None:
+                rows.append((scale, name, None, new['median_ms'], None, None, new['queries']))
+                continue
+            ratio = new['median_ms'] / old['median_ms'] if old['median_ms'] else None
+            rows.append((scale, name, old['median_ms'], new['median_ms'], ratio, old['queries'], new['queries']))
+    return rows
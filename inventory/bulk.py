@@ -0,0 +1,107 @@
+"""Multi-row food edits for the bulk mode of the food page.
+
+Shared actions touch every selected row with a single ``UPDATE``/``DELETE ...
+WHERE id IN (...)``; per-row edits are validated together and written with
+``bulk_update``. Each call runs in one transaction and applies all or nothing.
+"""
+from datetime import date
+from django.db import transaction
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Greatest
+from inventory.models import Category, Food
+
+ACTIONS = ('save', 'delete', 'move', 'adjust')
+ROW_FIELDS = ('quantity', 'best_before')
+BATCH_SIZE = 500
+
+
+def _is_id(value):
+    """True for a string of ASCII digits that fits a primary key column ('²' passes str.isdigit(), not int())"""
+    value = str(value)
+    return value.isascii() and value.isdigit() and 0 < int(value) <= BigIntegerField.MAX_BIGINT
+
+
+def parse_ids(values):
+    return [int(value) for value in values if _is_id(value)]
+
+
+def rows_from_post(data):
+    """Collect ``{food id: {field: value}}`` from ``quantity-<id>`` / ``best_before-<id>`` inputs"""
+    rows = {}
+    for key, value in data.items():
+        field, _, pk = key.rpartition('-')
+        if field in ROW_FIELDS and _is_id(pk):
+            rows.setdefault(int(pk), {})[field] = value.strip()
+    return rows
+
+
+def delete_foods(ids):
+    with transaction.atomic():
+        deleted, _ = Food.objects.filter(pk__in=ids).delete()
+    return deleted
+
+
+def move_foods(ids, category_id):
+    if not _is_id(category_id or '') or not Category.objects.filter(pk=category_id).exists():
+        raise ValueError('Please select a category.')
+    return Food.objects.filter(pk__in=ids).update(category_id=int(category_id))
+
+
+def adjust_foods(ids, delta):
+    """Add ``delta`` to every selected quantity, never going below zero"""
+    try:
+        delta = float(delta)
+    except (TypeError, ValueError):
+        raise ValueError('Quantity change must be a number.')
+    return Food.objects.filter(pk__in=ids).update(quantity=Greatest(F('quantity') + delta, Value(0.0)))
+
+
+def save_rows(rows, today=None):
+    """Validate per-row edits with the food form rules and write the changed rows
+
+    Returns ``(number of rows updated, {food id: error message})``; nothing is
+    written when any row is invalid.
+    """
+    today = today or date.today()
+    foods = Food.objects.in_bulk(list(rows))
+    changed, fields, errors = [], set(), {}
+    for pk, values in rows.items():
+        food = foods.get(pk)
+        if food is None:
+            errors[pk] = 'Food item no longer exists.'
+            continue
+        row_changed = False
+        try:
+            if 'quantity' in values:
+                quantity = float(values['quantity'])
+                if quantity < 0:
+                    raise ValueError
+                if quantity != food.quantity:
+                    food.quantity = quantity
+                    fields.add('quantity')
+                    row_changed = True
+        except ValueError:
+            errors[pk] = 'Quantity must be a number and non-negative.'
+            continue
+        if 'best_before' in values:
+            try:
+                best_before = date.fromisoformat(values['best_before'])
+            except ValueError:
+                errors[pk] = 'Best before date must use the YYYY-MM-DD format.'
+                continue
+            if best_before != food.best_before:
+                # Only changed dates are checked, so already expired items can still be re-counted
+                if best_before < today:
+                    errors[pk] = 'Best before date cannot be in the past.'
+                    continue
+                food.best_before = best_before
+                fields.add('best_before')
+                row_changed = True
+        if row_changed:
+            changed.append(food)
+
+    if errors or not changed:
+        return 0, errors
+    with transaction.atomic():
+        Food.objects.bulk_update(changed, sorted(fields), batch_size=BATCH_SIZE)
+    return len(changed), errors
@@ -0,0 +1,86 @@
+"""Versioned read-through cache for the dashboard and shopping-list computations.
+
+Every key embeds the current inventory version and today's date. Food and
+category writes bump the version (see ``inventory.signals``), and the date
+rolls the keys over at midnight because the expiry buckets depend on it, so
+entries never need to be deleted explicitly.
+
+Values are computed on the primary database even inside a request that reads
+from a replica: a lagging replica would otherwise store pre-write figures
+under the version that write published, for the whole cache timeout.
+
+The conditional page views in ``inventory.conditional`` build their ETags
+from the version too. It lives in ``INVENTORY_VERSION_CACHE_ALIAS``, a cache
+every process shares, so a write made by a management command (an import,
+``seed_inventory``, ``roll_up``) invalidates what the running server has
+cached. The cached results themselves may stay in a per-process cache, since
+their keys change with the version.
+"""
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import caches
+from foodstorage.replicas import routing
+
+VERSION_KEY = 'inventory:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'INVENTORY_CACHE_ALIAS', 'default')]
+
+
+def _version_cache():
+    return caches[getattr(settings, 'INVENTORY_VERSION_CACHE_ALIAS', getattr(settings, 'INVENTORY_CACHE_ALIAS', 'default'))]
+
+
+def get_inventory_version():
+    cache = _version_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_inventory_version():
+    cache = _version_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def cached(name, compute, today=None):
+    """Return ``compute(today)`` for the current inventory version and day, computing it at most once"""
+    today = today or date.today()
+    cache = _cache()
+    key = f'inventory:{name}:{get_inventory_version()}:{today.isoformat()}'
+    value = cache.get(key)
+    if value is None:
+        with routing(pinned=True):
+            value = compute(today)
+        cache.set(key, value, getattr(settings, 'INVENTORY_CACHE_TIMEOUT', 3600))
+    return value
+
+
+async def aget_inventory_version():
+    cache = _version_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def acached(name, compute, today=None):
+    """Async cached(): ``compute`` is a coroutine function and the cache is read with aget/aset"""
+    today = today or date.today()
+    cache = _cache()
+    key = f'inventory:{name}:{await aget_inventory_version()}:{today.isoformat()}'
+    value = await cache.aget(key)
+    if value is None:
+        with routing(pinned=True):
+            value = await compute(today)
+        await cache.aset(key, value, getattr(settings, 'INVENTORY_CACHE_TIMEOUT', 3600))
+    return value
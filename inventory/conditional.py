@@ -0,0 +1,60 @@
+"""Conditional GETs for the inventory pages.
+
+Everything these pages show depends only on the inventory and today's date, so
+the inventory version (see ``inventory.cache``) is a complete validator: the
+ETag is that version, the date and the client's CSRF cookie (so a cached form
+never carries a token from before a rotation). It is checked before the view
+runs, so a matching ``If-None-Match`` is answered with 304 Not Modified without
+a single query or template render; a dashboard polled every few seconds costs
+one cache lookup per poll while nothing changes. No Last-Modified is sent: the
+time of the last write cannot express a new day or a rotated token, so
+``If-Modified-Since`` would revalidate pages that have changed. Responses are
+marked ``no-cache`` so browsers revalidate every time instead of guessing a
+freshness lifetime.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from inventory.cache import aget_inventory_version, get_inventory_version
+
+
+def _etag(request, version):
+    token = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    client = hashlib.blake2b(token.encode(), digest_size=6).hexdigest()
+    return f'"{version}-{date.today().isoformat()}-{client}"'
+
+
+def _add_etag(response, etag):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def condition_on_inventory(view):
+    """Answer GET and HEAD with 304 while the inventory is unchanged since the client's copy"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            etag = _etag(request, await aget_inventory_version())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            return _add_etag(response, etag)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag = _etag(request, get_inventory_version())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _add_etag(response, etag)
+    return wrapper
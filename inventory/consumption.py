@@ -0,0 +1,80 @@
+"""Consuming stock without read-modify-write races.
+
+A single lot is decremented with one guarded ``UPDATE``, so concurrent consumers
+can never drive it below zero or lose each other's withdrawals. Consuming from a
+category takes from its lots first-in-first-out by best before date, all in one
+transaction with the lots locked (row locks on PostgreSQL, the write lock taken
+by SQLite's IMMEDIATE transactions).
+"""
+from django.db import transaction
+from inventory.models import Food
+
+EXHAUSTED_ACTIONS = ('delete', 'zero')
+
+
+class InsufficientStock(ValueError):
+    def __init__(self, available, requested):
+        self.available = available
+        self.requested = requested
+        super().__init__(f'Only {available:g} available, {requested:g} requested.')
+
+
+def _amount(quantity):
+    try:
+        quantity = float(quantity)
+    except (TypeError, ValueError):
+        raise ValueError('Quantity must be a positive number.')
+    if quantity <= 0:
+        raise ValueError('Quantity must be a positive number.')
+    return quantity
+
+
+def consume_food(food_id, quantity):
+    """Take ``quantity`` from one food lot; raises Food.DoesNotExist or InsufficientStock"""
+    quantity = _amount(quantity)
+    if Food.objects.filter(pk=food_id).decrement(quantity):
+        return
+    available = Food.objects.filter(pk=food_id).values_list('quantity', flat=True).first()
+    if available is None:
+        raise Food.DoesNotExist(f'Food {food_id} does not exist.')
+    raise InsufficientStock(available, quantity)
+
+
+def consume_category(category_id, quantity, exhausted='delete'):
+    """Take ``quantity`` from a category's lots, soonest best before first
+
+    Lots that are used up are deleted (or set to zero with ``exhausted='zero'``)
+    in the same transaction. Returns ``[(food id, amount taken, amount left)]``
+    and changes nothing when the category holds less than ``quantity``.
+    """
+    quantity = _amount(quantity)
+    if exhausted not in EXHAUSTED_ACTIONS:
+        raise ValueError(f'exhausted must be one of {", ".join(EXHAUSTED_ACTIONS)}.')
+
+    with transaction.atomic():
+        lots = (
+            Food.objects.select_for_update()
+            .filter(category_id=category_id, quantity__gt=0)
+            .order_by('best_before', 'pk')
+            .values_list('pk', 'quantity')
+        )
+        taken = []
+        remaining = quantity
+        for pk, available in lots.iterator():
+            take = min(available, remaining)
+            taken.append((pk, take, available - take))
+            remaining = round(remaining - take, 9)
+            if remaining <= 0:
+                break
+        if remaining > 0:
+            raise InsufficientStock(quantity - remaining, quantity)
+
+        # Used-up lots are decremented to zero too, so the ledger records them as consumed
+        for pk, take, left in taken:
+            if not Food.objects.filter(pk=pk).decrement(take):
+                # Only possible if something bypassed the lock; the transaction undoes everything
+                raise InsufficientStock(quantity - take, quantity)
+        used_up = [pk for pk, _, left in taken if left <= 0]
+        if used_up and exhausted == 'delete':
+            Food.objects.filter(pk__in=used_up).delete()
+    return taken
@@ -0,0 +1,78 @@
+"""Streaming bulk export of the inventory, search results and shopping list.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` over ``values_list`` and
+encoded one at a time, so memory stays flat and the first bytes go out before
+the query has finished.
+"""
+import csv
+import json
+from inventory.models import Category, Food
+from inventory.search import filter_foods
+
+CHUNK_SIZE = 2000
+
+FOOD_COLUMNS = ('id', 'name', 'category', 'unit', 'quantity', 'best_before')
+FOOD_FIELDS = ('id', 'name', 'category__name', 'category__unit', 'quantity', 'best_before')
+SHOPPING_COLUMNS = ('category', 'unit', 'current_quantity', 'ideal_quantity', 'needed_quantity')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/jsonl',
+    'ndjson': 'application/x-ndjson',
+}
+DATASETS = ('inventory', 'search', 'shopping')
+
+
+def food_rows(queryset, ordering=('id',)):
+    return queryset.order_by(*ordering).values_list(*FOOD_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def shopping_rows():
+    categories = Category.objects.low_stock().order_by('pk').values_list(
+        'name', 'unit', 'current_quantity', 'ideal_quantity',
+    )
+    for name, unit, current_quantity, ideal_quantity in categories.iterator(chunk_size=CHUNK_SIZE):
+        yield name, unit, current_quantity, ideal_quantity, ideal_quantity - current_quantity
+
+
+def dataset_rows(dataset, slug=None, search=''):
+    """Return ``(column names, row iterator)`` for one of DATASETS"""
+    if dataset == 'shopping':
+        return SHOPPING_COLUMNS, shopping_rows()
+    if dataset == 'search':
+        queryset, ordering, error_message = filter_foods(Food.objects.all(), slug, search)
+        if error_message:
+            raise ValueError(error_message)
+        return FOOD_COLUMNS, food_rows(queryset, ordering)
+    return FOOD_COLUMNS, food_rows(Food.objects.all())
+
+
+class _Echo:
+    """File-like object whose write() hands back what the csv module wrote"""
+
+    def write(self, value):
+        return value
+
+
+def encode_rows(columns, rows, data_format):
+    """Yield the encoded lines of ``rows`` in ``data_format`` ('csv', 'jsonl' or 'ndjson')"""
+    if data_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def stream_export(columns, rows, data_format, lines_per_chunk=500):
+    """Group encoded lines into chunks so each write carries more than a single row"""
+    chunk = []
+    for line in encode_rows(columns, rows, data_format):
+        chunk.append(line)
+        if len(chunk) >= lines_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
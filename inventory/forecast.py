@@ -0,0 +1,129 @@
+"""Consumption-rate forecasting across all categories at once.
+
+Each category's daily usage over the last ``WINDOW_DAYS`` completed days comes
+from the daily stock snapshots, topped up from the movement ledger for days
+that have not been rolled up yet. Usage is every stock decrease: consumption,
+removal of eaten items and downward edits. The rate is an exponentially weighted
+mean with a ``HALF_LIFE_DAYS`` half-life, so recent habits count most.
+
+Effective stock is the part of the current lots that will be used before it
+expires when the category keeps being used at that rate, taking lots soonest
+best before first. Lots are read as the expiry rollup holds them, one total per
+category and best before date, so the cost follows the number of distinct dates
+rather than the number of lots. Projected stockout is effective stock divided
+by the rate.
+"""
+from datetime import timedelta
+import math
+
+import numpy as np
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from inventory.history import start_of_day
+from inventory.models import Category, ExpiryRollup, StockMovement, StockSnapshot
+
+WINDOW_DAYS = 28
+HALF_LIFE_DAYS = 7
+
+
+def usage_matrix(category_ids, today, window=WINDOW_DAYS):
+    """``(categories x days)`` array of units used per completed day, oldest day first"""
+    first_day = today - timedelta(days=window)
+    index = {category_id: row for row, category_id in enumerate(category_ids)}
+    usage = np.zeros((len(category_ids), window))
+
+    def add(rows):
+        for category_id, day, used in rows:
+            if category_id in index and used:
+                usage[index[category_id], (day - first_day).days] += used
+
+    snapshots = StockSnapshot.objects.filter(
+        period=StockSnapshot.Period.DAY, start__gte=first_day, start__lt=today,
+    ).values_list('category_id', 'start', F('consumed') + F('removed'))
+    add(snapshots)
+
+    # Days after the last rollup come straight from the ledger
+    last = StockSnapshot.objects.filter(period=StockSnapshot.Period.DAY).order_by('-start').values_list(
+        'start', flat=True).first()
+    unrolled = max(first_day, last + timedelta(days=1)) if last else first_day
+    if unrolled < today:
+        ledger = (
+            StockMovement.objects.filter(
+                recorded_at__gte=start_of_day(unrolled), recorded_at__lt=start_of_day(today), quantity__lt=0,
+            )
+            .annotate(day=TruncDate('recorded_at'))
+            .order_by()
+            .values_list('category_id', 'day')
+            .annotate(used=-Sum('quantity'))
+        )
+        add(ledger)
+    return usage
+
+
+def daily_rates(usage):
+    """Exponentially weighted mean of each row of a usage matrix, newest day weighted 1"""
+    ages = np.arange(usage.shape[1])[::-1]
+    weights = 0.5 ** (ages / HALF_LIFE_DAYS)
+    return usage @ weights / weights.sum()
+
+
+def lot_totals(category_ids, today):
+    """``(rows, quantities, days_left)`` arrays of unexpired stock per category and best before date
+
+    One entry per rollup row, grouped by category row and soonest first within it.
+    """
+    index = {category_id: row for row, category_id in enumerate(category_ids)}
+    totals = [
+        total for total in ExpiryRollup.objects.filter(best_before__gte=today, quantity__gt=0)
+        .order_by('category_id', 'best_before')
+        .values_list('category_id', 'best_before', 'quantity')
+        if total[0] in index
+    ]
+    rows = np.array([index[category_id] for category_id, _, _ in totals], dtype=np.intp)
+    quantities = np.array([quantity for _, _, quantity in totals], dtype=float)
+    days_left = np.array([(best_before - today).days for _, best_before, _ in totals], dtype=float)
+    return rows, quantities, days_left
+
+
+def effective_stock(rows, quantities, days_left, rates):
+    """Stock each category will use before it expires at its current rate
+
+    ``rows``, ``quantities`` and ``days_left`` list stock by category row and best
+    before date, soonest first within each row. Stock expiring in ``d`` days can
+    only be used until the end of that day, so at most ``rate * (d + 1)`` units can
+    have been used by then across it and the stock before it; anything beyond that
+    spoils. The amount used is therefore the smaller of the total and, for every
+    date, that cap plus everything expiring later. Categories without usage
+    history count every lot that has not expired yet.
+    """
+    fresh = days_left >= 0
+    rows, quantities, days_left = rows[fresh], quantities[fresh], days_left[fresh]
+    total = np.bincount(rows, weights=quantities, minlength=len(rates))
+    # Stock expiring up to and including each date, within its own category
+    before_row = np.concatenate(([0.0], np.cumsum(total)[:-1]))
+    cumulative = np.cumsum(quantities) - before_row[rows]
+    shortfall = np.zeros(len(rates))
+    np.minimum.at(shortfall, rows, rates[rows] * (days_left + 1) - cumulative)
+    return np.where(rates > 0, total + shortfall, total)
+
+
+def forecast(today=None):
+    """``{category id: {'daily_usage', 'effective_quantity', 'days_until_stockout', 'stockout_date'}}``"""
+    today = today or timezone.localdate()
+    category_ids = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+    rates = daily_rates(usage_matrix(category_ids, today))
+    effective = effective_stock(*lot_totals(category_ids, today), rates)
+    days = np.divide(effective, rates, out=np.full_like(rates, np.inf), where=rates > 0)
+
+    result = {}
+    for category_id, rate, usable, days_left in zip(category_ids, rates.tolist(), effective.tolist(), days.tolist()):
+        # Rounded first so float noise in the weighted mean never drops a whole day
+        days_left = math.floor(round(days_left, 6)) if math.isfinite(days_left) else None
+        result[category_id] = {
+            'daily_usage': round(rate, 3),
+            'effective_quantity': round(usable, 3),
+            'days_until_stockout': days_left,
+            'stockout_date': today + timedelta(days=days_left) if days_left is not None else None,
+        }
+    return result
@@ -0,0 +1,145 @@
+"""Stock history: daily and weekly snapshots rolled up from the movement ledger.
+
+``roll_up`` turns the StockMovement rows of every completed day into one
+StockSnapshot per category and day, then refreshes the weekly snapshots of the
+weeks those days belong to. Closing quantities are worked out backwards from
+the stored category counters, so the ledger never needs an opening balance and
+rows that have been rolled up can be pruned. Trend queries read snapshots only.
+"""
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from inventory.models import Category, StockMovement, StockSnapshot
+
+PERIODS = {'day': StockSnapshot.Period.DAY, 'week': StockSnapshot.Period.WEEK}
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _week_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _daily_movements(since):
+    """``{(category id, day): totals}`` for movements recorded on or after ``since``"""
+    rows = (
+        StockMovement.objects.filter(recorded_at__gte=start_of_day(since))
+        .annotate(day=TruncDate('recorded_at'))
+        .order_by()
+        .values('category_id', 'day')
+        .annotate(
+            net=Sum('quantity'),
+            added=Sum('quantity', filter=Q(quantity__gt=0)),
+            consumed=Sum('quantity', filter=Q(kind=StockMovement.Kind.CONSUME)),
+            removed=Sum('quantity', filter=Q(quantity__lt=0) & ~Q(kind=StockMovement.Kind.CONSUME)),
+            movements=Count('id'),
+        )
+    )
+    return {(row['category_id'], row['day']): row for row in rows}
+
+
+def roll_up(today=None):
+    """Snapshot every completed day (and week) not rolled up yet; returns the number of days"""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        last = StockSnapshot.objects.filter(period=StockSnapshot.Period.DAY).aggregate(last=Max('start'))['last']
+        if last is not None:
+            since = last + timedelta(days=1)
+        else:
+            first = StockMovement.objects.aggregate(first=Min('recorded_at'))['first']
+            since = timezone.localdate(first) if first else today
+        if since >= today:
+            return 0
+
+        days = [since + timedelta(days=offset) for offset in range((today - since).days)]
+        movements = _daily_movements(since)
+        since_today = {}
+        for (category_id, day), row in movements.items():
+            if day >= today:
+                since_today[category_id] = since_today.get(category_id, 0) + row['net']
+        snapshots = []
+        for category_id, current in Category.objects.values_list('pk', 'current_quantity'):
+            # Walk back from the live counter, undoing each day's net change
+            closing = current - since_today.get(category_id, 0)
+            for day in reversed(days):
+                row = movements.get((category_id, day), {})
+                snapshots.append(StockSnapshot(
+                    category_id=category_id, period=StockSnapshot.Period.DAY, start=day, closing_quantity=closing,
+                    added=row.get('added') or 0, consumed=-(row.get('consumed') or 0),
+                    removed=-(row.get('removed') or 0), movements=row.get('movements', 0),
+                ))
+                closing -= row.get('net') or 0
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=500)
+        _roll_up_weeks(_week_of(since), _week_of(today))
+    return len(days)
+
+
+def _roll_up_weeks(first_week, current_week):
+    """Rebuild the weekly snapshots of the completed weeks from ``first_week`` on"""
+    if first_week >= current_week:
+        return
+    daily = StockSnapshot.objects.filter(
+        period=StockSnapshot.Period.DAY, start__gte=first_week, start__lt=current_week,
+    ).order_by('category_id', 'start')
+    weeks = {}
+    for day in daily:
+        key = (day.category_id, _week_of(day.start))
+        week = weeks.setdefault(key, StockSnapshot(
+            category_id=day.category_id, period=StockSnapshot.Period.WEEK, start=key[1], closing_quantity=0,
+        ))
+        # Days come in order, so the last one seen holds the week's closing figure
+        week.closing_quantity = day.closing_quantity
+        week.added += day.added
+        week.consumed += day.consumed
+        week.removed += day.removed
+        week.movements += day.movements
+    StockSnapshot.objects.filter(period=StockSnapshot.Period.WEEK, start__gte=first_week).delete()
+    StockSnapshot.objects.bulk_create(weeks.values(), batch_size=500)
+
+
+def prune_movements(keep_days, today=None):
+    """Delete ledger rows older than ``keep_days`` that are already covered by daily snapshots"""
+    today = today or timezone.localdate()
+    last = StockSnapshot.objects.filter(period=StockSnapshot.Period.DAY).aggregate(last=Max('start'))['last']
+    if last is None:
+        return 0
+    cutoff = min(today - timedelta(days=keep_days), last + timedelta(days=1))
+    deleted, _ = StockMovement.objects.filter(recorded_at__lt=start_of_day(cutoff)).delete()
+    return deleted
+
+
+def stock_trend(period='day', since=None, category_ids=None):
+    """Chart data for closing stock and consumption per category, read from the snapshots only"""
+    snapshots = StockSnapshot.objects.filter(period=PERIODS[period])
+    if since is not None:
+        snapshots = snapshots.filter(start__gte=since)
+    if category_ids:
+        snapshots = snapshots.filter(category_id__in=category_ids)
+    rows = snapshots.order_by('category__name', 'category_id', 'start').values_list(
+        'category_id', 'category__name', 'start', 'closing_quantity', 'consumed',
+    )
+
+    labels = []
+    series = {}
+    for category_id, name, start, closing, consumed in rows:
+        labels.append(start)
+        entry = series.setdefault(category_id, {'category': category_id, 'name': name, 'points': {}})
+        entry['points'][start] = (closing, consumed)
+    labels = sorted(set(labels))
+    return {
+        'period': period,
+        'labels': [label.isoformat() for label in labels],
+        'series': [
+            {
+                'category': entry['category'],
+                'name': entry['name'],
+                'closing': [entry['points'].get(label, (None, None))[0] for label in labels],
+                'consumed': [entry['points'].get(label, (None, None))[1] for label in labels],
+            }
+            for entry in series.values()
+        ],
+    }
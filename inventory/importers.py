@@ -0,0 +1,229 @@
+"""Streaming bulk import of foods and categories from CSV, JSON arrays or JSON Lines.
+
+Records are parsed one at a time, validated with the same rules as the food and
+category forms, and written with batched ``bulk_create``. Invalid rows, including
+JSON Lines records that are not valid JSON, are reported through ``on_error`` and
+skipped; they never abort the import. Only data the parser cannot get past (a
+broken JSON array or CSV quoting) stops it early. The batches written before
+that point stay, and ``ImportResult.failure`` says what stopped it.
+"""
+import csv
+import json
+from datetime import date
+from inventory.models import Category, Food
+
+FORMATS = ('csv', 'json')
+KINDS = ('foods', 'categories')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = 0
+        # Why the import stopped before the end of the file, if it did
+        self.failure = None
+
+
+class MalformedRecord:
+    """Stands in for a record that could not be parsed, so it is reported like any other invalid row"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_csv_records(stream):
+    """Yield ``(line number, row dict)`` for each data row of a CSV stream with a header"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json_records(stream, chunk_size=65536):
+    """Yield ``(number, object)`` from a top-level JSON array or JSON Lines, reading in chunks
+
+    ``number`` is the line number for JSON Lines and the record number within an
+    array. A JSON Lines record that does not parse is yielded as a MalformedRecord
+    and reading resumes on the next line. A broken array raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    exhausted = False
+    in_array = None
+    number = 0
+    line = 1
+
+    def fill():
+        nonlocal buffer, position, exhausted
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            exhausted = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def advance(end):
+        nonlocal position, line
+        line += buffer.count('\n', position, end)
+        position = end
+
+    while True:
+        # Skip whitespace and, inside an array, the separating commas
+        while True:
+            end = position
+            while end < len(buffer) and (buffer[end].isspace() or (in_array and buffer[end] == ',')):
+                end += 1
+            advance(end)
+            if position < len(buffer) or exhausted:
+                break
+            fill()
+        if position >= len(buffer):
+            return
+        if in_array is None:
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+            continue
+        if in_array and buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as exc:
+            newline = -1 if in_array else buffer.find('\n', position)
+            if newline < 0 and not exhausted:
+                # The record may continue in the next chunk
+                fill()
+                continue
+            if in_array:
+                raise
+            # A JSON Lines record ends at its newline, so the next one starts on the following line
+            yield line, MalformedRecord(f'Invalid JSON: {exc.msg}.')
+            advance(len(buffer) if newline < 0 else newline + 1)
+            continue
+        if end == len(buffer) and not exhausted:
+            # A number at the end of the buffer may continue in the next chunk
+            fill()
+            continue
+        number += 1
+        record_number = number if in_array else line
+        advance(end)
+        yield record_number, value
+
+
+def iter_records(stream, format):
+    if format == 'csv':
+        return iter_csv_records(stream)
+    return iter_json_records(stream)
+
+
+def _required(record, field):
+    value = record.get(field)
+    if value is None or str(value).strip() == '':
+        raise ValueError(f'Missing {field}.')
+    return str(value).strip()
+
+
+def clean_food(record, categories, today):
+    """Validate one food record against the food form rules and return its field values"""
+    name = _required(record, 'name')
+    by_id, by_name = categories
+    if str(record.get('category_id') or '').strip():
+        category = str(record['category_id']).strip()
+        category_id = by_id.get(category)
+    else:
+        category = _required(record, 'category')
+        category_id = by_name.get(category.lower())
+    if category_id is None:
+        raise ValueError(f'Unknown category: {category}.')
+    try:
+        quantity = float(_required(record, 'quantity'))
+    except ValueError:
+        raise ValueError('Quantity must be a number and non-negative.')
+    if quantity < 0:
+        raise ValueError('Quantity must be a number and non-negative.')
+    try:
+        best_before = date.fromisoformat(_required(record, 'best_before'))
+    except ValueError:
+        raise ValueError('Best before date must use the YYYY-MM-DD format.')
+    if best_before < today:
+        raise ValueError('Best before date cannot be in the past.')
+    return {'name': name, 'category_id': category_id, 'quantity': quantity, 'best_before': best_before}
+
+
+def clean_category(record, existing_names):
+    """Validate one category record against the category form rules"""
+    name = _required(record, 'name')
+    unit = _required(record, 'unit')
+    try:
+        ideal_quantity = float(_required(record, 'ideal_quantity'))
+    except ValueError:
+        raise ValueError('Ideal quantity must be a number.')
+    if ideal_quantity <= 0:
+        raise ValueError('Ideal quantity must be greater than zero.')
+    if name.lower() in existing_names:
+        raise ValueError('Category name must be unique (case-insensitive).')
+    return {'name': name, 'unit': unit, 'ideal_quantity': ideal_quantity}
+
+
+def _category_lookup():
+    """Map stringified ids and lower-cased names to category ids, loaded in one query"""
+    by_id, by_name = {}, {}
+    for pk, name in Category.objects.values_list('pk', 'name').iterator():
+        by_id[str(pk)] = pk
+        by_name[name.lower()] = pk
+    return by_id, by_name
+
+
+def _until_unreadable(records, result):
+    """Yield from ``records`` until the parser gives up, noting why on ``result``"""
+    records = iter(records)
+    while True:
+        try:
+            yield next(records)
+        except StopIteration:
+            return
+        except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+            result.failure = str(exc)
+            return
+
+
+def import_records(records, kind='foods', batch_size=DEFAULT_BATCH_SIZE, on_error=None, today=None):
+    """Validate and bulk insert ``records`` (``(number, dict)`` pairs), returning an ImportResult"""
+    result = ImportResult()
+    today = today or date.today()
+    if kind == 'foods':
+        model = Food
+        categories = _category_lookup()
+
+        def clean(record):
+            return clean_food(record, categories, today)
+    else:
+        model = Category
+        existing_names = {name.lower() for name in Category.objects.values_list('name', flat=True).iterator()}
+
+        def clean(record):
+            values = clean_category(record, existing_names)
+            existing_names.add(values['name'].lower())
+            return values
+
+    batch = []
+    for number, record in _until_unreadable(records, result):
+        try:
+            if isinstance(record, MalformedRecord):
+                raise ValueError(record.message)
+            if not isinstance(record, dict):
+                raise ValueError('Record must be an object.')
+            batch.append(model(**clean(record)))
+        except ValueError as exc:
+            result.errors += 1
+            if on_error:
+                on_error(number, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            result.created += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        result.created += len(batch)
+    return result
@@ -0,0 +1,290 @@
+"""Live dashboard updates over server-sent events.
+
+Every committed Food or Category write (the ``inventory_changed`` signal that
+invalidates the cache) asks the process-wide ``broker`` to refresh, once per
+transaction. With no dashboards open that is a no-op. Otherwise the broker
+reads the per-category figures once with the same two queries as the
+dashboard, which touch the stored counters and the expiry rollup but never
+the food table. It diffs them against what it last sent and pushes one JSON
+``delta`` message to every open stream. Each message holds the
+changed categories, the removed ones and alerts for categories that fell
+below (or climbed back to) their ideal stock or gained lots expiring soon.
+A write therefore costs the same two queries however many dashboards are
+watching.
+
+A new stream starts with a ``snapshot`` of every category, so a page that
+reconnects after a gap catches up without a reload. Each server process has
+its own broker. While it has streams open, it also polls the shared inventory
+version (see ``inventory.cache``) every ``POLL_SECONDS``, so writes handled by
+another worker or by a management command reach its dashboards too, a poll
+interval later. The poll is one cache read per process, not per stream.
+
+Under WSGI every open stream holds a worker thread, so a process serves at most
+``INVENTORY_LIVE_SYNC_STREAMS`` of them. Further dashboards get a snapshot and
+a ``retry`` hint instead, and their browsers reconnect to refresh it every
+``FALLBACK_RETRY_MS``. With ``INVENTORY_ASYNC_VIEWS`` (``serve --asgi``) the async
+twin is routed instead, and an open dashboard then holds only a queue on the
+event loop, with no cap.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.dispatch import receiver
+from django.http import StreamingHttpResponse
+from inventory.cache import get_inventory_version
+from inventory.models import Category
+from inventory.signals import inventory_changed, on_commit_once
+from inventory.stock import _expiring_soon_counts
+
+HEARTBEAT_SECONDS = 15
+# How often open streams check for writes made by other processes
+POLL_SECONDS = 2
+# How soon a dashboard turned away by the stream cap reconnects for a fresh snapshot
+FALLBACK_RETRY_MS = 30_000
+# A stream further behind than this is dropped; its page reconnects and starts over from a snapshot
+MAX_PENDING = 100
+
+
+def category_rows(today=None):
+    """``{category id: figures}`` as the dashboard shows them, from the counters and the expiry rollup"""
+    today = today or date.today()
+    expiring = dict(_expiring_soon_counts(today))
+    return {
+        category.pk: {
+            'id': category.pk,
+            'name': category.name,
+            'unit': category.unit,
+            'current_quantity': round(category.current_quantity, 2),
+            'ideal_quantity': round(category.ideal_quantity, 2),
+            'food_count': category.food_count,
+            'expiring_soon': expiring.get(category.pk, 0),
+            'below_ideal': category.current_quantity < category.ideal_quantity,
+        }
+        for category in Category.objects.order_by('pk')
+    }
+
+
+def diff_rows(before, after):
+    """``(changed rows, removed ids, alerts)`` between two category_rows() results"""
+    changed = [row for pk, row in after.items() if before.get(pk) != row]
+    removed = [pk for pk in before if pk not in after]
+    alerts = []
+    for row in changed:
+        previous = before.get(row['id'])
+        was_below = previous['below_ideal'] if previous else False
+        if row['below_ideal'] != was_below:
+            kind = 'below_ideal' if row['below_ideal'] else 'restocked'
+            alerts.append({'category': row['id'], 'name': row['name'], 'kind': kind})
+        if row['expiring_soon'] > (previous['expiring_soon'] if previous else 0):
+            alerts.append({
+                'category': row['id'], 'name': row['name'], 'kind': 'expiring', 'count': row['expiring_soon'],
+            })
+    return changed, removed, alerts
+
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class SyncSubscription:
+    """A stream read from a worker thread"""
+
+    def __init__(self):
+        self.queue = queue.Queue(MAX_PENDING)
+        self.dropped = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.dropped = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """A stream read from an event loop; put() may be called from any thread"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(MAX_PENDING)
+        self.dropped = False
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop has closed under an abandoned stream
+            self.dropped = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._rows = None
+        self._today = None
+        self._version = None
+        self._polled_at = 0.0
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def sync_streams(self):
+        """Open streams that each hold a worker thread"""
+        return sum(isinstance(subscription, SyncSubscription) for subscription in list(self._subscribers))
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                # Nobody is watching, so the next subscriber starts from a fresh read
+                self._rows = None
+
+    def _read(self):
+        # The version is read first, so a write landing during the read is picked up by the next poll
+        self._version = get_inventory_version()
+        self._today = date.today()
+        return category_rows(self._today)
+
+    def snapshot(self):
+        """Every category's figures, as the first message of a new stream"""
+        with self._lock:
+            if self._rows is None or self._today != date.today() or self._version != get_inventory_version():
+                self._rows = self._read()
+            return sse_message('snapshot', {'categories': list(self._rows.values())})
+
+    def refresh(self):
+        """Re-read the figures and push what changed to every stream; free while none are open"""
+        with self._lock:
+            if not self._subscribers or self._rows is None:
+                return
+            rows = self._read()
+            changed, removed, alerts = diff_rows(self._rows, rows)
+            self._rows = rows
+            if not (changed or removed):
+                return
+            # Serialized once, whatever the number of streams
+            message = sse_message('delta', {'changed': changed, 'removed': removed, 'alerts': alerts})
+            for subscription in list(self._subscribers):
+                subscription.put(message)
+                if getattr(subscription, 'dropped', False):
+                    self._subscribers.discard(subscription)
+
+    def poll_due(self):
+        return time.monotonic() - self._polled_at >= POLL_SECONDS
+
+    def poll(self):
+        """Refresh if another process wrote, or the day turned over; at most once per POLL_SECONDS"""
+        if not self.poll_due():
+            return
+        self._polled_at = time.monotonic()
+        # Lots also move into the expiring-soon window at midnight without any write
+        if self._version != get_inventory_version() or (self._today is not None and self._today != date.today()):
+            self.refresh()
+
+
+broker = Broker()
+
+
+@receiver(inventory_changed)
+def refresh_live_dashboards(sender, using=None, **kwargs):
+    # After the commit, when the stored counters include the write; once however many rows it touched
+    if broker.has_subscribers():
+        on_commit_once(broker.refresh, using)
+
+
+HEARTBEAT = ': heartbeat\n\n'
+
+
+def _event_stream():
+    subscription = broker.subscribe(SyncSubscription())
+    try:
+        yield broker.snapshot()
+        idle = 0
+        while not subscription.dropped:
+            message = subscription.get(POLL_SECONDS)
+            if message is None:
+                broker.poll()
+                idle += POLL_SECONDS
+                if idle < HEARTBEAT_SECONDS:
+                    continue
+                # A comment line keeps proxies from closing an idle stream
+                message = HEARTBEAT
+            idle = 0
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def _aevent_stream():
+    subscription = broker.subscribe(AsyncSubscription())
+    try:
+        yield await sync_to_async(broker.snapshot)()
+        idle = 0
+        while not subscription.dropped:
+            message = await subscription.get(POLL_SECONDS)
+            if message is None:
+                if broker.poll_due():
+                    await sync_to_async(broker.poll)()
+                idle += POLL_SECONDS
+                if idle < HEARTBEAT_SECONDS:
+                    continue
+                message = HEARTBEAT
+            idle = 0
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _fallback_stream():
+    # One snapshot, then the stream ends and the browser reconnects after the retry delay
+    yield f'retry: {FALLBACK_RETRY_MS}\n\n'
+    yield broker.snapshot()
+
+
+def _stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def dashboard_events(request):
+    if broker.sync_streams() >= getattr(settings, 'INVENTORY_LIVE_SYNC_STREAMS', 2):
+        # Another open stream would take a thread that pages need
+        return _stream_response(_fallback_stream())
+    return _stream_response(_event_stream())
+
+
+async def adashboard_events(request):
+    """Async dashboard_events"""
+    return _stream_response(_aevent_stream())
@@ -0,0 +1,69 @@
+import json
+import platform
+import time
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from inventory.bench import CASES, compare, run_cases
+from inventory.seeding import SCALES, seed_inventory
+
+
+class Command(BaseCommand):
+    help = "Time every page, API endpoint and model property against seeded inventories of each scale"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1k,100k', help=f"Comma separated scales out of {', '.join(SCALES)}.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the median is reported.")
+        parser.add_argument('--case', action='append', choices=CASES, help="Only run this case (repeatable).")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="Results file of an earlier run to compare against.")
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = sorted(set(scales) - set(SCALES))
+        if unknown:
+            raise CommandError(f"Unknown scale(s): {', '.join(unknown)}.")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)['scales']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        results = {}
+        for scale in scales:
+            foods, categories = SCALES[scale]
+            # A throwaway database per scale, so the real one is never touched
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                start = time.perf_counter()
+                seed_inventory(foods, categories, history_days=28)
+                self.stdout.write(f"Seeded {scale} in {time.perf_counter() - start:.1f}s")
+                cases = run_cases(options['repeat'], options['case'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            results[scale] = {'foods': foods, 'categories': categories, 'cases': cases}
+            for name, result in cases.items():
+                self.stdout.write(f"  {name:<24} {result['median_ms']:>10.2f} ms {result['queries']:>5} queries")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'recorded_at': timezone.now().isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'repeat': options['repeat'],
+                    'scales': results,
+                }, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if baseline is not None:
+            self.stdout.write(f"{'scale':<6} {'case':<24} {'before ms':>10} {'after ms':>10} {'ratio':>6} queries")
+            for scale, name, old_ms, new_ms, ratio, old_queries, new_queries in compare(baseline, results):
+                old_ms = f'{old_ms:.2f}' if old_ms is not None else '-'
+                ratio = f'{ratio:.2f}' if ratio is not None else '-'
+                self.stdout.write(
+                    f"{scale:<6} {name:<24} {old_ms:>10} {new_ms:>10.2f} {ratio:>6} {old_queries} -> {new_queries}"
+                )
@@ -0,0 +1,32 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from inventory.models import Category, ExpiryBucket, ExpiryRollup, Food
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-category expiry rollup for a new day; schedule it shortly after midnight"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help="Roll over as of this YYYY-MM-DD date instead of today.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError("--date must use the YYYY-MM-DD format.")
+
+        with transaction.atomic():
+            Category.objects.all().refresh_expiry_rollup(today)
+            rows = ExpiryRollup.objects.count()
+            buckets = dict(
+                Food.objects.with_expiry(today).order_by().values_list('expiry_bucket').annotate(count=Count('id'))
+            )
+
+        for bucket in ExpiryBucket:
+            self.stdout.write(f"{bucket.label}: {buckets.get(bucket.value, 0)}")
+        self.stdout.write(self.style.SUCCESS(f"Rolled the expiry rollup over to {today} ({rows} rows)."))
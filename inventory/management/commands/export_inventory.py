@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.exporters import DATASETS, FORMATS, dataset_rows, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream the inventory, search results or shopping list as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help="Write to this file instead of standard output.")
+        parser.add_argument('--by', choices=['category', 'best_before_date'], help="Search filter, as on the search page.")
+        parser.add_argument('--search', default='', help="Search text or best-before date.")
+
+    def handle(self, *args, **options):
+        try:
+            columns, rows = dataset_rows(options['dataset'], options['by'], options['search'].strip())
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        chunks = stream_export(columns, rows, options['format'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,45 @@
+import csv
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from inventory.importers import DEFAULT_BATCH_SIZE, FORMATS, KINDS, import_records, iter_records
+
+
+class Command(BaseCommand):
+    help = "Stream foods or categories from a CSV, JSON array or JSON Lines file into the inventory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for standard input.")
+        parser.add_argument('--kind', choices=KINDS, default='foods')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--errors', help="Write rejected rows to this CSV file instead of standard error.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'json')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+
+        report_file = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        report = csv.writer(report_file or self.stderr)
+        report.writerow(['row', 'error'])
+        try:
+            result = import_records(
+                iter_records(stream, data_format),
+                kind=options['kind'],
+                batch_size=options['batch_size'],
+                on_error=lambda number, message: report.writerow([number, message]),
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if report_file:
+                report_file.close()
+
+        summary = f"Imported {result.created} {options['kind']}, rejected {result.errors} row{'s' if result.errors != 1 else ''}."
+        if result.failure:
+            raise CommandError(f"{summary} Stopped early, the rest of the file could not be parsed: {result.failure}")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventory.models import Category
+
+
+class Command(BaseCommand):
+    help = "Reconcile the stored category stock counters with the food table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report categories whose counters have drifted.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(Category.objects.with_stock_drift().order_by('pk'))
+            for category in drifted:
+                self.stdout.write(
+                    f"{category.name}: stored {category.current_quantity} ({category.food_count} items), "
+                    f"actual {category.actual_quantity} ({category.actual_count} items)"
+                )
+            if drifted and not options['dry_run']:
+                Category.objects.filter(pk__in=[category.pk for category in drifted]).recompute_stock()
+
+        verb = "Found" if options['dry_run'] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} drifted categor{'y' if len(drifted) == 1 else 'ies'}."))
@@ -0,0 +1,31 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from inventory.history import prune_movements, roll_up
+
+
+class Command(BaseCommand):
+    help = "Roll the stock movement ledger up into daily and weekly snapshots; schedule it nightly"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help="Roll up the days before this YYYY-MM-DD date instead of today.",
+        )
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            help="Afterwards delete ledger rows older than this many days (snapshots are kept).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must use the YYYY-MM-DD format.")
+
+        days = roll_up(today)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {days} day{'' if days == 1 else 's'} of stock movements."))
+        if options['keep_days'] is not None:
+            pruned = prune_movements(options['keep_days'], today)
+            self.stdout.write(f"Pruned {pruned} ledger row{'' if pruned == 1 else 's'}.")
@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from inventory.models import Category
+from inventory.seeding import DEFAULT_BATCH_SIZE, SCALES, seed_inventory
+
+
+class Command(BaseCommand):
+    help = "Fill the inventory with a synthetic household pantry at a given scale"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='1k', help="Preset number of foods and categories.")
+        parser.add_argument('--foods', type=int, help="Number of food lots, overriding the scale.")
+        parser.add_argument('--categories', type=int, help="Number of categories, overriding the scale.")
+        parser.add_argument('--history-days', type=int, default=28, help="Days of consumption history to add.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Delete every existing category and food first.",
+        )
+
+    def handle(self, *args, **options):
+        foods, categories = SCALES[options['scale']]
+        foods = options['foods'] if options['foods'] is not None else foods
+        categories = options['categories'] or categories
+
+        if Category.objects.exists():
+            if not options['clear']:
+                raise CommandError("The inventory is not empty; pass --clear to replace it.")
+            deleted, _ = Category.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} existing rows.")
+
+        start = time.perf_counter()
+        seed_inventory(
+            foods, categories, batch_size=options['batch_size'], seed_value=options['seed'],
+            history_days=options['history_days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {foods} foods in {categories} categories in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,40 @@
+import os
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from foodstorage.serving import DEFAULT_THREADS, default_workers, pending_migrations, server_argv
+
+
+class Command(BaseCommand):
+    help = "Serve the project with a multi-process production server (gunicorn, or uvicorn with --asgi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default='0.0.0.0:8000', help="host:port to listen on.")
+        parser.add_argument('--asgi', action='store_true', help="Serve the async views with uvicorn.")
+        parser.add_argument('--workers', type=int, help="Worker processes; derived from the CPU count by default.")
+        parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Threads per gunicorn worker.")
+        parser.add_argument(
+            '--skip-migration-check',
+            action='store_true',
+            help="Start without looking for unapplied migrations, when the schema is known to be current.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.PRODUCTION:
+            self.stderr.write("DJANGO_PRODUCTION is not set: serving with DEBUG on and without static files.")
+        if not options['skip_migration_check']:
+            pending = pending_migrations()
+            if pending:
+                self.stdout.write(f"Applying {len(pending)} migration(s).")
+                call_command('migrate', interactive=False, verbosity=0)
+
+        workers = options['workers'] or default_workers(options['asgi'])
+        argv = server_argv(options['bind'], workers, options['threads'], options['asgi'])
+        server = 'uvicorn' if options['asgi'] else 'gunicorn'
+        self.stdout.write(f"Starting {server} with {workers} worker(s) on {options['bind']}.")
+        self.stdout.flush()
+        try:
+            # Replace this process, so the server receives the container's signals directly
+            os.execv(argv[0], argv)
+        except OSError as exc:
+            raise CommandError(f"Cannot start {server}: {exc}")
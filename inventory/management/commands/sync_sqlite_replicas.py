@@ -0,0 +1,29 @@
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto each SQLite replica file (local stand-in for replication)"
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError("No replicas configured; set DJANGO_DB_REPLICAS.")
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Only SQLite replicas can be synced here; server databases replicate themselves.")
+
+        source = sqlite3.connect(connections['default'].settings_dict['NAME'])
+        try:
+            for alias in replicas:
+                connections[alias].close()
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"{alias}: {connections[alias].settings_dict['NAME']}")
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Synced {len(replicas)} replica{'' if len(replicas) == 1 else 's'}."))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+def populate_stock_counters(apps, schema_editor):
+    Category = apps.get_model('inventory', 'Category')
+    Food = apps.get_model('inventory', 'Food')
+    totals = (
+        Food.objects.using(schema_editor.connection.alias)
+        .order_by()
+        .values('category_id')
+        .annotate(quantity=models.Sum('quantity'), count=models.Count('id'))
+    )
+    for row in totals:
+        Category.objects.using(schema_editor.connection.alias).filter(pk=row['category_id']).update(
+            current_quantity=row['quantity'], food_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_alter_category_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='current_quantity',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='food_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_stock_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_category_stock_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['category', 'best_before'], name='food_category_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['best_before', 'category'], name='food_expiry_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['category', 'quantity'], name='food_category_quantity_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_food_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['name', 'id'], name='food_name_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:34
+
+import django.db.models.deletion
+import inventory.models
+from django.db import migrations, models
+
+SQLITE_FORWARDS = [
+    """CREATE VIRTUAL TABLE inventory_food_fts USING fts5(
+        name, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    "CREATE VIRTUAL TABLE inventory_food_fts_vocab USING fts5vocab(inventory_food_fts, 'row')",
+    """CREATE TRIGGER inventory_food_fts_insert AFTER INSERT ON inventory_food BEGIN
+        INSERT INTO inventory_food_fts(rowid, name, category)
+        SELECT new.id, new.name, c.name FROM inventory_category c WHERE c.id = new.category_id;
+    END""",
+    """CREATE TRIGGER inventory_food_fts_update AFTER UPDATE OF name, category_id ON inventory_food BEGIN
+        DELETE FROM inventory_food_fts WHERE rowid = old.id;
+        INSERT INTO inventory_food_fts(rowid, name, category)
+        SELECT new.id, new.name, c.name FROM inventory_category c WHERE c.id = new.category_id;
+    END""",
+    """CREATE TRIGGER inventory_food_fts_delete AFTER DELETE ON inventory_food BEGIN
+        DELETE FROM inventory_food_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER inventory_category_fts_update AFTER UPDATE OF name ON inventory_category BEGIN
+        UPDATE inventory_food_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM inventory_food WHERE category_id = new.id);
+    END""",
+    """INSERT INTO inventory_food_fts(rowid, name, category)
+        SELECT f.id, f.name, c.name FROM inventory_food f JOIN inventory_category c ON c.id = f.category_id""",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS inventory_category_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_food_fts_delete",
+    "DROP TRIGGER IF EXISTS inventory_food_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_food_fts_insert",
+    "DROP TABLE IF EXISTS inventory_food_fts_vocab",
+    "DROP TABLE IF EXISTS inventory_food_fts",
+]
+
+POSTGRES_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS food_name_tsv_idx ON inventory_food USING gin (to_tsvector('simple', name))",
+    "CREATE INDEX IF NOT EXISTS category_name_tsv_idx ON inventory_category USING gin (to_tsvector('simple', name))",
+    "CREATE INDEX IF NOT EXISTS food_name_trgm_idx ON inventory_food USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS category_name_trgm_idx ON inventory_category USING gin (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS category_name_trgm_idx",
+    "DROP INDEX IF EXISTS food_name_trgm_idx",
+    "DROP INDEX IF EXISTS category_name_tsv_idx",
+    "DROP INDEX IF EXISTS food_name_tsv_idx",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_food_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodSearchEntry',
+            fields=[
+                ('food', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='inventory.food')),
+                ('name', models.TextField()),
+                ('category', models.TextField()),
+                ('document', inventory.models.SearchMatchField(db_column='inventory_food_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'inventory_food_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARDS, 'postgresql': POSTGRES_FORWARDS}),
+            _run({'sqlite': SQLITE_BACKWARDS, 'postgresql': POSTGRES_BACKWARDS}),
+        ),
+    ]
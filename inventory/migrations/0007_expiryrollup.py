@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:10
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_expiry_rollup(apps, schema_editor):
+    ExpiryRollup = apps.get_model('inventory', 'ExpiryRollup')
+    Food = apps.get_model('inventory', 'Food')
+    today = datetime.date.today()
+    counts = (
+        Food.objects.using(schema_editor.connection.alias)
+        .annotate(day=models.Case(
+            models.When(best_before__lt=today, then=models.Value(None)),
+            default=models.F('best_before'),
+            output_field=models.DateField(),
+        ))
+        .order_by()
+        .values_list('category_id', 'day')
+        .annotate(count=models.Count('id'))
+    )
+    ExpiryRollup.objects.using(schema_editor.connection.alias).bulk_create(
+        ExpiryRollup(category_id=category_id, best_before=day, count=count) for category_id, day, count in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_food_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_before', models.DateField(null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_rollup', to='inventory.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['best_before', 'category'], name='rollup_expiry_category_idx')],
+            },
+        ),
+        migrations.RunPython(populate_expiry_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_expiryrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('food_id', models.BigIntegerField(null=True)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Added'), (2, 'Edited'), (3, 'Moved'), (4, 'Removed'), (5, 'Consumed')])),
+                ('quantity', models.FloatField()),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recorded_at', 'category'], name='movement_recorded_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField(choices=[(1, 'Day'), (7, 'Week')])),
+                ('start', models.DateField()),
+                ('closing_quantity', models.FloatField()),
+                ('added', models.FloatField(default=0)),
+                ('consumed', models.FloatField(default=0)),
+                ('removed', models.FloatField(default=0)),
+                ('movements', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'start', 'category'), name='snapshot_period_start_category_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-17 18:44
+
+import datetime
+
+from django.db import migrations, models
+
+
+def rebuild_expiry_rollup(apps, schema_editor):
+    ExpiryRollup = apps.get_model('inventory', 'ExpiryRollup')
+    Food = apps.get_model('inventory', 'Food')
+    alias = schema_editor.connection.alias
+    today = datetime.date.today()
+    totals = (
+        Food.objects.using(alias)
+        .annotate(day=models.Case(
+            models.When(best_before__lt=today, then=models.Value(None)),
+            default=models.F('best_before'),
+            output_field=models.DateField(),
+        ))
+        .order_by()
+        .values_list('category_id', 'day')
+        .annotate(count=models.Count('id'), quantity=models.Sum('quantity'))
+    )
+    ExpiryRollup.objects.using(alias).all().delete()
+    ExpiryRollup.objects.using(alias).bulk_create(
+        ExpiryRollup(category_id=category_id, best_before=day, count=count, quantity=quantity)
+        for category_id, day, count, quantity in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_stock_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expiryrollup',
+            name='quantity',
+            field=models.FloatField(default=0),
+        ),
+        # Fills in the quantities, and leaves one row per date for the constraint
+        migrations.RunPython(rebuild_expiry_rollup, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='expiryrollup',
+            constraint=models.UniqueConstraint(fields=('category', 'best_before'), name='rollup_category_expiry_uniq'),
+        ),
+    ]
@@ -1,21 +1,166 @@
-from django.db import models
-from datetime import date
+from django.db import models, router, transaction
+from django.utils import timezone
+from django.db.models.functions import Coalesce
+from datetime import date, timedelta
+from inventory.signals import inventory_changed
+
+EXPIRING_SOON_DAYS = 7
+
+
+class ExpiryBucket(models.IntegerChoices):
+    EXPIRED = 0, 'Expired'
+    TODAY = 1, 'Expires today'
+    SOON = 2, 'Expiring soon'
+    FRESH = 3, 'Fresh'
+
+
+def expiry_bucket(field, today):
+    """Case/When mapping a best before column to its ExpiryBucket relative to ``today``"""
+    return models.Case(
+        models.When(**{f'{field}__lt': today}, then=models.Value(ExpiryBucket.EXPIRED)),
+        models.When(**{field: today}, then=models.Value(ExpiryBucket.TODAY)),
+        models.When(
+            **{f'{field}__lte': today + timedelta(days=EXPIRING_SOON_DAYS)}, then=models.Value(ExpiryBucket.SOON)
+        ),
+        default=models.Value(ExpiryBucket.FRESH),
+        output_field=models.IntegerField(),
+    )
+
+
+def expiry_bucket_filter(field, bucket, today):
+    """Date range lookups selecting one ExpiryBucket, so the filter can use an index on ``field``"""
+    soon = today + timedelta(days=EXPIRING_SOON_DAYS)
+    return {
+        ExpiryBucket.EXPIRED: {f'{field}__lt': today},
+        ExpiryBucket.TODAY: {field: today},
+        ExpiryBucket.SOON: {f'{field}__gt': today, f'{field}__lte': soon},
+        ExpiryBucket.FRESH: {f'{field}__gt': soon},
+    }[bucket]
+
+
+def _food_total(field, aggregate, output_field):
+    """Correlated subquery totalling the foods of the outer category"""
+    return Coalesce(
+        models.Subquery(
+            Food.objects.filter(category=models.OuterRef('pk'))
+            .order_by()
+            .values('category')
+            .annotate(total=aggregate(field))
+            .values('total')
+        ),
+        models.Value(0),
+        output_field=output_field,
+    )
+
+
+class CategoryQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        inventory_changed.send(sender=Category, using=self.db)
+        return objs
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        inventory_changed.send(sender=Category, using=self.db)
+        return rows
+    update.alters_data = True
+
+    def delete(self):
+        result = super().delete()
+        inventory_changed.send(sender=Category, using=self.db)
+        return result
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def with_stock(self):
+        """Annotate the SQL-side stock difference for filtering and ordering"""
+        return self.annotate(
+            stock_difference=models.F('current_quantity') - models.F('ideal_quantity'),
+        )
+
+    def low_stock(self):
+        """Categories whose current stock is below their ideal quantity"""
+        return self.with_stock().filter(current_quantity__lt=models.F('ideal_quantity'))
+
+    def adjust_stock(self, quantity, count):
+        """Shift the stored stock counters by a delta without reading them first"""
+        return self.update(
+            current_quantity=models.F('current_quantity') + quantity,
+            food_count=models.F('food_count') + count,
+        )
+
+    def recompute_stock(self):
+        """Rewrite the stored stock counters from the food table"""
+        return self.update(
+            current_quantity=_food_total('quantity', models.Sum, models.FloatField()),
+            food_count=_food_total('id', models.Count, models.IntegerField()),
+        )
+
+    def refresh_expiry_rollup(self, today=None):
+        """Rebuild the ExpiryRollup rows of these categories from the food table
+
+        For bulk writes, the nightly rollover and seeding; a single food write
+        shifts its one row with ``ExpiryRollup.objects.adjust()`` instead.
+        """
+        today = today or date.today()
+        categories = self.values('pk')
+        ExpiryRollup.objects.filter(category__in=categories).delete()
+        counts = (
+            Food.objects.filter(category__in=categories)
+            .annotate(day=models.Case(
+                models.When(best_before__lt=today, then=models.Value(None)),
+                default=models.F('best_before'),
+                output_field=models.DateField(),
+            ))
+            .order_by()
+            .values_list('category_id', 'day')
+            .annotate(count=models.Count('id'), quantity=models.Sum('quantity'))
+        )
+        return ExpiryRollup.objects.bulk_create(
+            ExpiryRollup(category_id=category_id, best_before=day, count=count, quantity=quantity)
+            for category_id, day, count, quantity in counts
+        )
+
+    def with_stock_drift(self):
+        """Categories whose stored counters disagree with the food table"""
+        return self.annotate(
+            actual_quantity=_food_total('quantity', models.Sum, models.FloatField()),
+            actual_count=_food_total('id', models.Count, models.IntegerField()),
+        ).exclude(
+            current_quantity=models.F('actual_quantity'),
+            food_count=models.F('actual_count'),
+        )
 
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     unit = models.CharField(max_length=50)
     ideal_quantity = models.FloatField()
+    # Maintained by Food writes, never by saving the category itself
+    current_quantity = models.FloatField(default=0, editable=False)
+    food_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
+
+    STOCK_FIELDS = ('current_quantity', 'food_count')
 
     def __str__(self):
         return self.name
-    
-    @property
-    def current_quantity(self):
-        """Calculate current total quantity of items in this category"""
-        return self.foods.aggregate(
-            total=models.Sum('quantity')
-        )['total'] or 0
+
+    def save(self, *args, **kwargs):
+        """Never overwrite the stock counters with a possibly stale in-memory copy"""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in self.STOCK_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        inventory_changed.send(sender=Category, using=self._state.db)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        inventory_changed.send(sender=Category, using=self._state.db)
+        return result
     
     @property
     def quantity_difference(self):
@@ -27,29 +172,226 @@ class Category(models.Model):
         """Check if category is below ideal stock level"""
         return self.current_quantity < self.ideal_quantity
 
+
+class FoodQuerySet(models.QuerySet):
+    LISTING_FIELDS = ('name', 'quantity', 'best_before', 'category', 'category__name', 'category__unit')
+
+    def for_listing(self):
+        """Join the category and load only the columns result tables render"""
+        return self.select_related('category').only(*self.LISTING_FIELDS)
+
+    def with_expiry(self, today=None):
+        """Annotate ``expiry_bucket`` (an ExpiryBucket) for filtering, ordering and grouping"""
+        return self.annotate(expiry_bucket=expiry_bucket('best_before', today or date.today()))
+
+    def stored_count(self):
+        """Number of foods from the categories' stored counters, without counting the food table"""
+        return Category.objects.using(self.db).aggregate(total=Coalesce(models.Sum('food_count'), 0))['total']
+
+    READ_CHUNK_SIZE = 900
+
+    def _stock_rows(self):
+        return self.order_by().values_list('pk', 'category_id', 'quantity')
+
+    def _read_stock(self, pks):
+        """``{pk: (category id, quantity)}`` for ``pks``, read in chunks to stay under parameter limits"""
+        pks = list(pks)
+        stock = {}
+        for start in range(0, len(pks), self.READ_CHUNK_SIZE):
+            chunk = Food.objects.using(self.db).filter(pk__in=pks[start:start + self.READ_CHUNK_SIZE])
+            stock.update((pk, (category_id, quantity)) for pk, category_id, quantity in chunk._stock_rows())
+        return stock
+
+    def bulk_create(self, objs, *args, **kwargs):
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            totals = {}
+            for food in objs:
+                quantity, count = totals.get(food.category_id, (0, 0))
+                totals[food.category_id] = (quantity + food.quantity, count + 1)
+            for category_id, (quantity, count) in totals.items():
+                Category.objects.filter(pk=category_id).adjust_stock(quantity, count)
+            Category.objects.filter(pk__in=totals).refresh_expiry_rollup()
+            StockMovement.objects.record(
+                StockMovement.Kind.CREATE, [(food.category_id, food.pk, food.quantity) for food in objs],
+            )
+            inventory_changed.send(sender=Food, using=self.db)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # Each batch goes through update(), which reconciles the stock counters
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+    STOCK_FIELDS = {'quantity', 'category', 'category_id'}
+    EXPIRY_FIELDS = {'best_before', 'category', 'category_id'}
+
+    def update(self, **kwargs):
+        stock_changed = bool(self.STOCK_FIELDS & set(kwargs))
+        expiry_changed = bool(self.EXPIRY_FIELDS & set(kwargs))
+        if not (stock_changed or expiry_changed):
+            rows = super().update(**kwargs)
+            inventory_changed.send(sender=Food, using=self.db)
+            return rows
+        # Read the affected rows from the database being written, not a replica
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            before = {pk: (category_id, quantity) for pk, category_id, quantity in self._stock_rows()}
+            rows = super().update(**kwargs)
+            category_ids = {category_id for category_id, _ in before.values()}
+            if stock_changed:
+                # Targets may be expressions (e.g. bulk_update's CASE), so read the rows back
+                after = self._read_stock(before)
+                category_ids.update(category_id for category_id, _ in after.values())
+            categories = Category.objects.filter(pk__in=category_ids)
+            if stock_changed:
+                categories.recompute_stock()
+                StockMovement.objects.record_changes(before, after)
+            # The rollup holds quantities as well as counts, so either kind of change rebuilds it
+            categories.refresh_expiry_rollup()
+            inventory_changed.send(sender=Food, using=self.db)
+        return rows
+    update.alters_data = True
+
+    def decrement(self, amount):
+        """Subtract ``amount`` from the matched lot in one UPDATE guarded by ``quantity >= amount``
+
+        Meant for a queryset matching a single lot (``filter(pk=...)``). The category
+        counter is shifted by the same delta instead of being recomputed. Returns the
+        number of lots decremented: 0 when the lot is missing or holds too little.
+        """
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            rows = super(FoodQuerySet, self.filter(quantity__gte=amount)).update(quantity=models.F('quantity') - amount)
+            if rows:
+                lots = list(self.order_by().values_list('category_id', 'pk', 'best_before'))
+                Category.objects.filter(pk__in={category_id for category_id, _, _ in lots}).adjust_stock(-amount * rows, 0)
+                for category_id, _, best_before in lots:
+                    ExpiryRollup.objects.adjust(category_id, best_before, -amount, 0)
+                StockMovement.objects.record(
+                    StockMovement.Kind.CONSUME, [(category_id, pk, -amount) for category_id, pk, _ in lots],
+                )
+                inventory_changed.send(sender=Food, using=self.db)
+        return rows
+    decrement.alters_data = True
+
+    def delete(self):
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            stock = list(self._stock_rows())
+            result = super().delete()
+            totals = {}
+            for _, category_id, quantity in stock:
+                total, count = totals.get(category_id, (0, 0))
+                totals[category_id] = (total + quantity, count + 1)
+            for category_id, (quantity, count) in totals.items():
+                Category.objects.filter(pk=category_id).adjust_stock(-quantity, -count)
+            if totals:
+                Category.objects.filter(pk__in=totals).refresh_expiry_rollup()
+                StockMovement.objects.record(
+                    StockMovement.Kind.DELETE, [(category_id, pk, -quantity) for pk, category_id, quantity in stock],
+                )
+            inventory_changed.send(sender=Food, using=self.db)
+        return result
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Food(models.Model):
     name = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='foods')
     quantity = models.FloatField()
     best_before = models.DateField()
 
+    objects = FoodQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-category expiry ranges (dashboard panel, oldest-first lots)
+            models.Index(fields=['category', 'best_before'], name='food_category_expiry_idx'),
+            # Best-before searches and admin ordering; covers the grouped expiry count
+            models.Index(fields=['best_before', 'category'], name='food_expiry_category_idx'),
+            # Covers the per-category quantity totals used to reconcile the counters
+            models.Index(fields=['category', 'quantity'], name='food_category_quantity_idx'),
+            # Keyset pagination of name-ordered search results
+            models.Index(fields=['name', 'id'], name='food_name_idx'),
+        ]
+
+    STORED_FIELDS = ('category_id', 'quantity', 'best_before')
+
+    def _persisted_stock(self, using):
+        """The stored category, quantity and best before date, locked until the write commits
+
+        Read inside the write's transaction rather than remembered from load time, so
+        overlapping edits of the same food each shift the counters from the row they replace.
+        """
+        return (
+            Food.objects.using(using).select_for_update().filter(pk=self.pk)
+            .values_list(*self.STORED_FIELDS).first()
+        )
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(Food, instance=self)
+        with transaction.atomic(using=using):
+            previous = None if self._state.adding else self._persisted_stock(using)
+            super().save(*args, **kwargs)
+            best_before = self._meta.get_field('best_before').to_python(self.best_before)
+            if previous is None:
+                Category.objects.filter(pk=self.category_id).adjust_stock(self.quantity, 1)
+                ExpiryRollup.objects.adjust(self.category_id, best_before, self.quantity, 1)
+                StockMovement.objects.record(StockMovement.Kind.CREATE, [(self.category_id, self.pk, self.quantity)])
+            else:
+                StockMovement.objects.record_changes(
+                    {self.pk: previous[:2]}, {self.pk: (self.category_id, self.quantity)},
+                )
+                same_category = str(previous[0]) == str(self.category_id)
+                if same_category:
+                    Category.objects.filter(pk=self.category_id).adjust_stock(self.quantity - previous[1], 0)
+                else:
+                    Category.objects.filter(pk=previous[0]).adjust_stock(-previous[1], -1)
+                    Category.objects.filter(pk=self.category_id).adjust_stock(self.quantity, 1)
+                if same_category and previous[2] == best_before:
+                    if self.quantity != previous[1]:
+                        ExpiryRollup.objects.adjust(self.category_id, best_before, self.quantity - previous[1], 0)
+                else:
+                    ExpiryRollup.objects.adjust(previous[0], previous[2], -previous[1], -1)
+                    ExpiryRollup.objects.adjust(self.category_id, best_before, self.quantity, 1)
+            inventory_changed.send(sender=Food, using=using)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(Food, instance=self)
+        with transaction.atomic(using=using):
+            previous = self._persisted_stock(using)
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                Category.objects.filter(pk=previous[0]).adjust_stock(-previous[1], -1)
+                ExpiryRollup.objects.adjust(previous[0], previous[2], -previous[1], -1)
+                StockMovement.objects.record(StockMovement.Kind.DELETE, [(previous[0], self.pk, -previous[1])])
+            inventory_changed.send(sender=Food, using=using)
+        return result
+
     def __str__(self):
         return self.name
     
 
     @property
     def days_until_expiry(self):
-        """Calculate days until the item expires"""
-        today = date.today()
-        return (self.best_before - today).days if self.best_before else 0
+        """Calculate days until the item expires, once per best-before date"""
+        cached = self.__dict__.get('_expiry_days')
+        if cached is None or cached[0] != self.best_before:
+            days = (self.best_before - date.today()).days if self.best_before else 0
+            cached = self._expiry_days = (self.best_before, days)
+        return cached[1]
     
     @property
     def is_expired(self):
         """Check if the item has expired"""
-        return self.best_before < date.today() if self.best_before else False
+        return self.days_until_expiry < 0 if self.best_before else False
     
     @property
-    def is_expiring_soon(self, days=7):
+    def is_expiring_soon(self, days=EXPIRING_SOON_DAYS):
         """Check if item is expiring within specified days (default 7)"""
         return 0 <= self.days_until_expiry <= days
     
@@ -61,7 +403,165 @@ class Food(models.Model):
             return "Expired"
         elif days == 0:
             return "Expires Today"
-        elif days <= 7:
+        elif days <= EXPIRING_SOON_DAYS:
             return f"Expires in {days} day{'s' if days != 1 else ''}"
         else:
             return "Fresh"
+
+
+class ExpiryRollupQuerySet(models.QuerySet):
+    def adjust(self, category_id, best_before, quantity, count, today=None):
+        """Shift the row holding lots of ``category_id`` best before ``best_before`` by a delta
+
+        A past date is held by the category's expired (``best_before=None``) row,
+        unless the nightly rollover has not folded its own row in yet. A row is
+        created for the first lot of a date and deleted with the last one. Callers
+        have already updated the category's counters in the same transaction, so
+        the category row lock keeps concurrent adjustments of its rows in order.
+        """
+        today = today or date.today()
+        rows = self.filter(category_id=category_id)
+        keys = [best_before] if best_before >= today else [best_before, None]
+        for key in keys:
+            row = rows.filter(best_before=key)
+            if row.update(count=models.F('count') + count, quantity=models.F('quantity') + quantity):
+                if count < 0:
+                    row.filter(count=0).delete()
+                return
+        if count > 0:
+            self.create(category_id=category_id, best_before=keys[-1], count=count, quantity=quantity)
+
+
+class ExpiryRollup(models.Model):
+    """Per-category food counts and quantities by best before date
+
+    Read by the dashboard's expiring-soon panel and the stock forecast. Single
+    food writes shift their date's row, bulk writes rebuild the categories they
+    touch, and ``manage.py expiry_rollover`` rebuilds everything nightly, folding
+    dates that have since passed into the category's ``best_before=None``
+    (expired) row.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='expiry_rollup')
+    best_before = models.DateField(null=True)
+    count = models.PositiveIntegerField()
+    quantity = models.FloatField(default=0)
+
+    objects = ExpiryRollupQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['best_before', 'category'], name='rollup_expiry_category_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'best_before'], name='rollup_category_expiry_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.category_id} {self.best_before or "expired"}: {self.count}'
+
+
+class StockMovementQuerySet(models.QuerySet):
+    def record(self, kind, changes):
+        """Append ``(category id, food id, quantity delta)`` changes, skipping those of zero"""
+        movements = [
+            StockMovement(category_id=category_id, food_id=food_id, kind=kind, quantity=quantity)
+            for category_id, food_id, quantity in changes if quantity
+        ]
+        return self.bulk_create(movements, batch_size=FoodQuerySet.READ_CHUNK_SIZE) if movements else []
+
+    def record_changes(self, before, after):
+        """Record the difference between two ``{food id: (category id, quantity)}`` snapshots"""
+        updates, moves = [], []
+        for pk, (category_id, quantity) in before.items():
+            new_category_id, new_quantity = after.get(pk, (category_id, quantity))
+            if str(new_category_id) == str(category_id):
+                updates.append((category_id, pk, new_quantity - quantity))
+            else:
+                moves += [(category_id, pk, -quantity), (new_category_id, pk, new_quantity)]
+        return self.record(StockMovement.Kind.UPDATE, updates) + self.record(StockMovement.Kind.MOVE, moves)
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of stock changes: one signed quantity delta per food and category
+
+    Written by every Food write path that changes a quantity or category. Foods
+    are referenced by id only, so their history outlives them; trends are read
+    from StockSnapshot rather than from this table.
+    """
+    class Kind(models.IntegerChoices):
+        CREATE = 1, 'Added'
+        UPDATE = 2, 'Edited'
+        MOVE = 3, 'Moved'
+        DELETE = 4, 'Removed'
+        CONSUME = 5, 'Consumed'
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='movements')
+    food_id = models.BigIntegerField(null=True)
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    quantity = models.FloatField()
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    objects = StockMovementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Grouping a day's movements when rolling up snapshots, and pruning old rows
+            models.Index(fields=['recorded_at', 'category'], name='movement_recorded_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.quantity:+g} ({self.category_id})'
+
+
+class StockSnapshot(models.Model):
+    """Per-category stock figures for one day or week, rolled up from StockMovement"""
+    class Period(models.IntegerChoices):
+        DAY = 1, 'Day'
+        WEEK = 7, 'Week'
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='snapshots')
+    period = models.PositiveSmallIntegerField(choices=Period.choices)
+    start = models.DateField()
+    closing_quantity = models.FloatField()
+    added = models.FloatField(default=0)
+    consumed = models.FloatField(default=0)
+    removed = models.FloatField(default=0)
+    movements = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'start', 'category'], name='snapshot_period_start_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.category_id} {self.get_period_display().lower()} of {self.start}: {self.closing_quantity:g}'
+
+
+class SearchMatchField(models.TextField):
+    """The hidden column named after an FTS5 table, the target of its MATCH operator"""
+
+
+@SearchMatchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class FoodSearchEntry(models.Model):
+    """Row of the SQLite FTS5 index over food and category names, kept in sync by triggers"""
+    food = models.OneToOneField(
+        Food, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_entry'
+    )
+    name = models.TextField()
+    category = models.TextField()
+    document = SearchMatchField(db_column='inventory_food_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_food_fts'
+
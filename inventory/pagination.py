@@ -0,0 +1,132 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class KeysetPage:
+    """One page of rows plus the cursors that lead to its neighbours"""
+
+    def __init__(self, items, has_next, has_previous, ordering):
+        self.items = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(items[-1], ordering) if has_next else None
+        self.previous_cursor = encode_cursor(items[0], ordering) if has_previous else None
+
+    @property
+    def is_complete(self):
+        """True when this single page holds every matching row"""
+        return not self.has_next and not self.has_previous
+
+
+def encode_cursor(obj, ordering):
+    values = [str(getattr(obj, field)) for field in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _ordering_field(queryset, name):
+    annotation = queryset.query.annotations.get(name)
+    return annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+
+
+def decode_cursor(cursor, ordering, queryset):
+    """Return the cursor's key values as ``queryset``'s ordering fields take them, or None when missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    if not all(isinstance(value, str) for value in values):
+        return None
+    # A tampered value would otherwise only fail once the filter reaches the database
+    try:
+        return [_ordering_field(queryset, field).to_python(value) for field, value in zip(ordering, values)]
+    except ValidationError:
+        return None
+
+
+def get_page_size(value):
+    default = getattr(settings, 'INVENTORY_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'INVENTORY_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def _seek(ordering, values, forward):
+    """Build the row-value comparison (a, b) > (x, y) as nested OR/AND filters"""
+    lookup = 'gt' if forward else 'lt'
+    condition = Q()
+    for i, field in enumerate(ordering):
+        equal = {ordering[j]: values[j] for j in range(i)}
+        condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+def _keyset_query(queryset, ordering, params):
+    """Return the sliced queryset for one page and a function turning its rows into a KeysetPage"""
+    page_size = get_page_size(params.get('page_size'))
+    after = decode_cursor(params.get('after'), ordering, queryset)
+    before = None if after else decode_cursor(params.get('before'), ordering, queryset)
+
+    if before:
+        descending = [f'-{field}' for field in ordering]
+
+        def build(rows):
+            items = rows[:page_size][::-1]
+            return KeysetPage(items, has_next=bool(items), has_previous=len(rows) > page_size, ordering=ordering)
+
+        return queryset.filter(_seek(ordering, before, False)).order_by(*descending)[:page_size + 1], build
+
+    if after:
+        queryset = queryset.filter(_seek(ordering, after, True))
+
+    def build(rows):
+        return KeysetPage(rows[:page_size], has_next=len(rows) > page_size, has_previous=bool(after and rows), ordering=ordering)
+
+    return queryset.order_by(*ordering)[:page_size + 1], build
+
+
+def paginate_keyset(queryset, ordering, params):
+    """Seek-paginate ``queryset`` on the unique ``ordering`` using ``after``/``before`` cursors
+
+    The cost of a page depends on the page size only, never on how deep the
+    page is or how many rows match, because no OFFSET or COUNT is issued.
+    """
+    query, build = _keyset_query(queryset, ordering, params)
+    return build(list(query))
+
+
+async def apaginate_keyset(queryset, ordering, params):
+    """Async paginate_keyset"""
+    query, build = _keyset_query(queryset, ordering, params)
+    return build([row async for row in query])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Page-number paginator that never runs a full COUNT(*) over a large table
+
+    An unfiltered queryset that offers ``stored_count()`` takes its size from
+    there. Anything else counts at most ``count_limit`` rows, so page links stop
+    at that depth and deeper rows are reached by narrowing the filters instead.
+    """
+    count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and hasattr(queryset, 'stored_count'):
+            return queryset.stored_count()
+        return queryset.order_by()[:self.count_limit].count()
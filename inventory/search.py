@@ -0,0 +1,164 @@
+"""Pluggable full-text search over food and category names.
+
+The backend is chosen by ``INVENTORY_SEARCH_BACKEND`` (a dotted path) or, when
+unset, by the database vendor: an FTS5 index on SQLite, tsvector/trigram GIN
+indexes on PostgreSQL, and plain ``icontains`` scans anywhere else. Every
+backend returns ``(queryset, ordering)`` so results can be keyset-paginated.
+"""
+import difflib
+import re
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F, Func, Q, Value
+from django.utils.dateparse import parse_date
+from django.utils.module_loading import import_string
+from inventory.models import Food
+
+NAME_ORDERING = ('name', 'id')
+RANK_ORDERING = ('search_rank', 'id')
+BEST_BEFORE_ORDERING = ('best_before', 'id')
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class IContainsSearchBackend:
+    """Substring matching with LIKE '%x%'; scans the table but needs no index"""
+
+    def search(self, queryset, text, column=None):
+        if column == 'category':
+            return queryset.filter(category__name__icontains=text), NAME_ORDERING
+        return queryset.filter(Q(name__icontains=text) | Q(category__name__icontains=text)), NAME_ORDERING
+
+
+class SQLiteFTSSearchBackend:
+    """Ranked prefix search on the FTS5 table, widened with close vocabulary terms on typos
+
+    FTS5 only matches the start of a word, so a term that begins no indexed word
+    may still be part of one ('ilk' in 'Milk'). When such a term leaves the
+    search without results it is repeated as an ``icontains`` scan; searches
+    whose terms all start an indexed word never pay for the extra query.
+    """
+    vocab_table = 'inventory_food_fts_vocab'
+    max_alternatives = 3
+    typo_cutoff = 0.75
+
+    def search(self, queryset, text, column=None):
+        terms = tokenize(text)
+        if not terms:
+            return queryset, NAME_ORDERING
+        with connections[queryset.db].cursor() as cursor:
+            expressions = [self._term_expression(cursor, term) for term in terms]
+        expression = ' '.join(phrase for phrase, _ in expressions)
+        if column:
+            expression = f'{column} : ({expression})'
+        matches = queryset.filter(search_entry__document__match=expression).annotate(
+            search_rank=F('search_entry__rank'),
+        )
+        if not all(prefixed for _, prefixed in expressions) and not matches.exists():
+            return IContainsSearchBackend().search(queryset, text, column)
+        return matches, RANK_ORDERING
+
+    def _term_expression(self, cursor, term):
+        """``(expression, whether an indexed word starts with term)``
+
+        The expression prefix-matches ``term``; if nothing in the index starts
+        with it, its nearest spellings are ORed in.
+        """
+        phrase = f'"{term}"*'
+        if self._vocabulary(cursor, term, term + '\uffff', limit=1):
+            return phrase, True
+        candidates = self._vocabulary(cursor, term[0], term[0] + '\uffff')
+        alternatives = difflib.get_close_matches(term, candidates, n=self.max_alternatives, cutoff=self.typo_cutoff)
+        if not alternatives:
+            return phrase, False
+        return '(' + ' OR '.join([phrase, *(f'"{word}"' for word in alternatives)]) + ')', False
+
+    def _vocabulary(self, cursor, low, high, limit=-1):
+        cursor.execute(
+            f'SELECT term FROM {self.vocab_table} WHERE term >= %s AND term < %s LIMIT %s', [low, high, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Ranked prefix tsquery over GIN-indexed names, falling back to trigram similarity on typos
+
+    The fallback filters with pg_trgm's ``%`` operator, which the trigram GIN
+    indexes serve; its cut-off is the ``pg_trgm.similarity_threshold`` setting
+    (0.3 unless changed). Similarity itself is only computed to rank the matches.
+    """
+    config = 'simple'
+
+    def search(self, queryset, text, column=None):
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity
+
+        terms = tokenize(text)
+        if not terms:
+            return queryset, NAME_ORDERING
+
+        def vector(field):
+            # Matches the expression of the GIN indexes created in 0006_food_search_index
+            return Func(Value(self.config), F(field), function='to_tsvector', output_field=SearchVectorField())
+
+        query = SearchQuery(' & '.join(f'{term}:*' for term in terms), config=self.config, search_type='raw')
+        category_match = Q(category_vector=query)
+        match = category_match if column == 'category' else Q(name_vector=query) | category_match
+        matches = queryset.annotate(name_vector=vector('name'), category_vector=vector('category__name')).filter(match)
+        if matches.exists():
+            rank = SearchRank(F('name_vector'), query) + SearchRank(F('category_vector'), query)
+            return matches.annotate(search_rank=-rank), RANK_ORDERING
+
+        similar = Q(TrigramSimilar(F('category__name'), text))
+        similarity = TrigramSimilarity('category__name', text)
+        if column != 'category':
+            similar |= Q(TrigramSimilar(F('name'), text))
+            similarity = similarity + TrigramSimilarity('name', text)
+        return queryset.filter(similar).annotate(search_rank=-similarity), RANK_ORDERING
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    path = getattr(settings, 'INVENTORY_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    vendor = connections[router.db_for_read(Food)].vendor
+    return VENDOR_BACKENDS.get(vendor, IContainsSearchBackend)()
+
+
+def search_foods(queryset, text, column=None):
+    """Filter ``queryset`` to foods matching ``text``; returns ``(queryset, keyset ordering)``"""
+    return get_search_backend().search(queryset, text, column)
+
+
+def filter_foods(queryset, slug, search):
+    """Apply one of the search page filters to ``queryset``
+
+    ``slug`` is ``"category"``, ``"best_before_date"`` or None for a name search.
+    Returns ``(queryset, keyset ordering, error message or None)``.
+    """
+    if slug == 'category':
+        if not search:
+            return queryset.none(), NAME_ORDERING, None
+        queryset, ordering = search_foods(queryset, search, column='category')
+        return queryset, ordering, None
+    if slug == 'best_before_date':
+        try:
+            expires_before_date = parse_date(search)
+        except ValueError:
+            expires_before_date = None
+        if not expires_before_date:
+            return queryset.none(), BEST_BEFORE_ORDERING, "Invalid date format. Please use YYYY-MM-DD."
+        return queryset.filter(best_before__lte=expires_before_date), BEST_BEFORE_ORDERING, None
+    queryset, ordering = search_foods(queryset, search)
+    return queryset, ordering, None
+
@@ -0,0 +1,114 @@
+"""Synthetic household inventories for development data and benchmarks.
+
+Categories follow realistic profiles: units, shelf lives, lot sizes and how
+often each kind of food is bought, so perishables expire within days, canned
+goods last for years and a share of every pantry is already out of date.
+Foods are inserted with plain bulk INSERTs, and the stock counters and expiry
+rollup are brought up to date once at the end rather than once per batch. ``history_days`` adds that many days of consumption to the
+movement ledger and rolls it up, so trends and forecasts have data to show.
+"""
+import random
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.utils import timezone
+from inventory.history import roll_up
+from inventory.models import Category, Food, FoodQuerySet, StockMovement
+from inventory.signals import inventory_changed
+
+SCALES = {
+    '1k': (1_000, 14),
+    '100k': (100_000, 60),
+    '10m': (10_000_000, 300),
+}
+DEFAULT_BATCH_SIZE = 10_000
+
+# name, unit, shelf life in days, lot size, relative purchase frequency, foods
+PROFILES = [
+    ('Dairy', 'liters', (5, 21), (0.25, 2), 8, ['milk', 'yogurt', 'cream', 'kefir', 'cheese']),
+    ('Vegetables', 'kg', (3, 14), (0.1, 3), 10, ['carrot', 'tomato', 'onion', 'potato', 'spinach']),
+    ('Fruits', 'kg', (3, 14), (0.2, 3), 9, ['apple', 'banana', 'orange', 'pear', 'grapes']),
+    ('Meat', 'kg', (2, 7), (0.2, 2), 5, ['chicken', 'beef', 'pork', 'turkey', 'lamb']),
+    ('Fish', 'kg', (1, 5), (0.2, 1.5), 3, ['salmon', 'cod', 'trout', 'tuna', 'shrimp']),
+    ('Frozen', 'packs', (60, 365), (1, 4), 4, ['peas', 'pizza', 'berries', 'fries', 'dumplings']),
+    ('Grains', 'kg', (180, 720), (0.5, 5), 5, ['rice', 'oats', 'quinoa', 'barley', 'flour']),
+    ('Pasta', 'packs', (365, 730), (1, 6), 4, ['spaghetti', 'penne', 'fusilli', 'noodles', 'lasagne']),
+    ('Canned goods', 'pieces', (365, 1095), (1, 12), 6, ['beans', 'tomatoes', 'corn', 'lentils', 'soup']),
+    ('Bakery', 'pieces', (2, 7), (1, 4), 6, ['bread', 'rolls', 'bagels', 'croissants', 'buns']),
+    ('Beverages', 'liters', (90, 540), (0.5, 6), 6, ['juice', 'water', 'soda', 'tea', 'coffee']),
+    ('Spices', 'packs', (365, 1095), (1, 3), 2, ['salt', 'pepper', 'paprika', 'cumin', 'oregano']),
+    ('Snacks', 'packs', (60, 270), (1, 5), 4, ['crackers', 'chips', 'nuts', 'pretzels', 'cookies']),
+    ('Eggs', 'pieces', (14, 35), (6, 30), 3, ['eggs']),
+]
+ADJECTIVES = ['fresh', 'frozen', 'organic', 'smoked', 'dried', 'whole', 'sliced', 'spicy', 'sweet', 'local']
+
+
+def _profiles(categories):
+    """``categories`` profiles, cycling through PROFILES with numbered names once they run out"""
+    for index in range(categories):
+        name, *rest = PROFILES[index % len(PROFILES)]
+        cycle = index // len(PROFILES)
+        yield (f'{name} {cycle + 1}' if cycle else name, *rest)
+
+
+def _best_before(rng, shelf_life, today):
+    # Bought at a random point of its shelf life (or a little after), so some lots have expired
+    days = rng.randint(*shelf_life)
+    return today + timedelta(days=days - rng.randint(0, days + days // 5))
+
+
+def seed_inventory(foods, categories, batch_size=DEFAULT_BATCH_SIZE, seed_value=0, history_days=0, today=None):
+    """Insert ``categories`` categories holding ``foods`` lots in total; returns the categories"""
+    rng = random.Random(seed_value)
+    today = today or timezone.localdate()
+    profiles = list(_profiles(categories))
+    weights = [profile[4] for profile in profiles]
+    total_weight = sum(weights)
+
+    with transaction.atomic():
+        created = Category.objects.bulk_create(
+            Category(
+                name=name, unit=unit,
+                # Sized so that roughly a third of the categories start below their ideal stock
+                ideal_quantity=round(foods * weight / total_weight * sum(lot_size) / 2 * rng.uniform(0.6, 1.2), 2),
+            )
+            for name, unit, _, lot_size, weight, _ in profiles
+        )
+        plain = super(FoodQuerySet, Food.objects.all())
+        for start in range(0, foods, batch_size):
+            batch = []
+            for index in rng.choices(range(len(profiles)), weights=weights, k=min(batch_size, foods - start)):
+                _, _, shelf_life, lot_size, _, nouns = profiles[index]
+                batch.append(Food(
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(nouns)}',
+                    category_id=created[index].pk,
+                    quantity=round(rng.uniform(*lot_size), 2),
+                    best_before=_best_before(rng, shelf_life, today),
+                ))
+            plain.bulk_create(batch)
+
+        seeded = Category.objects.filter(pk__in=[category.pk for category in created])
+        seeded.recompute_stock()
+        seeded.refresh_expiry_rollup(today)
+        if history_days:
+            _seed_history(rng, created, history_days, today)
+    inventory_changed.send(sender=Food)
+    if history_days:
+        roll_up(today)
+    return created
+
+
+def _seed_history(rng, categories, days, today):
+    """Consumption of about a tenth of each category's ideal stock a day, plus restocking"""
+    movements = []
+    for category in categories:
+        for age in range(1, days + 1):
+            recorded_at = timezone.make_aware(datetime.combine(today - timedelta(days=age), time(12)))
+            used = round(category.ideal_quantity / 10 * rng.uniform(0.5, 1.5), 2)
+            movements.append(StockMovement(
+                category=category, kind=StockMovement.Kind.CONSUME, quantity=-used, recorded_at=recorded_at,
+            ))
+            if rng.random() < 0.3:
+                movements.append(StockMovement(
+                    category=category, kind=StockMovement.Kind.CREATE, quantity=used * 3, recorded_at=recorded_at,
+                ))
+    StockMovement.objects.bulk_create(movements, batch_size=DEFAULT_BATCH_SIZE)
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from inventory.cache import bump_inventory_version
+
+# Sent once per write operation: each Food or Category save and delete, and each bulk
+# queryset write. Model post_save/post_delete receivers would fire once per row and
+# stop Django from deleting rows without loading them, so none are connected
+inventory_changed = Signal()
+
+
+class _Pending:
+    """An on_commit callback that on_commit_once() can recognise until it has run"""
+
+    def __init__(self, func):
+        self.func = func
+        self.pending = True
+
+    def __call__(self):
+        self.pending = False
+        self.func()
+
+
+def on_commit_once(func, using=None):
+    """``transaction.on_commit(func)`` unless ``func`` already waits on the current transaction"""
+    queued = transaction.get_connection(using).run_on_commit
+    if any(isinstance(callback, _Pending) and callback.pending and callback.func == func for _, callback, _ in queued):
+        return
+    transaction.on_commit(_Pending(func), using=using)
+
+
+@receiver(inventory_changed)
+def invalidate_cached_inventory(sender, using=None, **kwargs):
+    # Only once committed: a version published earlier could be cached against the old rows
+    on_commit_once(bump_inventory_version, using)
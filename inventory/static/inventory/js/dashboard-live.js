@@ -0,0 +1,76 @@
+// Keeps the dashboard current from the server-sent event stream in inventory/live.py.
+// The first message is a snapshot of every category, later ones only carry what changed;
+// the panels are redrawn from that state, so a reconnect never needs a page reload.
+(function () {
+    const script = document.currentScript;
+    if (!window.EventSource || typeof stockChart === 'undefined') {
+        return;
+    }
+    const LOW_STOCK_ROWS = 5;
+    let categories = new Map();
+
+    function escapeHtml(text) {
+        const element = document.createElement('span');
+        element.textContent = text;
+        return element.innerHTML;
+    }
+
+    function table(headings, rows) {
+        return '<table class="search-results-table" style="width: 100%;"><thead><tr>' +
+            headings.map((heading) => '<th>' + heading + '</th>').join('') +
+            '</tr></thead><tbody>' +
+            rows.map((cells) => '<tr>' + cells.map((cell) => '<td>' + escapeHtml(String(cell)) + '</td>').join('') + '</tr>').join('') +
+            '</tbody></table>';
+    }
+
+    function render() {
+        const rows = Array.from(categories.values()).sort((a, b) => a.id - b.id);
+        const below = rows.filter((row) => row.below_ideal);
+        document.getElementById('total-categories').textContent = rows.length;
+        document.getElementById('total-food-items').textContent = rows.reduce((total, row) => total + row.food_count, 0);
+        document.getElementById('below-ideal-count').textContent = below.length;
+
+        const expiring = rows.filter((row) => row.expiring_soon > 0);
+        document.getElementById('expiring-soon').innerHTML = expiring.length
+            ? table(['Category', 'Number of Food Items Expiring'], expiring.map((row) => [row.name, row.expiring_soon]))
+            : '<p>No items expiring in the next 7 days.</p>';
+
+        const lowest = below
+            .map((row) => ({ row: row, needed: row.ideal_quantity - row.current_quantity }))
+            .sort((a, b) => b.needed - a.needed)
+            .slice(0, LOW_STOCK_ROWS);
+        document.getElementById('low-stock').innerHTML = lowest.length
+            ? table(['Category', 'Current', 'Needed'], lowest.map((item) => [
+                item.row.name,
+                item.row.current_quantity.toFixed(2) + ' ' + item.row.unit,
+                item.needed.toFixed(2) + ' ' + item.row.unit,
+            ]))
+            : '<p>Every category is at or above its ideal quantity.</p>';
+
+        stockChart.data.labels = rows.map((row) => row.name);
+        stockChart.data.datasets[0].data = rows.map((row) => row.current_quantity);
+        stockChart.data.datasets[1].data = rows.map((row) => row.ideal_quantity);
+        stockChart.update('none');
+    }
+
+    const ALERTS = {
+        below_ideal: (alert) => alert.name + ' fell below its ideal quantity',
+        restocked: (alert) => alert.name + ' is back at its ideal quantity',
+        expiring: (alert) => alert.name + ' now has ' + alert.count + ' item(s) expiring soon',
+    };
+
+    const events = new EventSource(script.dataset.eventsUrl);
+    events.addEventListener('snapshot', (event) => {
+        categories = new Map(JSON.parse(event.data).categories.map((row) => [row.id, row]));
+        render();
+    });
+    events.addEventListener('delta', (event) => {
+        const delta = JSON.parse(event.data);
+        delta.changed.forEach((row) => categories.set(row.id, row));
+        delta.removed.forEach((id) => categories.delete(id));
+        render();
+        if (delta.alerts.length) {
+            document.getElementById('live-alerts').textContent = delta.alerts.map((alert) => ALERTS[alert.kind](alert)).join('. ');
+        }
+    });
+})();
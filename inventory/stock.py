@@ -0,0 +1,121 @@
+import asyncio
+from datetime import date, timedelta
+from django.db.models import Sum
+from inventory.forecast import forecast
+from inventory.models import EXPIRING_SOON_DAYS, Category, ExpiryRollup
+
+
+def _expiring_soon_counts(today):
+    """``(category id, count)`` rows for foods expiring within EXPIRING_SOON_DAYS, from the expiry rollup"""
+    next_7_days = today + timedelta(days=EXPIRING_SOON_DAYS)
+    return (
+        ExpiryRollup.objects.filter(best_before__gt=today, best_before__lte=next_7_days)
+        .order_by()
+        .values_list('category_id')
+        .annotate(count=Sum('count'))
+    )
+
+
+def stock_summary(today=None):
+    """Compute every dashboard figure from the stored category counters and the expiry rollup"""
+    today = today or date.today()
+    return _summarize(Category.objects.order_by('pk'), dict(_expiring_soon_counts(today)))
+
+
+async def astock_summary(today=None):
+    """Async stock_summary: both queries are awaited together instead of one after the other"""
+    today = today or date.today()
+
+    async def expiring_soon():
+        return {category_id: count async for category_id, count in _expiring_soon_counts(today).aiterator()}
+
+    async def categories():
+        return [category async for category in Category.objects.order_by('pk').aiterator()]
+
+    expiring_soon, categories = await asyncio.gather(expiring_soon(), categories())
+    return _summarize(categories, expiring_soon)
+
+
+def _summarize(categories, expiring_soon):
+    total_food_items = 0
+    categories_below_ideal = []
+    expiring_soon_summary = []
+    chart_labels = []
+    chart_current = []
+    chart_ideal = []
+
+    for category in categories:
+        current_quantity = category.current_quantity
+        total_food_items += category.food_count
+
+        if current_quantity < category.ideal_quantity:
+            categories_below_ideal.append({
+                'category': category,
+                'current_quantity': current_quantity,
+                'ideal_quantity': category.ideal_quantity,
+                'unit': category.unit,
+                'quantity_needed': category.ideal_quantity - current_quantity
+            })
+
+        if expiring_soon.get(category.pk):
+            expiring_soon_summary.append({
+                'category__name': category.name,
+                'count': expiring_soon[category.pk]
+            })
+
+        chart_labels.append(category.name)
+        chart_current.append(round(current_quantity, 2))
+        chart_ideal.append(round(category.ideal_quantity, 2))
+
+    return {
+        'total_categories': len(chart_labels),
+        'total_food_items': total_food_items,
+        'num_categories_below_ideal': len(categories_below_ideal),
+        'expiring_soon_summary': expiring_soon_summary,
+        'low_stock_categories': sorted(categories_below_ideal, key=lambda x: x['quantity_needed'], reverse=True)[:5],
+        'chart_labels': chart_labels,
+        'chart_current': chart_current,
+        'chart_ideal': chart_ideal,
+    }
+
+
+def _shopping_item(category):
+    return {
+        'category_name': category.name,
+        'current_quantity': category.current_quantity,
+        'ideal_quantity': category.ideal_quantity,
+        'needed_quantity': category.ideal_quantity - category.current_quantity
+    }
+
+
+def shopping_list(today=None):
+    """Low-stock categories with the quantity needed to reach their ideal stock"""
+    return [_shopping_item(category) for category in Category.objects.low_stock().order_by('pk')]
+
+
+async def ashopping_list(today=None):
+    return [_shopping_item(category) async for category in Category.objects.low_stock().order_by('pk').aiterator()]
+
+
+def forecast_shopping_list(today=None):
+    """Categories whose usable stock is below ideal, soonest projected stockout first
+
+    Stock that will expire before it is used does not count, so the quantity
+    needed is measured against the forecast's effective stock.
+    """
+    forecasts = forecast(today)
+    items = []
+    for category in Category.objects.order_by('pk'):
+        projected = forecasts.get(category.pk)
+        if projected is None or projected['effective_quantity'] >= category.ideal_quantity:
+            continue
+        items.append({
+            **_shopping_item(category),
+            **projected,
+            'needed_quantity': round(category.ideal_quantity - projected['effective_quantity'], 3),
+        })
+    items.sort(key=lambda item: (
+        item['days_until_stockout'] is None, item['days_until_stockout'] or 0, -item['needed_quantity'],
+    ))
+    return items
+
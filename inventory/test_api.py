@@ -0,0 +1,165 @@
+from django.test import TestCase
+from datetime import date, timedelta
+from inventory.models import Category, Food
+
+
+class InventoryApiTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+            self.grains = Category.objects.create(name='Grains', unit='kg', ideal_quantity=1)
+        self.best_before = (date.today() + timedelta(days=5)).isoformat()
+
+    def _create_foods(self, count, category=None):
+        Food.objects.bulk_create([
+            Food(name=f'Milk {i}', category=category or self.dairy, quantity=1, best_before=self.best_before)
+            for i in range(count)
+        ])
+
+    def test_food_list_query_count_is_constant(self):
+        self._create_foods(2)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/foods/')
+        self._create_foods(30, self.grains)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/foods/')
+        self.assertEqual(len(response.json()['results']), 32)
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Dairy')
+
+    def test_category_list_query_count_is_constant(self):
+        for i in range(20):
+            Category.objects.create(name=f'Category {i}', unit='kg', ideal_quantity=1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/categories/')
+        self.assertEqual(len(response.json()['results']), 22)
+
+    def test_cursor_pagination_and_field_selection(self):
+        self._create_foods(5)
+        response = self.client.get('/api/v1/foods/', {'page_size': 2, 'fields': 'id,name'})
+        body = response.json()
+        self.assertEqual([set(item) for item in body['results']], [{'id', 'name'}] * 2)
+        self.assertIsNone(body['previous'])
+
+        second = self.client.get(body['next']).json()
+        self.assertEqual([item['name'] for item in second['results']], ['Milk 2', 'Milk 3'])
+
+    def test_filtering(self):
+        self._create_foods(2)
+        Food.objects.create(name='Rice', category=self.grains, quantity=3, best_before=self.best_before)
+        response = self.client.get('/api/v1/foods/', {'category_name': 'grains'})
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Rice'])
+        response = self.client.get('/api/v1/categories/', {'low_stock': 'true'})
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Dairy'])
+
+    def test_food_create_validates_like_the_form(self):
+        response = self.client.post('/api/v1/foods/', {
+            'name': 'Milk', 'category': self.dairy.pk, 'quantity': -1, 'best_before': '2000-01-01',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'quantity', 'best_before'})
+
+    def test_batch_applies_all_changes_in_few_queries(self):
+        self._create_foods(3)
+        milk = list(Food.objects.order_by('pk'))
+        payload = {
+            'create': [
+                {'name': f'Oats {i}', 'category': self.grains.pk, 'quantity': 2, 'best_before': self.best_before}
+                for i in range(50)
+            ],
+            'update': [{'id': milk[0].pk, 'quantity': 4, 'category': self.grains.pk}],
+            'delete': [milk[1].pk],
+        }
+        with self.assertNumQueries(33):
+            response = self.client.post('/api/v1/foods/batch/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((len(body['created']), len(body['updated']), body['deleted']), (50, 1, 1))
+
+        self.dairy.refresh_from_db()
+        self.grains.refresh_from_db()
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (1, 1))
+        self.assertEqual((self.grains.current_quantity, self.grains.food_count), (104, 51))
+
+    def test_batch_is_all_or_nothing(self):
+        payload = {
+            'create': [
+                {'name': 'Oats', 'category': self.grains.pk, 'quantity': 2, 'best_before': self.best_before},
+                {'name': 'Bad', 'category': 9999, 'quantity': 2, 'best_before': self.best_before},
+            ],
+            'update': [{'id': 9999, 'quantity': 1}],
+        }
+        response = self.client.post('/api/v1/foods/batch/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual(body['create'][0], {})
+        self.assertIn('category', body['create'][1])
+        self.assertIn('id', body['update'][0])
+        self.assertFalse(Food.objects.exists())
+
+    def test_batch_rejects_malformed_ids_per_item(self):
+        self._create_foods(1)
+        milk = Food.objects.get()
+        for url, pk in (('/api/v1/foods/batch/', milk.pk), ('/api/v1/categories/batch/', self.grains.pk)):
+            payload = {
+                'update': [{'id': 'x'}, {'id': pk, 'quantity': 3}, {'id': True}, 'oops'],
+                'delete': ['x', {}, pk, 2 ** 64],
+            }
+            response = self.client.post(url, payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            body = response.json()
+            self.assertEqual([bool(item) for item in body['update']], [True, False, True, True])
+            self.assertEqual([bool(item) for item in body['delete']], [True, True, False, True])
+        for data in (['x'], 'x'):
+            response = self.client.post('/api/v1/foods/batch/', data, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        milk.refresh_from_db()
+        self.assertEqual(milk.quantity, 1)
+
+    def test_batch_rejects_malformed_category_ids_per_item(self):
+        payload = {'create': [
+            {'name': 'Oats', 'category': category, 'quantity': 2, 'best_before': self.best_before}
+            for category in ('99999999999999999999999', True, '²', str(self.grains.pk))
+        ]}
+        response = self.client.post('/api/v1/foods/batch/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([set(item) for item in response.json()['create']], [{'category'}] * 3 + [set()])
+        self.assertFalse(Food.objects.exists())
+
+    def test_writes_only_accept_json(self):
+        # A cross-site HTML form can post urlencoded or multipart bodies without CSRF, but not JSON
+        for data, content_type in (
+            ('name=Fruits&unit=kg&ideal_quantity=2', 'application/x-www-form-urlencoded'),
+            ('{"name": "Fruits", "unit": "kg", "ideal_quantity": 2}', 'text/plain'),
+        ):
+            response = self.client.post('/api/v1/categories/', data, content_type=content_type)
+            self.assertEqual(response.status_code, 415)
+        response = self.client.post('/api/v1/categories/', {'name': 'Fruits', 'unit': 'kg', 'ideal_quantity': 2})
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(Category.objects.filter(name='Fruits').exists())
+
+    def test_category_batch_checks_names_and_protects_foods(self):
+        self._create_foods(1)
+        payload = {'create': [
+            {'name': 'Fruits', 'unit': 'kg', 'ideal_quantity': 2},
+            {'name': 'fruits', 'unit': 'kg', 'ideal_quantity': 2},
+        ]}
+        response = self.client.post('/api/v1/categories/batch/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.json()['create'][1])
+
+        response = self.client.post('/api/v1/categories/batch/', {'delete': [self.dairy.pk]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(f'/api/v1/categories/{self.dairy.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Category.objects.filter(pk=self.dairy.pk).exists())
+
+    def test_stock_summary_and_shopping_list(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.create(name='Milk', category=self.dairy, quantity=2, best_before=self.best_before)
+        summary = self.client.get('/api/v1/stock-summary/').json()
+        self.assertEqual(summary['total_food_items'], 1)
+        self.assertEqual(summary['expiring_soon'], [{'category': 'Dairy', 'count': 1}])
+        self.assertEqual(summary['low_stock'][0]['quantity_needed'], 8)
+
+        shopping = self.client.get('/api/v1/shopping-list/').json()
+        self.assertEqual([item['category_name'] for item in shopping], ['Dairy', 'Grains'])
@@ -0,0 +1,76 @@
+from datetime import date
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from inventory import async_views
+from inventory.models import Category, Food
+
+
+class ConditionalPageTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+            Food.objects.create(name='Milk', category=self.dairy, quantity=2, best_before=date(2030, 1, 1))
+
+    def test_unchanged_inventory_is_not_modified_without_queries(self):
+        for url in [reverse('dashboard'), reverse('search') + '?search=milk', reverse('shopping'), reverse('category')]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                # A write time cannot tell a new day or a rotated CSRF cookie apart, so it is never a validator
+                self.assertNotIn('Last-Modified', response)
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+    def test_writes_move_the_watermark(self):
+        etag = self.client.get(reverse('dashboard'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.create(name='Cream', category=self.dairy, quantity=1, best_before=date(2030, 1, 1))
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.dairy.name = 'Milk products'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dairy.save()
+        self.assertEqual(self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_validators_follow_the_csrf_cookie(self):
+        etag = self.client.get(reverse('category'))['ETag']
+        self.client.cookies['csrftoken'] = 'rotated'
+        self.assertEqual(self.client.get(reverse('category'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_async_views(self):
+        response = async_to_sync(async_views.shopping_view)(AsyncRequestFactory().get('/shopping/'))
+        self.assertEqual(response['ETag'], self.client.get(reverse('shopping'))['ETag'])
+        request = AsyncRequestFactory().get('/shopping/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(async_to_sync(async_views.shopping_view)(request).status_code, 304)
+
+    def test_compression(self):
+        response = self.client.get(reverse('dashboard'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # A weakened ETag still matches
+        response = self.client.get(
+            reverse('dashboard'), HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('dashboard'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(self.client.get(reverse('dashboard')).has_header('Content-Encoding'))
+
+
+    def test_pages_with_a_csrf_token_are_not_compressed(self):
+        # A compressed form page would leak its token through the response length (BREACH)
+        for url in (reverse('food') + '?action=create', reverse('category') + '?action=create', reverse('import')):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+                self.assertContains(response, 'csrfmiddlewaretoken')
+                self.assertFalse(response.has_header('Content-Encoding'))
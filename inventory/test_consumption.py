@@ -0,0 +1,143 @@
+import threading
+from datetime import date, timedelta
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+from inventory.consumption import InsufficientStock, consume_category, consume_food
+from inventory.models import Category, Food
+
+
+def in_days(days):
+    return date.today() + timedelta(days=days)
+
+
+class ConsumeFoodTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.milk = Food.objects.create(name='Milk', category=self.dairy, quantity=3, best_before=in_days(5))
+
+    def test_decrements_in_one_guarded_update(self):
+        # savepoint, UPDATE food, SELECT lot, UPDATE category, UPDATE expiry rollup, INSERT movement, release
+        with self.assertNumQueries(7):
+            consume_food(self.milk.pk, 1.5)
+        self.milk.refresh_from_db()
+        self.dairy.refresh_from_db()
+        self.assertEqual(self.milk.quantity, 1.5)
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (1.5, 1))
+
+    def test_never_goes_below_zero(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            consume_food(self.milk.pk, 4)
+        self.assertEqual(raised.exception.available, 3)
+        self.milk.refresh_from_db()
+        self.assertEqual(self.milk.quantity, 3)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(Food.DoesNotExist):
+            consume_food(9999, 1)
+        for quantity in (0, -1, 'abc'):
+            with self.assertRaises(ValueError):
+                consume_food(self.milk.pk, quantity)
+
+
+class ConsumeCategoryTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.later = Food.objects.create(name='Milk later', category=self.dairy, quantity=5, best_before=in_days(9))
+        self.sooner = Food.objects.create(name='Milk sooner', category=self.dairy, quantity=2, best_before=in_days(1))
+        self.middle = Food.objects.create(name='Milk middle', category=self.dairy, quantity=1, best_before=in_days(4))
+
+    def test_consumes_fifo_by_best_before_and_deletes_exhausted_lots(self):
+        taken = consume_category(self.dairy.pk, 4)
+        self.assertEqual(taken, [(self.sooner.pk, 2, 0), (self.middle.pk, 1, 0), (self.later.pk, 1, 4)])
+        self.assertEqual(list(Food.objects.values_list('name', 'quantity')), [('Milk later', 4)])
+        self.dairy.refresh_from_db()
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (4, 1))
+
+    def test_can_zero_exhausted_lots_instead(self):
+        consume_category(self.dairy.pk, 2, exhausted='zero')
+        self.sooner.refresh_from_db()
+        self.assertEqual(self.sooner.quantity, 0)
+        self.dairy.refresh_from_db()
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (6, 3))
+
+    def test_insufficient_stock_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            consume_category(self.dairy.pk, 9)
+        self.assertEqual(raised.exception.available, 8)
+        self.assertEqual(Food.objects.count(), 3)
+        self.dairy.refresh_from_db()
+        self.assertEqual(self.dairy.current_quantity, 8)
+
+    def test_api_endpoints(self):
+        response = self.client.post(f'/api/v1/categories/{self.dairy.pk}/consume/', {'quantity': 2.5}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['lots'][1], {'id': self.middle.pk, 'taken': 0.5, 'remaining': 0.5})
+
+        response = self.client.post(f'/api/v1/foods/{self.later.pk}/consume/', {'quantity': 6}, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['available']), (409, 5))
+        response = self.client.post(f'/api/v1/foods/{self.later.pk}/consume/', {'quantity': 5}, content_type='application/json')
+        self.assertEqual(response.json()['quantity'], 0)
+        for pk in ('9999', '%C2%B2', '99999999999999999999999'):
+            response = self.client.post(f'/api/v1/foods/{pk}/consume/', {'quantity': 1}, content_type='application/json')
+            self.assertEqual(response.status_code, 404)
+        response = self.client.post(f'/api/v1/foods/{self.later.pk}/consume/', {'quantity': 0}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentConsumptionTest(TransactionTestCase):
+    """Many threads, each with its own database connection, consuming at once"""
+    consumers = 8
+    attempts = 15
+
+    def run_consumers(self, consume):
+        results = {'ok': 0, 'insufficient': 0}
+        lock = threading.Lock()
+        start = threading.Barrier(self.consumers)
+
+        def consumer():
+            start.wait()
+            try:
+                for _ in range(self.attempts):
+                    try:
+                        consume()
+                        outcome = 'ok'
+                    except InsufficientStock:
+                        outcome = 'insufficient'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=consumer) for _ in range(self.consumers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        close_old_connections()
+        return results
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('needs a file-backed test database')
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+
+    def test_parallel_single_lot_consumers_lose_no_updates(self):
+        milk = Food.objects.create(name='Milk', category=self.dairy, quantity=100, best_before=in_days(5))
+        results = self.run_consumers(lambda: consume_food(milk.pk, 1))
+        # 120 attempts on 100 units: exactly 100 succeed and the lot stops at zero
+        self.assertEqual(results, {'ok': 100, 'insufficient': 20})
+        milk.refresh_from_db()
+        self.dairy.refresh_from_db()
+        self.assertEqual(milk.quantity, 0)
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (0, 1))
+
+    def test_parallel_fifo_consumers_drain_lots_in_order(self):
+        Food.objects.bulk_create([
+            Food(name=f'Milk {i}', category=self.dairy, quantity=10, best_before=in_days(i)) for i in range(1, 9)
+        ])
+        results = self.run_consumers(lambda: consume_category(self.dairy.pk, 0.75))
+        self.assertEqual(results, {'ok': 106, 'insufficient': 14})
+        self.dairy.refresh_from_db()
+        remaining = list(Food.objects.order_by('best_before').values_list('name', 'quantity'))
+        self.assertEqual(remaining, [('Milk 8', 0.5)])
+        self.assertEqual((self.dairy.current_quantity, self.dairy.food_count), (0.5, 1))
@@ -0,0 +1,61 @@
+from django.test import TestCase
+from django.core.management import call_command
+from datetime import date, timedelta
+from io import StringIO
+import json
+from inventory.models import Category, Food
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.grains = Category.objects.create(name='Grains', unit='kg', ideal_quantity=1)
+        self.best_before = date.today() + timedelta(days=5)
+        Food.objects.create(name='Milk', category=self.dairy, quantity=2, best_before=self.best_before)
+        Food.objects.create(name='Rice', category=self.grains, quantity=3, best_before=self.best_before)
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_inventory_csv_export_streams(self):
+        response = self.client.get('/export/inventory/', {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = self._content(response).splitlines()
+        self.assertEqual(lines[0], 'id,name,category,unit,quantity,best_before')
+        self.assertEqual(len(lines), 3)
+        self.assertIn(f'Milk,Dairy,liters,2.0,{self.best_before.isoformat()}', lines[1])
+
+    def test_search_export_reuses_search_filters(self):
+        response = self.client.get('/export/search/', {'format': 'jsonl', 'search': 'rice'})
+        records = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([record['name'] for record in records], ['Rice'])
+
+        response = self.client.get('/export/search/', {'by': 'best_before_date', 'search': 'not a date'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_shopping_export_lists_low_stock_categories(self):
+        response = self.client.get('/export/shopping/', {'format': 'ndjson'})
+        records = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual(records, [{
+            'category': 'Dairy', 'unit': 'liters', 'current_quantity': 2.0, 'ideal_quantity': 10.0, 'needed_quantity': 8.0,
+        }])
+
+    def test_unknown_dataset_or_format(self):
+        self.assertEqual(self.client.get('/export/everything/').status_code, 404)
+        self.assertEqual(self.client.get('/export/inventory/', {'format': 'xml'}).status_code, 400)
+
+    def test_export_query_count_is_constant(self):
+        for i in range(30):
+            Food.objects.create(name=f'Oats {i}', category=self.grains, quantity=1, best_before=self.best_before)
+        with self.assertNumQueries(1):
+            self._content(self.client.get('/export/inventory/'))
+
+    def test_export_inventory_command(self):
+        out = StringIO()
+        call_command('export_inventory', 'shopping', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'category,unit,current_quantity,ideal_quantity,needed_quantity',
+            'Dairy,liters,2.0,10.0,8.0',
+        ])
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from inventory.forecast import effective_stock, forecast
+from inventory.history import roll_up
+from inventory.models import Category, Food, StockMovement
+from inventory.stock import forecast_shopping_list
+
+
+class EffectiveStockTest(TestCase):
+    def test_discounts_lots_that_expire_before_use(self):
+        rows = np.array([0, 0, 1])
+        quantities = np.array([5.0, 5.0, 4.0])
+        days_left = np.array([2.0, 10.0, -1.0])
+        # At 1 a day only 3 of the first lot are used before it expires; the second is used in full.
+        # Without usage the expired lot does not count either
+        result = effective_stock(rows, quantities, days_left, np.array([1.0, 0.0]))
+        self.assertEqual(result.tolist(), [8.0, 0.0])
+
+    def test_matches_using_the_lots_one_by_one(self):
+        random = np.random.default_rng(0)
+        rows = np.sort(random.integers(0, 20, 500))
+        days_left = np.zeros(500)
+        for row in range(20):
+            days_left[rows == row] = np.sort(random.integers(-3, 60, (rows == row).sum()))
+        quantities = random.uniform(0, 5, 500)
+        rates = random.uniform(0, 3, 20)
+
+        expected = np.zeros(20)
+        for row, quantity, days in zip(rows, quantities, days_left):
+            if days >= 0:
+                capacity = rates[row] * (days + 1)
+                expected[row] += np.clip(capacity - expected[row], 0, quantity)
+        np.testing.assert_allclose(effective_stock(rows, quantities, days_left, rates), expected)
+
+
+class ForecastTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=40)
+        self.grains = Category.objects.create(name='Grains', unit='kg', ideal_quantity=40)
+        self.spices = Category.objects.create(name='Spices', unit='packs', ideal_quantity=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.bulk_create([
+                Food(name='Milk', category=self.dairy, quantity=10, best_before=self.today + timedelta(days=3)),
+                Food(name='Cheese', category=self.dairy, quantity=20, best_before=self.today + timedelta(days=30)),
+                Food(name='Rice', category=self.grains, quantity=30, best_before=self.today + timedelta(days=300)),
+                Food(name='Salt', category=self.spices, quantity=5, best_before=self.today + timedelta(days=300)),
+            ])
+        # Two liters of dairy and one kilo of grains used every day for four weeks
+        start = timezone.make_aware(datetime.combine(self.today, datetime.min.time()) + timedelta(hours=12))
+        StockMovement.objects.bulk_create(
+            StockMovement(category=category, kind=StockMovement.Kind.CONSUME, quantity=-used,
+                          recorded_at=start - timedelta(days=day))
+            for day in range(1, 29) for category, used in [(self.dairy, 2), (self.grains, 1)]
+        )
+
+    def test_rates_effective_stock_and_stockout(self):
+        projected = forecast(self.today)
+        dairy = projected[self.dairy.pk]
+        self.assertEqual(dairy['daily_usage'], 2)
+        # 2 of the 10 liters of milk expire before they can be used
+        self.assertEqual(dairy['effective_quantity'], 28)
+        self.assertEqual(dairy['days_until_stockout'], 14)
+        self.assertEqual(dairy['stockout_date'], self.today + timedelta(days=14))
+        self.assertEqual(projected[self.spices.pk]['days_until_stockout'], None)
+
+    def test_snapshots_and_ledger_give_the_same_rates(self):
+        from_ledger = forecast(self.today)
+        roll_up(self.today - timedelta(days=10))
+        self.assertEqual(forecast(self.today), from_ledger)
+
+    def test_shopping_list_ranks_by_days_until_stockout(self):
+        items = forecast_shopping_list(self.today)
+        self.assertEqual([item['category_name'] for item in items], ['Dairy', 'Grains', 'Spices'])
+        self.assertEqual(items[0]['needed_quantity'], 12)
+
+        response = self.client.get(reverse('shopping'), {'order': 'stockout'})
+        self.assertContains(response, 'Runs Out')
+        self.assertEqual(response.context['shopping_items'][0]['category_name'], 'Dairy')
+        response = self.client.get('/api/v1/shopping-list/', {'order': 'stockout'})
+        self.assertEqual(response.json()[1]['days_until_stockout'], 30)
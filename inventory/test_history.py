@@ -0,0 +1,116 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from inventory.consumption import consume_category
+from inventory.history import prune_movements, roll_up, stock_trend
+from inventory.models import Category, Food, StockMovement, StockSnapshot
+
+
+def at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+
+class StockMovementLedgerTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.drinks = Category.objects.create(name='Drinks', unit='liters', ideal_quantity=10)
+        self.best_before = date.today() + timedelta(days=10)
+
+    def ledger(self):
+        return list(StockMovement.objects.order_by('pk').values_list('kind', 'category__name', 'quantity'))
+
+    def test_every_write_path_is_recorded(self):
+        Kind = StockMovement.Kind
+        milk = Food.objects.create(name='Milk', category=self.dairy, quantity=3, best_before=self.best_before)
+        Food.objects.bulk_create([Food(name='Cream', category=self.dairy, quantity=1, best_before=self.best_before)])
+        milk.quantity = 4
+        milk.save()
+        milk.best_before += timedelta(days=1)
+        milk.save()  # a date change moves no stock and adds no row
+        Food.objects.filter(name='Cream').update(category=self.drinks)
+        consume_category(self.dairy.pk, 1)
+        Food.objects.filter(name='Cream').update(quantity=0.5)
+        milk.refresh_from_db()
+        milk.delete()
+        Food.objects.all().delete()
+
+        self.assertEqual(self.ledger(), [
+            (Kind.CREATE, 'Dairy', 3), (Kind.CREATE, 'Dairy', 1), (Kind.UPDATE, 'Dairy', 1),
+            (Kind.MOVE, 'Dairy', -1), (Kind.MOVE, 'Drinks', 1), (Kind.CONSUME, 'Dairy', -1),
+            (Kind.UPDATE, 'Drinks', -0.5), (Kind.DELETE, 'Dairy', -3), (Kind.DELETE, 'Drinks', -0.5),
+        ])
+
+    def test_used_up_lots_count_as_consumed(self):
+        Food.objects.create(name='Milk', category=self.dairy, quantity=2, best_before=self.best_before)
+        consume_category(self.dairy.pk, 2)
+        self.assertEqual(self.ledger()[-1], (StockMovement.Kind.CONSUME, 'Dairy', -2))
+        self.assertFalse(Food.objects.exists())
+
+
+class StockSnapshotTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.today = date(2030, 1, 16)  # a Wednesday
+        best_before = self.today + timedelta(days=30)
+        self.milk = Food.objects.create(name='Milk', category=self.dairy, quantity=10, best_before=best_before)
+        consume_category(self.dairy.pk, 3)
+        Food.objects.create(name='Cream', category=self.dairy, quantity=2, best_before=best_before)
+        # Backdate: milk added on the 6th, 3 consumed on the 13th, cream added today
+        movements = list(StockMovement.objects.order_by('pk'))
+        for movement, day in zip(movements, [date(2030, 1, 6), date(2030, 1, 13), self.today]):
+            StockMovement.objects.filter(pk=movement.pk).update(recorded_at=at(day))
+
+    def test_daily_and_weekly_snapshots_walk_back_from_the_counters(self):
+        self.assertEqual(roll_up(self.today), 10)
+        daily = dict(StockSnapshot.objects.filter(period=StockSnapshot.Period.DAY).values_list('start', 'closing_quantity'))
+        self.assertEqual(daily[date(2030, 1, 6)], 10)
+        self.assertEqual(daily[date(2030, 1, 12)], 10)
+        self.assertEqual(daily[date(2030, 1, 15)], 7)
+        consumed = StockSnapshot.objects.get(period=StockSnapshot.Period.DAY, start=date(2030, 1, 13)).consumed
+        self.assertEqual(consumed, 3)
+
+        # Weeks start on Monday; only completed weeks are written
+        weekly = list(StockSnapshot.objects.filter(period=StockSnapshot.Period.WEEK).order_by('start').values_list(
+            'start', 'closing_quantity', 'added', 'consumed'))
+        self.assertEqual(weekly, [(date(2029, 12, 31), 10, 10, 0), (date(2030, 1, 7), 7, 0, 3)])
+
+        self.assertEqual(roll_up(self.today), 0)
+        self.assertEqual(roll_up(self.today + timedelta(days=1)), 1)
+        self.assertEqual(
+            StockSnapshot.objects.get(period=StockSnapshot.Period.DAY, start=self.today).closing_quantity, 9,
+        )
+
+    def test_pruning_keeps_unrolled_movements(self):
+        roll_up(self.today)
+        self.assertEqual(prune_movements(keep_days=5, today=self.today), 1)
+        self.assertEqual(prune_movements(keep_days=0, today=self.today), 1)
+        # Today's movement is not covered by a snapshot yet
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_trend_reads_snapshots(self):
+        roll_up(self.today)
+        trend = stock_trend('week')
+        self.assertEqual(trend['labels'], ['2029-12-31', '2030-01-07'])
+        self.assertEqual(trend['series'], [
+            {'category': self.dairy.pk, 'name': 'Dairy', 'closing': [10, 7], 'consumed': [0, 3]},
+        ])
+        self.assertEqual(stock_trend('day', since=self.today)['labels'], [])
+
+    def test_trend_endpoint_and_command(self):
+        out = StringIO()
+        call_command('rollup_stock_history', date=self.today.isoformat(), keep_days=5, stdout=out)
+        self.assertIn('Rolled up 10 days', out.getvalue())
+        self.assertIn('Pruned 1 ledger row.', out.getvalue())
+
+        response = self.client.get('/api/v1/stock-trend/', {'period': 'day', 'category': str(self.dairy.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['labels']), 10)
+        response = self.client.get('/api/v1/stock-trend/', {'category': str(self.dairy.pk + 1)})
+        self.assertEqual(response.json()['series'], [])
+        self.assertEqual(self.client.get('/api/v1/stock-trend/', {'period': 'month'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/stock-trend/', {'category': 'x'}).status_code, 400)
+        for params in ({'days': '99999999999'}, {'days': '3661'}, {'days': '²'}, {'category': '²'}, {'category': '9' * 20}):
+            self.assertEqual(self.client.get('/api/v1/stock-trend/', params).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/stock-trend/', {'days': '3660'}).status_code, 200)
@@ -0,0 +1,102 @@
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from datetime import date, timedelta
+from io import StringIO
+import os
+import tempfile
+from inventory.importers import import_records, iter_csv_records, iter_json_records
+from inventory.models import Category, Food
+
+
+class ImportRecordsTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.best_before = (date.today() + timedelta(days=5)).isoformat()
+
+    def test_csv_import_skips_invalid_rows(self):
+        # Valid rows are created; each invalid row is reported with its line number
+        data = StringIO(
+            'name,category,quantity,best_before\n'
+            f'Milk,dairy,2,{self.best_before}\n'
+            f'Cream,Unknown,1,{self.best_before}\n'
+            f'Butter,Dairy,-1,{self.best_before}\n'
+            'Yogurt,Dairy,1,2000-01-01\n'
+            f'Kefir,Dairy,1.5,{self.best_before}\n'
+        )
+        errors = []
+        result = import_records(iter_csv_records(data), on_error=lambda n, m: errors.append((n, m)))
+
+        self.assertEqual((result.created, result.errors), (2, 3))
+        self.assertEqual([n for n, _ in errors], [3, 4, 5])
+        self.assertEqual(errors[2][1], 'Best before date cannot be in the past.')
+        self.category.refresh_from_db()
+        self.assertEqual((self.category.current_quantity, self.category.food_count), (3.5, 2))
+
+    def test_json_lines_import_in_batches(self):
+        lines = ''.join(
+            f'{{"name": "Milk {i}", "category_id": {self.category.pk}, "quantity": 1, "best_before": "{self.best_before}"}}\n'
+            for i in range(25)
+        )
+        # One category lookup, then per batch inside a savepoint: the insert, one counter update,
+        # the expiry rollup rebuild (delete, grouped select, insert) and the ledger insert
+        with self.assertNumQueries(1 + 3 * 8):
+            result = import_records(iter_json_records(StringIO(lines), chunk_size=64), batch_size=10)
+        self.assertEqual(result.created, 25)
+        self.assertEqual(Food.objects.count(), 25)
+
+    def test_json_lines_import_skips_unparseable_lines(self):
+        record = f'{{{{"name": "Milk {{}}", "category_id": {self.category.pk}, "quantity": 1, "best_before": "{self.best_before}"}}}}\n'
+        lines = ''.join(record.format(i) for i in range(3)) + '{"name": "Broken",\n\n' + ''.join(
+            record.format(i) for i in range(3, 30)
+        ) + '[1, 2'
+        errors = []
+        result = import_records(
+            iter_json_records(StringIO(lines), chunk_size=64), on_error=lambda n, m: errors.append((n, m)),
+        )
+        self.assertEqual((result.created, result.errors, result.failure), (30, 2, None))
+        self.assertEqual([n for n, _ in errors], [4, 33])
+        self.assertTrue(errors[0][1].startswith('Invalid JSON'))
+
+    def test_unreadable_array_stops_the_import_and_reports_progress(self):
+        records = ', '.join(
+            f'{{"name": "Milk {i}", "category": "Dairy", "quantity": 1, "best_before": "{self.best_before}"}}'
+            for i in range(3)
+        )
+        upload = SimpleUploadedFile('foods.json', f'[{records}, {{"name": oops}}]'.encode())
+        response = self.client.post('/import/', {'kind': 'foods', 'file': upload})
+        self.assertContains(response, 'the 3 foods before that point were imported.')
+        self.assertNotContains(response, 'Imported 3 foods.')
+        self.assertEqual(Food.objects.count(), 3)
+
+    def test_category_import_rejects_duplicates(self):
+        data = StringIO('[{"name": "Fruits", "unit": "kg", "ideal_quantity": 5},'
+                        ' {"name": "fruits", "unit": "kg", "ideal_quantity": 5},'
+                        ' {"name": "DAIRY", "unit": "kg", "ideal_quantity": 5},'
+                        ' {"name": "Nuts", "unit": "kg", "ideal_quantity": 0}]')
+        errors = []
+        result = import_records(iter_json_records(data), kind='categories', on_error=lambda n, m: errors.append(m))
+        self.assertEqual(result.created, 1)
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(Category.objects.filter(name='Fruits').exists())
+
+    def test_import_inventory_command_writes_error_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'foods.csv')
+            report = os.path.join(directory, 'errors.csv')
+            with open(source, 'w') as f:
+                f.write(f'name,category,quantity,best_before\nMilk,Dairy,2,{self.best_before}\nBad,Dairy,x,{self.best_before}\n')
+
+            out = StringIO()
+            call_command('import_inventory', source, errors=report, stdout=out)
+
+            with open(report) as f:
+                self.assertEqual(f.read().splitlines(), ['row,error', '3,Quantity must be a number and non-negative.'])
+        self.assertIn('Imported 1 foods, rejected 1 row.', out.getvalue())
+
+    def test_import_view_upload(self):
+        upload = SimpleUploadedFile('foods.csv', f'name,category,quantity,best_before\nMilk,Dairy,2,{self.best_before}\n'.encode())
+        response = self.client.post('/import/', {'kind': 'foods', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Imported 1 foods.')
+        self.assertTrue(Food.objects.filter(name='Milk').exists())
@@ -0,0 +1,121 @@
+import json
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from inventory.cache import VERSION_KEY
+from inventory.live import FALLBACK_RETRY_MS, Broker, _aevent_stream, _event_stream, broker
+from inventory.models import Category, Food
+
+
+class RecordingSubscription:
+    def __init__(self):
+        self.messages = []
+
+    def put(self, message):
+        event, data = message.strip().split('\n')
+        self.messages.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+
+
+class BrokerTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.grains = Category.objects.create(name='Grains', unit='kg', ideal_quantity=1)
+        self.milk = Food.objects.create(name='Milk', category=self.dairy, quantity=12, best_before=date(2030, 1, 1))
+        self.broker = Broker()
+        self.subscription = self.broker.subscribe(RecordingSubscription())
+        snapshot = self.broker.snapshot()
+        self.assertIn('"name": "Dairy"', snapshot)
+
+    def test_pushes_changed_categories_with_alerts(self):
+        Food.objects.filter(pk=self.milk.pk).decrement(4)
+        Food.objects.create(name='Yogurt', category=self.dairy, quantity=1, best_before=date.today() + timedelta(days=2))
+        with self.assertNumQueries(2):
+            self.broker.refresh()
+        [(event, delta)] = self.subscription.messages
+        self.assertEqual(event, 'delta')
+        # Grains did not change, so it is not sent
+        self.assertEqual([row['name'] for row in delta['changed']], ['Dairy'])
+        self.assertEqual(delta['changed'][0]['current_quantity'], 9)
+        self.assertEqual(delta['changed'][0]['expiring_soon'], 1)
+        self.assertEqual([alert['kind'] for alert in delta['alerts']], ['below_ideal', 'expiring'])
+
+        # Nothing changed since, so nothing is sent
+        self.broker.refresh()
+        self.assertEqual(len(self.subscription.messages), 1)
+
+        Food.objects.create(name='Cheese', category=self.dairy, quantity=5, best_before=date(2030, 1, 1))
+        grains_id = self.grains.pk
+        self.grains.delete()
+        self.broker.refresh()
+        event, delta = self.subscription.messages[-1]
+        self.assertEqual(delta['removed'], [grains_id])
+        self.assertEqual(delta['alerts'], [{'category': self.dairy.pk, 'name': 'Dairy', 'kind': 'restocked'}])
+
+    def test_idle_broker_costs_nothing(self):
+        self.broker.unsubscribe(self.subscription)
+        with self.assertNumQueries(0):
+            self.broker.refresh()
+
+    def test_polls_for_writes_from_other_processes(self):
+        # Another worker or a management command: the row changes and the shared version moves,
+        # but no signal fires in this process
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE inventory_category SET food_count = 7 WHERE id = %s', [self.grains.pk])
+        with self.assertNumQueries(0):
+            self.broker.poll()
+        caches.create_connection(settings.INVENTORY_VERSION_CACHE_ALIAS).incr(VERSION_KEY)
+        self.broker.poll()
+        self.assertEqual(self.subscription.messages, [])  # polled too recently
+
+        self.broker._polled_at = 0
+        self.broker.poll()
+        [(event, delta)] = self.subscription.messages
+        self.assertEqual([(row['name'], row['food_count']) for row in delta['changed']], [('Grains', 7)])
+
+    def test_writes_refresh_after_commit(self):
+        broker.subscribe(self.subscription)
+        try:
+            broker.snapshot()
+            with self.captureOnCommitCallbacks(execute=True):
+                Food.objects.create(name='Cream', category=self.grains, quantity=1, best_before=date(2030, 1, 1))
+        finally:
+            broker.unsubscribe(self.subscription)
+        self.assertEqual(self.subscription.messages[-1][1]['changed'][0]['food_count'], 1)
+
+
+class DashboardEventsTest(TestCase):
+    def test_stream_starts_with_a_snapshot(self):
+        Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        response = self.client.get('/live/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        stream = _event_stream()
+        self.assertTrue(next(stream).startswith('event: snapshot\n'))
+        self.assertTrue(broker.has_subscribers())
+        stream.close()
+        self.assertFalse(broker.has_subscribers())
+
+    @override_settings(INVENTORY_LIVE_SYNC_STREAMS=1)
+    def test_streams_over_the_cap_fall_back_to_a_snapshot(self):
+        Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        stream = _event_stream()
+        next(stream)
+        try:
+            response = self.client.get('/live/')
+            messages = list(response.streaming_content)
+        finally:
+            stream.close()
+        self.assertEqual(messages[0], f'retry: {FALLBACK_RETRY_MS}\n\n'.encode())
+        self.assertTrue(messages[1].startswith(b'event: snapshot\n'))
+
+    async def test_async_stream(self):
+        await Category.objects.acreate(name='Dairy', unit='liters', ideal_quantity=10)
+        stream = _aevent_stream()
+        first = await anext(stream)
+        self.assertTrue(first.startswith('event: snapshot\n'))
+        self.assertTrue(broker.has_subscribers())
+        await stream.aclose()
+        self.assertFalse(broker.has_subscribers())
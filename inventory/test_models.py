@@ -1,7 +1,10 @@
 from django.test import TestCase
-from datetime import date
-from inventory.models import Category, Food
-from django.db import IntegrityError
+from django.core.management import call_command
+from datetime import date, timedelta
+from io import StringIO
+from inventory.models import Category, ExpiryBucket, ExpiryRollup, Food
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 
 
 class CategoryModelTest(TestCase):
@@ -102,6 +105,117 @@ class CategoryModelTest(TestCase):
         self.assertEqual(category.ideal_quantity, -10.0)
 
 
+    def test_stock_counters_follow_food_writes(self):
+        # Stored counters are kept in step with food creates, updates and deletes
+        category = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10.0)
+        milk = Food.objects.create(name='Milk', category=category, quantity=4.0, best_before=date(2030, 1, 1))
+        Food.objects.create(name='Cream', category=category, quantity=1.5, best_before=date(2030, 1, 1))
+
+        category.refresh_from_db()
+        self.assertEqual(category.current_quantity, 5.5)
+        self.assertEqual(category.food_count, 2)
+        self.assertEqual(category.quantity_difference, -4.5)
+        self.assertTrue(category.is_low_stock)
+
+        milk = Food.objects.get(pk=milk.pk)
+        milk.quantity = 10.0
+        milk.save()
+        category.refresh_from_db()
+        self.assertEqual(category.current_quantity, 11.5)
+
+        milk.delete()
+        category.refresh_from_db()
+        self.assertEqual(category.current_quantity, 1.5)
+        self.assertEqual(category.food_count, 1)
+
+    def test_stock_counters_follow_overlapping_edits(self):
+        # Two copies loaded before either saves: each delta is taken from the row it replaces
+        category = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10.0)
+        milk = Food.objects.create(name='Milk', category=category, quantity=4.0, best_before=date(2030, 1, 1))
+        first, second = Food.objects.get(pk=milk.pk), Food.objects.get(pk=milk.pk)
+
+        first.quantity = 6.0
+        first.save()
+        second.quantity = 1.0
+        second.save()
+        category.refresh_from_db()
+        self.assertEqual((category.current_quantity, category.food_count), (1.0, 1))
+
+        first.delete()
+        second.delete()
+        category.refresh_from_db()
+        self.assertEqual((category.current_quantity, category.food_count), (0, 0))
+
+    def test_stock_counters_follow_category_reassignment(self):
+        dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10.0)
+        drinks = Category.objects.create(name='Drinks', unit='liters', ideal_quantity=10.0)
+        milk = Food.objects.create(name='Milk', category=dairy, quantity=4.0, best_before=date(2030, 1, 1))
+
+        milk.category = drinks
+        milk.save()
+
+        dairy.refresh_from_db()
+        drinks.refresh_from_db()
+        self.assertEqual((dairy.current_quantity, dairy.food_count), (0, 0))
+        self.assertEqual((drinks.current_quantity, drinks.food_count), (4.0, 1))
+
+    def test_stock_counters_follow_bulk_operations(self):
+        dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10.0)
+        drinks = Category.objects.create(name='Drinks', unit='liters', ideal_quantity=10.0)
+        Food.objects.bulk_create([
+            Food(name='Milk', category=dairy, quantity=2.0, best_before=date(2030, 1, 1)),
+            Food(name='Cream', category=dairy, quantity=3.0, best_before=date(2030, 1, 1)),
+            Food(name='Juice', category=drinks, quantity=1.0, best_before=date(2030, 1, 1)),
+        ])
+        dairy.refresh_from_db()
+        self.assertEqual((dairy.current_quantity, dairy.food_count), (5.0, 2))
+
+        Food.objects.filter(name='Cream').update(category=drinks)
+        dairy.refresh_from_db()
+        drinks.refresh_from_db()
+        self.assertEqual((dairy.current_quantity, dairy.food_count), (2.0, 1))
+        self.assertEqual((drinks.current_quantity, drinks.food_count), (4.0, 2))
+
+        juice, milk = Food.objects.filter(name__in=['Juice', 'Milk']).order_by('name')
+        juice.quantity, milk.category = 5.0, drinks
+        Food.objects.bulk_update([juice, milk], ['quantity', 'category'])
+        dairy.refresh_from_db()
+        drinks.refresh_from_db()
+        self.assertEqual((dairy.current_quantity, dairy.food_count), (0, 0))
+        self.assertEqual((drinks.current_quantity, drinks.food_count), (10.0, 3))
+
+        Food.objects.filter(category=drinks).delete()
+        drinks.refresh_from_db()
+        self.assertEqual((drinks.current_quantity, drinks.food_count), (0, 0))
+
+    def test_category_save_keeps_stock_counters(self):
+        # Saving a stale category instance must not clobber the counters
+        category = Category.objects.create(name='Bread', unit='pieces', ideal_quantity=2.0)
+        Food.objects.create(name='Rye', category=category, quantity=3.0, best_before=date(2030, 1, 1))
+        category.ideal_quantity = 5.0
+        category.save()
+        category.refresh_from_db()
+        self.assertEqual(category.current_quantity, 3.0)
+        self.assertEqual(category.ideal_quantity, 5.0)
+
+    def test_low_stock_filters_in_sql(self):
+        low = Category.objects.create(name='Low', unit='kg', ideal_quantity=10.0)
+        full = Category.objects.create(name='Full', unit='kg', ideal_quantity=1.0)
+        Food.objects.create(name='Rice', category=full, quantity=2.0, best_before=date(2030, 1, 1))
+        self.assertEqual(list(Category.objects.low_stock()), [low])
+
+    def test_recompute_stock_command_reconciles_drift(self):
+        category = Category.objects.create(name='Grains', unit='kg', ideal_quantity=2.0)
+        Food.objects.create(name='Oats', category=category, quantity=3.0, best_before=date(2030, 1, 1))
+        Category.objects.filter(pk=category.pk).update(current_quantity=99, food_count=7)
+
+        out = StringIO()
+        call_command('recompute_stock', stdout=out)
+
+        category.refresh_from_db()
+        self.assertEqual((category.current_quantity, category.food_count), (3.0, 1))
+        self.assertIn('Reconciled 1 drifted category', out.getvalue())
+
 class FoodModelTest(TestCase):
     def setUp(self):
         # Create a category to associate with food items
@@ -217,3 +331,99 @@ class FoodModelTest(TestCase):
         Food.objects.create(name='Tomato', category=self.category, quantity=1.0, best_before=date(2025, 10, 10))
         Food.objects.create(name='Tomato', category=other_category, quantity=2.0, best_before=date(2025, 11, 10))
         self.assertEqual(Food.objects.filter(name='Tomato').count(), 2)
+
+    def test_expiry_properties_share_one_computation(self):
+        # Expiry helpers agree with each other and follow a changed best_before
+        food = Food(name='Yogurt', category=self.category, quantity=1.0, best_before=date.today())
+        self.assertEqual(food.days_until_expiry, 0)
+        self.assertFalse(food.is_expired)
+        self.assertTrue(food.is_expiring_soon)
+        self.assertEqual(food.expiry_status, 'Expires Today')
+
+        food.best_before = date(2020, 1, 1)
+        self.assertTrue(food.is_expired)
+        self.assertEqual(food.expiry_status, 'Expired')
+
+    def test_with_expiry_buckets_in_sql(self):
+        today = date(2030, 1, 10)
+        for name, days in [('Old', -1), ('Now', 0), ('Soon', 7), ('Later', 8)]:
+            Food.objects.create(name=name, category=self.category, quantity=1.0, best_before=today + timedelta(days=days))
+        foods = Food.objects.with_expiry(today)
+        self.assertEqual(
+            dict(foods.values_list('name', 'expiry_bucket')),
+            {'Old': ExpiryBucket.EXPIRED, 'Now': ExpiryBucket.TODAY, 'Soon': ExpiryBucket.SOON, 'Later': ExpiryBucket.FRESH},
+        )
+        self.assertEqual(list(foods.filter(expiry_bucket=ExpiryBucket.SOON).values_list('name', flat=True)), ['Soon'])
+        self.assertEqual(list(foods.order_by('-expiry_bucket').values_list('name', flat=True))[0], 'Later')
+
+    def test_expiry_rollup_follows_food_writes(self):
+        other = Category.objects.create(name='Fruits', unit='kg', ideal_quantity=10.0)
+        soon = date.today() + timedelta(days=3)
+
+        def rollup():
+            rows = ExpiryRollup.objects.values_list('category__name', 'best_before', 'count')
+            return sorted(rows, key=lambda row: (row[0], str(row[1] or '')))
+
+        milk = Food.objects.create(name='Milk', category=self.category, quantity=1.0, best_before=soon)
+        Food.objects.bulk_create([
+            Food(name='Cream', category=self.category, quantity=1.0, best_before=soon),
+            Food(name='Old', category=self.category, quantity=1.0, best_before=date(2020, 1, 1)),
+        ])
+        self.assertEqual(rollup(), [('Vegetables', None, 1), ('Vegetables', soon, 2)])
+
+        milk.category = other
+        milk.save()
+        Food.objects.filter(name='Cream').update(best_before=soon + timedelta(days=1))
+        self.assertEqual(rollup(), [
+            ('Fruits', soon, 1), ('Vegetables', None, 1), ('Vegetables', soon + timedelta(days=1), 1),
+        ])
+
+        milk.delete()
+        Food.objects.filter(name='Old').delete()
+        self.assertEqual(rollup(), [('Vegetables', soon + timedelta(days=1), 1)])
+
+    def test_single_food_writes_shift_the_rollup_without_rebuilding_it(self):
+        soon = date.today() + timedelta(days=3)
+        other = Category.objects.create(name='Fruits', unit='kg', ideal_quantity=10.0)
+
+        def rollup():
+            return sorted(
+                ExpiryRollup.objects.values_list('category_id', 'best_before', 'count', 'quantity'),
+                key=lambda row: (row[0], str(row[1] or '')),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            milk = Food.objects.create(name='Milk', category=self.category, quantity=2.0, best_before=soon)
+            old = Food.objects.create(name='Old', category=self.category, quantity=1.0, best_before=date(2020, 1, 1))
+            milk.quantity = 5.0
+            milk.save()
+            milk.best_before = soon + timedelta(days=1)
+            milk.save()
+            old.category = other
+            old.save()
+            Food.objects.create(name='Cream', category=self.category, quantity=1.0, best_before=soon).delete()
+            Food.objects.filter(pk=milk.pk).decrement(1.5)
+        self.assertFalse([query for query in queries if 'GROUP BY' in query['sql']])
+        self.assertEqual(rollup(), [
+            (self.category.pk, soon + timedelta(days=1), 1, 3.5), (other.pk, None, 1, 1.0),
+        ])
+
+        Category.objects.all().refresh_expiry_rollup()
+        self.assertEqual(rollup(), [
+            (self.category.pk, soon + timedelta(days=1), 1, 3.5), (other.pk, None, 1, 1.0),
+        ])
+
+    def test_expiry_rollover_command_folds_passed_dates(self):
+        today = date.today()
+        Food.objects.create(name='Milk', category=self.category, quantity=1.0, best_before=today + timedelta(days=1))
+        Food.objects.create(name='Rice', category=self.category, quantity=1.0, best_before=today + timedelta(days=30))
+
+        out = StringIO()
+        call_command('expiry_rollover', date=str(today + timedelta(days=2)), stdout=out)
+
+        self.assertEqual(
+            dict(ExpiryRollup.objects.values_list('best_before', 'count')),
+            {None: 1, today + timedelta(days=30): 1},
+        )
+        self.assertIn('Expired: 1', out.getvalue())
+        self.assertIn('Expiring soon: 0', out.getvalue())
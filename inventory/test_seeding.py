@@ -0,0 +1,49 @@
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from inventory.bench import CASES, compare, run_cases
+from inventory.models import Category, ExpiryRollup, Food, StockSnapshot
+from inventory.seeding import seed_inventory
+
+
+class SeedInventoryTest(TestCase):
+    def test_seeds_consistent_counters_rollup_and_history(self):
+        categories = seed_inventory(500, 16, batch_size=120, history_days=7)
+        self.assertEqual(len(categories), 16)
+        self.assertEqual(Food.objects.count(), 500)
+        # Profiles run out after 14 and start over with numbered names
+        self.assertTrue(Category.objects.filter(name='Dairy 2').exists())
+        self.assertFalse(Category.objects.with_stock_drift().exists())
+        self.assertEqual(sum(ExpiryRollup.objects.values_list('count', flat=True)), 500)
+        self.assertEqual(StockSnapshot.objects.filter(period=StockSnapshot.Period.DAY).count(), 16 * 7)
+
+    def test_same_seed_gives_same_data(self):
+        seed_inventory(50, 3, seed_value=4)
+        first = list(Food.objects.order_by('pk').values_list('name', 'quantity', 'best_before'))
+        Category.objects.all().delete()
+        seed_inventory(50, 3, seed_value=4)
+        self.assertEqual(list(Food.objects.order_by('pk').values_list('name', 'quantity', 'best_before')), first)
+
+    def test_command_refuses_to_seed_over_existing_data(self):
+        call_command('seed_inventory', foods=20, categories=2, history_days=0, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed_inventory', foods=20, categories=2, stdout=StringIO())
+        out = StringIO()
+        call_command('seed_inventory', foods=30, categories=3, clear=True, stdout=out)
+        self.assertIn('Seeded 30 foods in 3 categories', out.getvalue())
+        self.assertEqual(Food.objects.count(), 30)
+
+
+class BenchTest(TestCase):
+    def test_runs_every_case(self):
+        seed_inventory(200, 5, history_days=7)
+        results = run_cases(repeat=1)
+        self.assertEqual(set(results), set(CASES))
+        self.assertEqual(results['dashboard']['queries'], 2)
+        self.assertGreater(results['food_bulk_edit']['queries'], 0)
+
+        before = {'1k': {'cases': {'dashboard': {'median_ms': 10.0, 'queries': 3}}}}
+        after = {'1k': {'cases': {'dashboard': {'median_ms': 5.0, 'queries': 2}, 'forecast': results['forecast']}}}
+        rows = compare(before, after)
+        self.assertEqual(rows[0], ('1k', 'dashboard', 10.0, 5.0, 0.5, 3, 2))
+        self.assertEqual(rows[1][2], None)
@@ -1,19 +1,30 @@
-from django.test import TestCase
+import base64
+import json
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import caches
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.db import connection, router
+from django.test.utils import CaptureQueriesContext
 from .models import Category, Food
+from . import async_views, views
+from foodstorage.replicas import routing
+from .cache import VERSION_KEY, acached, cached, get_inventory_version
 from datetime import date, timedelta
 
 
 class InventoryViewsTest(TestCase):
     def setUp(self):
         # Create some categories and foods for testing
-        self.category = Category.objects.create(name='Vegetables', unit='kg', ideal_quantity=10)
-        self.food = Food.objects.create(
-            name='Tomato',
-            category=self.category,
-            quantity=5,
-            best_before=date.today() + timedelta(days=5)
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Vegetables', unit='kg', ideal_quantity=10)
+            self.food = Food.objects.create(
+                name='Tomato',
+                category=self.category,
+                quantity=5,
+                best_before=date.today() + timedelta(days=5)
+            )
 
     def test_dashboard_view(self):
         url = reverse('dashboard')
@@ -223,3 +234,414 @@ class InventoryViewsTest(TestCase):
         }
         response = self.client.post('/food/', data)
         self.assertEqual(response.status_code, 200)
+
+
+class DashboardQueryCountTest(TestCase):
+    def _create_categories(self, start, stop):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(start, stop):
+                category = Category.objects.create(name=f'Category {i}', unit='kg', ideal_quantity=10)
+                Food.objects.create(name=f'Food {i}', category=category, quantity=i, best_before=date.today() + timedelta(days=3))
+
+    def test_dashboard_query_count_is_constant(self):
+        # The dashboard must not issue per-category queries
+        self._create_categories(0, 2)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+        self._create_categories(2, 30)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+    def test_dashboard_summary_values(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+            Food.objects.create(name='Milk', category=category, quantity=2, best_before=date.today() + timedelta(days=3))
+            Food.objects.create(name='Cheese', category=category, quantity=3, best_before=date.today() + timedelta(days=30))
+            Category.objects.create(name='Empty', unit='kg', ideal_quantity=1)
+
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.context['total_categories'], 2)
+        self.assertEqual(response.context['total_food_items'], 2)
+        self.assertEqual(response.context['num_categories_below_ideal'], 2)
+        self.assertEqual(response.context['expiring_soon_summary'], [{'category__name': 'Dairy', 'count': 1}])
+        self.assertEqual(response.context['chart_labels'], ['Dairy', 'Empty'])
+        self.assertEqual(response.context['chart_current'], [5, 0])
+        self.assertEqual(response.context['low_stock_categories'][0]['quantity_needed'], 5)
+
+
+class ShoppingQueryCountTest(TestCase):
+    def test_shopping_view_query_count_is_constant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                category = Category.objects.create(name=f'Category {i}', unit='kg', ideal_quantity=10)
+                Food.objects.create(name=f'Food {i}', category=category, quantity=i, best_before=date.today() + timedelta(days=3))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('shopping'))
+        self.assertEqual(response.context['item_count'], 10)
+        self.assertEqual(response.context['shopping_items'][0]['needed_quantity'], 10)
+
+
+class FoodStockCounterViewTest(TestCase):
+    def test_food_modify_moves_stock_between_categories(self):
+        source = Category.objects.create(name='Fruits', unit='kg', ideal_quantity=10)
+        target = Category.objects.create(name='Berries', unit='kg', ideal_quantity=10)
+        food = Food.objects.create(name='Apple', category=source, quantity=4, best_before=date.today() + timedelta(days=5))
+
+        self.client.post('/food/?action=modify', {
+            'food_id': food.id,
+            'name': 'Apple',
+            'category_id': str(target.id),
+            'quantity': '6',
+            'best_before': (date.today() + timedelta(days=5)).isoformat(),
+        })
+
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual((source.current_quantity, source.food_count), (0, 0))
+        self.assertEqual((target.current_quantity, target.food_count), (6, 1))
+
+
+class SearchQueryCountTest(TestCase):
+    def _create_foods(self, start, stop):
+        category = Category.objects.get_or_create(name='Pantry', unit='kg', ideal_quantity=10)[0]
+        for i in range(start, stop):
+            Food.objects.create(name=f'Bean {i}', category=category, quantity=1, best_before=date.today() + timedelta(days=i))
+
+    def test_search_query_count_is_constant(self):
+        # Rendering the result table must not fetch each row's category separately
+        self._create_foods(0, 2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get('/search/', {'search': 'bean'})
+        self.assertEqual(response.context['item_count'], 2)
+
+        self._create_foods(2, 25)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/search/', {'search': 'bean'})
+        self.assertEqual(response.context['item_count'], 25)
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 2)
+        self.assertContains(response, 'Pantry')
+
+    def test_best_before_search_query_count_is_constant(self):
+        self._create_foods(0, 20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/best_before_date', {'search': (date.today() + timedelta(days=30)).isoformat()})
+        self.assertEqual(response.context['item_count'], 20)
+        self.assertContains(response, 'Expires Today')
+
+
+class SearchPaginationTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Pantry', unit='kg', ideal_quantity=10)
+        for i in range(7):
+            Food.objects.create(name=f'Bean {i}', category=category, quantity=1, best_before=date.today() + timedelta(days=i % 3))
+
+    def test_pages_follow_cursors(self):
+        first = self.client.get('/search/', {'search': 'bean', 'page_size': 3})
+        self.assertEqual([f.name for f in first.context['items']], ['Bean 0', 'Bean 1', 'Bean 2'])
+        self.assertIsNone(first.context['item_count'])
+        self.assertIsNone(first.context['previous_url'])
+
+        second = self.client.get(first.context['next_url'])
+        self.assertEqual([f.name for f in second.context['items']], ['Bean 3', 'Bean 4', 'Bean 5'])
+
+        back = self.client.get(second.context['previous_url'])
+        self.assertEqual([f.name for f in back.context['items']], ['Bean 0', 'Bean 1', 'Bean 2'])
+
+        last = self.client.get(second.context['next_url'])
+        self.assertEqual([f.name for f in last.context['items']], ['Bean 6'])
+        self.assertIsNone(last.context['next_url'])
+
+    def test_best_before_pages_are_ordered_by_date_then_id(self):
+        search = (date.today() + timedelta(days=5)).isoformat()
+        seen = []
+        response = self.client.get('/search/best_before_date', {'search': search, 'page_size': 2})
+        while True:
+            seen.extend((f.best_before, f.id) for f in response.context['items'])
+            if not response.context['next_url']:
+                break
+            response = self.client.get(response.context['next_url'])
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_count_is_optional(self):
+        response = self.client.get('/search/', {'search': 'bean', 'page_size': 3, 'count': '1'})
+        self.assertEqual(response.context['item_count'], 7)
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        response = self.client.get('/search/', {'search': 'bean', 'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['item_count'], 7)
+
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        for values in (['x', 'y'], ['Bean 1', {}], [1, 2]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get('/search/', {'search': 'bean', 'page_size': 3, 'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([f.name for f in response.context['items']], ['Bean 0', 'Bean 1', 'Bean 2'])
+        cursor = base64.urlsafe_b64encode(json.dumps(['not-a-date', '1']).encode()).decode()
+        search = (date.today() + timedelta(days=5)).isoformat()
+        response = self.client.get('/search/best_before_date', {'search': search, 'before': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['items']), 7)
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        vegetables = Category.objects.create(name='Vegetables', unit='kg', ideal_quantity=10)
+        best_before = date.today() + timedelta(days=5)
+        Food.objects.create(name='Tomato', category=vegetables, quantity=1, best_before=best_before)
+        Food.objects.create(name='Tomato soup', category=vegetables, quantity=1, best_before=best_before)
+        Food.objects.create(name='Whole milk', category=dairy, quantity=1, best_before=best_before)
+
+    def _names(self, params, path='/search/'):
+        return [item.name for item in self.client.get(path, params).context['items']]
+
+    def test_prefix_search(self):
+        self.assertEqual(self._names({'search': 'tom'}), ['Tomato', 'Tomato soup'])
+
+    def test_typo_tolerant_search(self):
+        self.assertEqual(self._names({'search': 'tomatp'}), ['Tomato', 'Tomato soup'])
+
+    def test_substring_search(self):
+        # No indexed word starts with these, so the index alone would find nothing
+        self.assertEqual(self._names({'search': 'ilk'}), ['Whole milk'])
+        self.assertEqual(self._names({'search': 'mato'}), ['Tomato', 'Tomato soup'])
+        self.assertEqual(self._names({'search': 'airy'}, path='/search/category'), ['Whole milk'])
+        self.assertEqual(self._names({'search': 'xyz'}), [])
+
+    def test_search_matches_category_names(self):
+        self.assertEqual(self._names({'search': 'dairy'}), ['Whole milk'])
+        self.assertEqual(self._names({'search': 'veg'}, path='/search/category'), ['Tomato', 'Tomato soup'])
+
+    def test_index_follows_food_and_category_writes(self):
+        milk = Food.objects.get(name='Whole milk')
+        milk.name = 'Oat drink'
+        milk.save()
+        self.assertEqual(self._names({'search': 'oat'}), ['Oat drink'])
+        self.assertEqual(self._names({'search': 'milk'}), [])
+
+        Category.objects.filter(name='Dairy').update(name='Plant based')
+        self.assertEqual(self._names({'search': 'plant'}), ['Oat drink'])
+
+        milk.delete()
+        self.assertEqual(self._names({'search': 'oat'}), [])
+
+
+class InventoryCacheTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+
+    def test_dashboard_is_served_from_cache_until_a_write(self):
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.create(name='Milk', category=self.category, quantity=4, best_before=date.today() + timedelta(days=2))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_food_items'], 1)
+        self.assertEqual(response.context['expiring_soon_summary'], [{'category__name': 'Dairy', 'count': 1}])
+
+    def test_shopping_list_follows_bulk_writes(self):
+        self.assertEqual(self.client.get(reverse('shopping')).context['item_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.bulk_create([
+                Food(name='Milk', category=self.category, quantity=20, best_before=date.today() + timedelta(days=2)),
+            ])
+        self.assertEqual(self.client.get(reverse('shopping')).context['item_count'], 0)
+
+    def test_each_write_bumps_the_version_once_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.bulk_create([
+                Food(name=f'Milk {i}', category=self.category, quantity=1, best_before=date.today() + timedelta(days=2))
+                for i in range(300)
+            ])
+        version = get_inventory_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Food.objects.filter(category=self.category).delete()
+            self.category.save()
+            self.assertEqual(get_inventory_version(), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_inventory_version(), version + 1)
+
+    def test_cached_values_roll_over_at_midnight(self):
+        today = date.today()
+        calls = []
+
+        def compute(day):
+            calls.append(day)
+            return day
+
+        self.assertEqual(cached('probe', compute, today), today)
+        self.assertEqual(cached('probe', compute, today), today)
+        self.assertEqual(cached('probe', compute, today + timedelta(days=1)), today + timedelta(days=1))
+        self.assertEqual(calls, [today, today + timedelta(days=1)])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_cached_values_are_computed_on_the_primary(self):
+        # A lagging replica would pin pre-write figures under the new version
+        seen = []
+
+        def compute(day):
+            seen.append(router.db_for_read(Food))
+            return day
+
+        async def acompute(day):
+            return compute(day)
+
+        with routing():
+            self.assertEqual(router.db_for_read(Food), 'replica1')
+            cached('replica_probe', compute)
+            async_to_sync(acached)('areplica_probe', acompute)
+            self.assertEqual(router.db_for_read(Food), 'replica1')
+        self.assertEqual(seen, ['default', 'default'])
+
+    def test_writes_from_another_process_invalidate_the_cache(self):
+        # A management command runs in its own process: the version it bumps has to live outside this one
+        self.assertNotEqual(caches[settings.INVENTORY_VERSION_CACHE_ALIAS].__class__.__name__, 'LocMemCache')
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_food_items'], 0)
+
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE inventory_category SET food_count = 1')
+        caches.create_connection(settings.INVENTORY_VERSION_CACHE_ALIAS).incr(VERSION_KEY)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_food_items'], 1)
+
+
+class AsyncViewsTest(TestCase):
+    """The async twins used under ASGI render exactly what the sync views render"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=20)
+            grains = Category.objects.create(name='Grains', unit='kg', ideal_quantity=1)
+            Food.objects.bulk_create([
+                Food(name=f'Milk {i}', category=dairy, quantity=1, best_before=date.today() + timedelta(days=i))
+                for i in range(1, 12)
+            ] + [Food(name='Rice', category=grains, quantity=3, best_before=date.today() + timedelta(days=30))])
+
+    def assertSameResponse(self, path, sync_view, async_view, **kwargs):
+        sync_response = sync_view(RequestFactory().get(path), **kwargs)
+        async_response = self.run_async(async_view, AsyncRequestFactory().get(path), **kwargs)
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content, sync_response.content)
+        return async_response
+
+    def run_async(self, view, request, **kwargs):
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_dashboard(self):
+        response = self.assertSameResponse('/', views.dashboard, async_views.dashboard)
+        self.assertContains(response, 'Dairy')
+
+    def test_shopping(self):
+        response = self.assertSameResponse('/shopping/', views.shopping_view, async_views.shopping_view)
+        self.assertContains(response, '1 item')
+
+    def test_search_pages_and_counts(self):
+        self.assertSameResponse('/search/?search=milk&page_size=5', views.search_view, async_views.search_view)
+        response = self.assertSameResponse('/search/?search=milk&page_size=5&count=1', views.search_view, async_views.search_view)
+        self.assertContains(response, '11 food items')
+        self.assertSameResponse(
+            f'/search/best_before_date?search={date.today() + timedelta(days=40)}', views.search_view, async_views.search_view,
+            slug='best_before_date',
+        )
+        self.assertSameResponse('/search/best_before_date?search=bad', views.search_view, async_views.search_view, slug='best_before_date')
+
+
+class FoodBulkEditTest(TestCase):
+    def setUp(self):
+        self.dairy = Category.objects.create(name='Dairy', unit='liters', ideal_quantity=10)
+        self.drinks = Category.objects.create(name='Drinks', unit='liters', ideal_quantity=10)
+        self.best_before = date.today() + timedelta(days=5)
+        Food.objects.bulk_create([
+            Food(name=f'Milk {i:03}', category=self.dairy, quantity=2, best_before=self.best_before) for i in range(200)
+        ])
+        self.ids = list(Food.objects.order_by('pk').values_list('pk', flat=True))
+        self.url = reverse('food') + '?action=bulk'
+
+    def assertCounters(self, category, quantity, count):
+        category.refresh_from_db()
+        self.assertEqual((category.current_quantity, category.food_count), (quantity, count))
+
+    def test_page_lists_foods_in_constant_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['food_items']), 100)
+        self.assertContains(response, f'name="quantity-{self.ids[0]}"')
+
+    def test_save_a_full_default_page(self):
+        # Every field the page posts for its rows, with every row selected, stays under the upload limit
+        Food.objects.bulk_create([
+            Food(name=f'Cream {i:03}', category=self.dairy, quantity=2, best_before=self.best_before) for i in range(300)
+        ])
+        page = self.client.get(self.url).context['food_items']
+        data = {'bulk_action': 'save', 'food_ids': [item.pk for item in page], 'delta': '', 'target_category_id': ''}
+        for item in page:
+            data[f'quantity-{item.pk}'] = '3'
+            data[f'best_before-{item.pk}'] = item.form_best_before
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['success_message'], f'Updated {len(page)} food items.')
+        self.assertCounters(self.dairy, 1000 + len(page), 500)
+
+    def test_save_updates_changed_rows_in_one_request(self):
+        data = {'bulk_action': 'save'}
+        for i, pk in enumerate(self.ids):
+            data[f'quantity-{pk}'] = '3' if i % 2 else '2'
+            data[f'best_before-{pk}'] = self.best_before.isoformat()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(response.context['success_message'], 'Updated 100 food items.')
+        self.assertCounters(self.dairy, 500, 200)
+
+    def test_save_is_all_or_nothing(self):
+        response = self.client.post(self.url, {
+            'bulk_action': 'save',
+            f'quantity-{self.ids[0]}': '5',
+            f'quantity-{self.ids[1]}': '-1',
+            f'best_before-{self.ids[2]}': (date.today() - timedelta(days=1)).isoformat(),
+        })
+        self.assertIn('2 rows could not be saved', response.context['error_message'])
+        self.assertContains(response, 'Quantity must be a number and non-negative.')
+        self.assertContains(response, 'Best before date cannot be in the past.')
+        self.assertCounters(self.dairy, 400, 200)
+
+    def test_shared_actions(self):
+        selected = self.ids[:150]
+        response = self.client.post(self.url, {'bulk_action': 'move', 'food_ids': selected, 'target_category_id': self.drinks.pk})
+        self.assertEqual(response.context['success_message'], 'Moved 150 food item(s).')
+        self.assertCounters(self.dairy, 100, 50)
+        self.assertCounters(self.drinks, 300, 150)
+
+        self.client.post(self.url, {'bulk_action': 'adjust', 'food_ids': selected[:100], 'delta': '-5'})
+        self.assertCounters(self.drinks, 100, 150)
+        self.assertEqual(Food.objects.filter(pk__in=selected[:100], quantity=0).count(), 100)
+
+        # No receivers listen to food deletes, so the rows go in one statement without being loaded;
+        # the emptied category's expiry rollup is then rebuilt and the removals are added to the ledger
+        with self.assertNumQueries(12):
+            self.client.post(self.url, {'bulk_action': 'delete', 'food_ids': selected})
+        self.assertCounters(self.drinks, 0, 0)
+        self.assertEqual(Food.objects.count(), 50)
+
+    def test_shared_action_needs_a_selection(self):
+        response = self.client.post(self.url, {'bulk_action': 'delete'})
+        self.assertEqual(response.context['error_message'], 'Please select at least one food item.')
+        response = self.client.post(self.url, {'bulk_action': 'move', 'food_ids': self.ids[:1], 'target_category_id': ''})
+        self.assertEqual(response.context['error_message'], 'Please select a category.')
+
+    def test_malformed_ids_are_ignored(self):
+        # '²' passes str.isdigit() but not int(); a 20-digit id overflows the query
+        response = self.client.post(self.url, {'bulk_action': 'delete', 'food_ids': ['²', '9' * 20]})
+        self.assertEqual(response.context['error_message'], 'Please select at least one food item.')
+        response = self.client.post(self.url, {'bulk_action': 'move', 'food_ids': self.ids[:1], 'target_category_id': '²'})
+        self.assertEqual(response.context['error_message'], 'Please select a category.')
+        response = self.client.post(self.url, {'bulk_action': 'save', 'quantity-²': '1', f'quantity-{"9" * 20}': '1'})
+        self.assertEqual(response.context['success_message'], 'Updated 0 food items.')
+        self.assertEqual(Food.objects.count(), 200)
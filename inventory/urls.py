@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, live, views
+
+# The read-heavy pages and the live stream have async twins for ASGI deployments
+read_views = async_views if getattr(settings, 'INVENTORY_ASYNC_VIEWS', False) else views
+dashboard_events = live.adashboard_events if getattr(settings, 'INVENTORY_ASYNC_VIEWS', False) else live.dashboard_events
 
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
+    path('', read_views.dashboard, name='dashboard'),
+    path('live/', dashboard_events, name='dashboard-events'),
     path('category/', views.category_view, name='category'),
     path('food/', views.food_view, name='food'),
-    path('search/', views.search_view, name='search'),
-    path('search/<str:slug>', views.search_view, name='search'),
-    path('shopping/', views.shopping_view, name='shopping'),
+    path('search/', read_views.search_view, name='search'),
+    path('search/<str:slug>', read_views.search_view, name='search'),
+    path('shopping/', read_views.shopping_view, name='shopping'),
+    path('import/', views.import_view, name='import'),
+    path('export/<str:dataset>/', views.export_view, name='export'),
 ]
\ No newline at end of file
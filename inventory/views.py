@@ -1,72 +1,31 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils import timezone
 from inventory.models import Category, Food
-from datetime import date, timedelta
-from django.utils.dateparse import parse_date
+from inventory.bulk import ACTIONS as BULK_ACTIONS, adjust_foods, delete_foods, move_foods, parse_ids, rows_from_post, save_rows
+from inventory.cache import cached
+from inventory.conditional import condition_on_inventory
+from inventory.exporters import DATASETS, FORMATS as EXPORT_FORMATS, dataset_rows, stream_export
+from inventory.importers import FORMATS, KINDS, import_records, iter_records
+from inventory.pagination import get_page_size, paginate_keyset
+from inventory.search import filter_foods
+from inventory.stock import forecast_shopping_list, shopping_list, stock_summary
+from datetime import date
 from django.db import IntegrityError
-from django.db.models import Q, Sum
+import io
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@condition_on_inventory
 def dashboard(request):
-    today = date.today()
-    next_7_days = today + timedelta(days=7)
-
-    # Summary stats
-    total_categories = Category.objects.count()
-    total_food_items = Food.objects.count()
-
-    # Categories below ideal quantity
-    categories_below_ideal = []
-    for category in Category.objects.all():
-        current_quantity = category.foods.aggregate(total=Sum('quantity'))['total'] or 0
-        if current_quantity < category.ideal_quantity:
-            categories_below_ideal.append({
-                'category': category,
-                'current_quantity': current_quantity,
-                'ideal_quantity': category.ideal_quantity,
-                'unit': category.unit,
-                'quantity_needed': category.ideal_quantity - current_quantity
-            })
-
-    num_categories_below_ideal = len(categories_below_ideal)
-
-    # Expiring soon food count per category (within next 7 days only)
-    expiring_soon_summary = []
-    for category in Category.objects.all():
-        count = category.foods.filter(best_before__gt=today, best_before__lte=next_7_days).count()
-        if count > 0:
-            expiring_soon_summary.append({
-                'category__name': category.name,
-                'count': count
-            })
-
-    # Bar chart data
-    chart_labels = []
-    chart_current = []
-    chart_ideal = []
-    for category in Category.objects.all():
-        current_quantity = category.foods.aggregate(total=Sum('quantity'))['total'] or 0
-        chart_labels.append(category.name)
-        chart_current.append(round(current_quantity, 2))
-        chart_ideal.append(round(category.ideal_quantity, 2))
-
-    context = {
-        'total_categories': total_categories,
-        'total_food_items': total_food_items,
-        'num_categories_below_ideal': num_categories_below_ideal,
-        'expiring_soon_summary': expiring_soon_summary,
-        'low_stock_categories': sorted(categories_below_ideal, key=lambda x: x['quantity_needed'], reverse=True)[:5],
-        'chart_labels': chart_labels,
-        'chart_current': chart_current,
-        'chart_ideal': chart_ideal,
-    }
-
+    context = cached('stock_summary', stock_summary)
     return render(request, 'inventory/dashboard.html', context)
 
 
+@condition_on_inventory
 def category_view(request):
     action = request.GET.get("action")
     success_message = ""
@@ -179,6 +138,8 @@ def category_view(request):
 
 def food_view(request):
     action = request.GET.get('action')
+    if action == 'bulk':
+        return _food_bulk_edit(request)
     success_message = ''
     error_message = ''
     context = {'action': action, 'today': date.today().isoformat()}
@@ -300,51 +261,176 @@ def food_view(request):
 
     return render(request, 'inventory/food.html', context)
 
+def _food_bulk_edit(request):
+    """Edit many food items in one request: per-row quantities/dates or one action for all selected rows"""
+    context = {'action': 'bulk', 'today': date.today().isoformat()}
+    row_errors, submitted = {}, {}
+
+    if request.method == 'POST':
+        bulk_action = request.POST.get('bulk_action')
+        try:
+            food_ids = parse_ids(request.POST.getlist('food_ids'))
+            if bulk_action == 'save':
+                submitted = rows_from_post(request.POST)
+                updated, row_errors = save_rows(submitted)
+                if row_errors:
+                    context['error_message'] = f'{len(row_errors)} row{"s" if len(row_errors) != 1 else ""} could not be saved; no changes were applied.'
+                else:
+                    context['success_message'] = f'Updated {updated} food item{"s" if updated != 1 else ""}.'
+            elif bulk_action not in BULK_ACTIONS:
+                context['error_message'] = 'Unknown bulk action.'
+            elif not food_ids:
+                context['error_message'] = 'Please select at least one food item.'
+            elif bulk_action == 'delete':
+                context['success_message'] = f'Deleted {delete_foods(food_ids)} food item(s).'
+            elif bulk_action == 'move':
+                context['success_message'] = f'Moved {move_foods(food_ids, request.POST.get("target_category_id"))} food item(s).'
+            else:
+                context['success_message'] = f'Adjusted {adjust_foods(food_ids, request.POST.get("delta"))} food item(s).'
+        except ValueError as exc:
+            context['error_message'] = str(exc)
+        if context.get('success_message'):
+            logger.info(f'Bulk {bulk_action}: {context["success_message"]}')
+
+    search = request.GET.get('search', '').strip()
+    food_items, ordering, _ = filter_foods(Food.objects.for_listing(), None, search)
+    params = request.GET.copy()
+    # Capped too, since a bigger page would post more fields than a save request may carry
+    page_size = get_page_size(params.get('page_size', settings.INVENTORY_BULK_PAGE_SIZE))
+    params['page_size'] = str(min(page_size, settings.INVENTORY_BULK_PAGE_SIZE))
+    page = paginate_keyset(food_items, ordering, params)
+    for item in page.items:
+        # Show rejected input back next to its error instead of the stored values
+        values = submitted.get(item.pk, {}) if row_errors else {}
+        item.row_error = row_errors.get(item.pk)
+        item.form_quantity = values.get('quantity', item.quantity)
+        item.form_best_before = values.get('best_before', item.best_before.isoformat())
+    context.update({
+        'search': search,
+        'food_items': page.items,
+        'categories': Category.objects.order_by('name'),
+        'next_url': _page_url(request, 'after', page.next_cursor),
+        'previous_url': _page_url(request, 'before', page.previous_cursor),
+    })
+    return render(request, 'inventory/food.html', context)
+
+
+@condition_on_inventory
 def search_view(request, slug=None):
-    food_items = []
-    item_count = 0
     search = request.GET.get('search', '').strip()
     message = "items fetched successfully"
-    if slug=="category":
-        if search:
-            food_items = Food.objects.filter(category__name__icontains=search)
-        if not food_items:
-            message = "No food items found for this category."
-            
+    food_items, ordering, error_message = filter_foods(Food.objects.for_listing(), slug, search)
+    if error_message:
+        message = error_message
+        empty_message = None
+    elif slug == "category":
+        empty_message = "No food items found for this category."
     elif slug == "best_before_date":
-        expires_before_date = parse_date(search)
-        if expires_before_date:
-            food_items = Food.objects.filter(best_before__lte=expires_before_date)
-        else:
-            message = "Invalid date format. Please use YYYY-MM-DD."
-    else:
-        food_items = Food.objects.filter(
-                Q(name__icontains=search) | 
-                Q(category__name__icontains=search)
-            )
-        if not food_items:
-            message = "No food items found matching your search criteria."
-    if not slug and not search or not food_items:
-        if not food_items:
-            item_count = 0
-        else:
-            item_count = food_items.count()
+        empty_message = None
     else:
+        empty_message = "No food items found matching your search criteria."
+
+    page = paginate_keyset(food_items, ordering, request.GET)
+    if not page.items and empty_message:
+        message = empty_message
+
+    # Counting is a second full scan, so only do it when the page cannot answer it
+    if page.is_complete:
+        item_count = len(page.items)
+    elif request.GET.get('count') == '1':
         item_count = food_items.count()
+    else:
+        item_count = None
 
-    return render(request, 'inventory/search.html', {'items': food_items, 'item_count': item_count, "message":message})
+    return render(request, 'inventory/search.html', {
+        'items': page.items,
+        'item_count': item_count,
+        'message': message,
+        'next_url': _page_url(request, 'after', page.next_cursor),
+        'previous_url': _page_url(request, 'before', page.previous_cursor),
+    })
 
+
+def _page_url(request, direction, cursor):
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[direction] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+SHOPPING_ORDERS = ('shortfall', 'stockout')
+
+
+def _shopping_order(request):
+    order = request.GET.get('order')
+    return order if order in SHOPPING_ORDERS else 'shortfall'
+
+
+@condition_on_inventory
 def shopping_view(request):
-    categories = Category.objects.all()
-    shopping_items = []
-    
-    for category in categories:
-        if category.is_low_stock:
-            needed_quantity = category.ideal_quantity - category.current_quantity
-            shopping_items.append({
-                'category_name': category.name,
-                'current_quantity': category.current_quantity,
-                'ideal_quantity': category.ideal_quantity,
-                'needed_quantity': needed_quantity
-            })
-    return render(request, 'inventory/shopping.html', {'shopping_items': shopping_items, 'item_count': len(shopping_items)})
+    order = _shopping_order(request)
+    if order == 'stockout':
+        shopping_items = cached('shopping_forecast', forecast_shopping_list)
+    else:
+        shopping_items = cached('shopping_list', shopping_list)
+    return render(request, 'inventory/shopping.html', {
+        'shopping_items': shopping_items, 'item_count': len(shopping_items), 'order': order,
+    })
+
+
+MAX_REPORTED_IMPORT_ERRORS = 100
+
+
+def import_view(request):
+    context = {'kinds': KINDS, 'formats': FORMATS}
+
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        kind = request.POST.get('kind', 'foods')
+        data_format = request.POST.get('format') or ('csv' if upload and upload.name.lower().endswith('.csv') else 'json')
+
+        if not upload:
+            context['error_message'] = 'Please choose a file to import.'
+        elif kind not in KINDS or data_format not in FORMATS:
+            context['error_message'] = 'Unsupported import type.'
+        else:
+            errors = []
+
+            def report(number, message):
+                if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                    errors.append({'row': number, 'message': message})
+
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+            result = import_records(iter_records(stream, data_format), kind=kind, on_error=report)
+            context.update({'error_count': result.errors, 'errors': errors})
+            if result.failure:
+                # Batches written before the unreadable part are kept, so say how far the import got
+                context['error_message'] = (
+                    f'The rest of the file could not be parsed ({result.failure}); '
+                    f'the {result.created} {kind} before that point were imported.'
+                )
+            else:
+                context['success_message'] = f'Imported {result.created} {kind}.'
+            logger.info(f'Imported {result.created} {kind}, rejected {result.errors}, failure: {result.failure}')
+
+    return render(request, 'inventory/import.html', context)
+
+
+def export_view(request, dataset):
+    data_format = request.GET.get('format', 'csv')
+    if dataset not in DATASETS:
+        raise Http404('Unknown export.')
+    if data_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Unsupported export format.')
+
+    try:
+        columns, rows = dataset_rows(dataset, request.GET.get('by'), request.GET.get('search', '').strip())
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    response = StreamingHttpResponse(stream_export(columns, rows, data_format), content_type=EXPORT_FORMATS[data_format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{data_format}"'
+    return response
+